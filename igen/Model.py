@@ -1,7 +1,9 @@
 # coding=utf-8
 
-import re
-from jinja2 import Environment, PackageLoader
+from .env import get_env
+from .swift_parser import parse
+from .trace import span
+from .symbol_index import default_value
 from .constants import SWIFT_TYPES_DEFAULT_VALUES, SWIFT_TYPES
 
 class Model(object):
@@ -29,7 +31,7 @@ class Model(object):
 			elif self.type_name in SWIFT_TYPES:
 				value = SWIFT_TYPES_DEFAULT_VALUES[self.type_name]
 			else:
-				value = "{}()".format(self.type_name)
+				value = default_value(self.type_name)
 			return value
 
 
@@ -39,13 +41,10 @@ class Model(object):
 
 	def name_and_properties(self):
 		try:
-			str = self.model_text
-			block_regex = re.search("struct (\w+) {([^}]+)", str)
-			model_name = block_regex.group(1)
-			block = block_regex.group(2)
-			properties_regex = re.compile("(let|var) (\w+): (.*)")
-			properties = [Model.Property(p[1], p[2]) for p in properties_regex.findall(block)]
-			return (model_name, properties)
+			with span('parse_model', 'parse'):
+				model = parse(self.model_text).find(['struct'])
+				properties = [Model.Property(p.name, p.type_name) for p in model.properties if not p.is_computed]
+				return (model.name, properties)
 		except:
 			print("The Model in the pasteboard is invalid.")
 			exit(1)
@@ -55,11 +54,7 @@ class InitModel(Model):
 
 	def create_init(self):
 		model_name, properties = self.name_and_properties()
-		env = Environment(
-			loader=PackageLoader('igen_templates', 'commands'),
-			trim_blocks=True,
-			lstrip_blocks=True
-		)
+		env = get_env('commands')
 		template = env.get_template("Init.swift")
 		content = template.render(
 			name=model_name,
@@ -1,9 +1,15 @@
 # coding=utf-8
 
-import re
 import os
-from jinja2 import Environment, PackageLoader
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+from .env import get_env
 from datetime import datetime
+from collections import OrderedDict
+from .sink import DirectorySink, SPOOL_SIZE
+from .swift_parser import parse
+from .trace import span
+from . import metrics
 from .str_helpers import upper_first_letter, lower_first_letter
 
 class ProjectInfo(object):
@@ -24,14 +30,11 @@ class Template(object):
 
 
 	class Property(object):
-		def __init__(self, property):
+		def __init__(self, name, type_name):
 			super(Template.Property, self).__init__()
-			self.property = property
-			property_regex = re.compile("(?:let|var) (\w+): (.*)")
-			mo = property_regex.search(property)
-			self.name = mo.group(1)
+			self.name = name
 			self.name_title = upper_first_letter(self.name)
-			self.type = Template.PropertyType(mo.group(2))
+			self.type = Template.PropertyType(type_name)
 
 		@property
 		def is_url(self):
@@ -52,177 +55,170 @@ class Template(object):
 		def is_array(self):
 			return self.name.endswith(("]", "]?"))
 
+	class Artifact(object):
+		# One file of a scene: its kind, e.g. 'ViewModel' or 'Cell', the class
+		# it declares, the template rendering it, and the variables of the
+		# template that the scene does not share.
+		def __init__(self, kind, class_name, template_name, is_test=False, context=None):
+			super(Template.Artifact, self).__init__()
+			self.kind = kind
+			self.class_name = class_name
+			self.template_name = template_name
+			self.is_test = is_test
+			self.context = context
+
+	# The kinds of artifacts of every template type.
+	ARTIFACT_KINDS = ["ViewModel", "ItemViewModel", "Navigator", "UseCase", "ViewController", "Cell", "Assembler",
+		"ViewModelTests", "UseCaseMock", "NavigatorMock", "ViewControllerTests", "CellTests"]
+
 	class TemplateType:
 		BASE = "base"
 		LIST = "list"
 		DETAIL = "detail"
 
 	def parse_model(self, model_text):
-		model_regex = re.compile("(?:struct|class) (\w+) {((.|\n)*)}")
-		match = model_regex.search(model_text)
-		model_name = match.group(1)
-		property_block = match.group(2)
-		property_regex = re.compile("(?:let|var) (\w+): (.*)")
-		properties = [Template.Property(p.group()) for p in property_regex.finditer(property_block)]
-		return Template.Model(model_name, properties)
+		with span('parse_model', 'parse'):
+			model = parse(model_text).find(['struct', 'class'])
+			properties = [Template.Property(p.name, p.type_name) for p in model.properties]
+			return Template.Model(model.name, properties)
 
 
 	#=================== BaseTemplate ===================
 
 	class BaseTemplate(object):
+
+		WORKERS = min(8, (os.cpu_count() or 1) + 2)
+
+		# Stands for the class name in the file header, which is rendered once
+		# per scene.
+		CLASS_NAME_MARKER = "\x00"
+
 		def __init__(self, name, project_info):
 			super(Template.BaseTemplate, self).__init__()
 			self.name = name
 			self.project = project_info.project
 			self.developer = project_info.developer
 			self.company = project_info.company
-			self.env = Environment(
-				loader=PackageLoader('igen_templates', 'base'),
-				trim_blocks=True,
-				lstrip_blocks=True
-			)
-
-		def _create_file(self, class_name, content):
-			file_name = class_name + ".swift"
-			file_path = "{}/{}.swift".format(self.name, class_name)
-			self.__create_file(file_path, file_name, content)
-
-		def _create_test_file(self, class_name, content):
-			file_name = class_name + ".swift"
-			file_path = "{}/Test/{}.swift".format(self.name, class_name)
-			self.__create_file(file_path, file_name, content)
-
-		def __create_file(self, file_path, file_name, content):
-			with open(file_path, "wb") as f:
-				f.write(content.encode('utf8'))
-				print("    {}".format(file_path))
-
-		def _file_header(self, class_name):
+			self.created_date = datetime.now()
+			self.env = get_env('base')
+			self.only = None
+			self.excluded = None
+
+		def _file_path(self, artifact):
+			if artifact.is_test:
+				return "{}/Test/{}.swift".format(self.name, artifact.class_name)
+			return "{}/{}.swift".format(self.name, artifact.class_name)
+
+		def plan(self):
+			# The files of the scene, in the order they are created.
+			return [
+				Template.Artifact("ViewModel", self.name + "ViewModel", "ViewModel.swift"),
+				Template.Artifact("Navigator", self.name + "Navigator", "Navigator.swift"),
+				Template.Artifact("UseCase", self.name + "UseCase", "UseCase.swift"),
+				Template.Artifact("ViewController", self.name + "ViewController", "ViewController.swift"),
+				Template.Artifact("Assembler", self.name + "Assembler", "Assembler.swift"),
+				# Test
+				Template.Artifact("ViewModelTests", self.name + "ViewModelTests", "ViewModelTests.swift", True),
+				Template.Artifact("UseCaseMock", self.name + "UseCaseMock", "UseCaseMock.swift", True),
+				Template.Artifact("NavigatorMock", self.name + "NavigatorMock", "NavigatorMock.swift", True),
+				Template.Artifact("ViewControllerTests", self.name + "ViewControllerTests", "ViewControllerTests.swift", True)
+			]
+
+		def select(self, only=None, excluded=None):
+			# Restricts the files created to the artifacts of the kinds in only,
+			# or to the ones not in excluded.
+			self.only = only
+			self.excluded = excluded
+
+		def selected_plan(self):
+			return [artifact for artifact in self.plan() if self._is_selected(artifact)]
+
+		def _is_selected(self, artifact):
+			return (self.only is None or artifact.kind in self.only) and (self.excluded is None or artifact.kind not in self.excluded)
+
+		def obsolete_plan(self):
+			# The files that the scene creates with other options and that
+			# conflict with the ones of the plan. They are removed.
+			return []
+
+		def context(self):
+			# The variables shared by the templates of the scene.
+			return {
+				'name': self.name,
+				'project': self.project
+			}
+
+		def _render_files(self):
+			# Artifacts are rendered on a thread pool and yielded in submission
+			# order as they complete, so the consumer can write one file while
+			# the following ones are still being rendered. The pool renders the
+			# first SPOOL_SIZE characters of a file, and the rest of a larger
+			# one is rendered while the consumer writes it.
+			context = self.context()
+			file_header = self._file_header()
+			with ThreadPoolExecutor(max_workers=Template.BaseTemplate.WORKERS) as executor:
+				futures = [executor.submit(self._render_artifact, artifact, context, file_header) for artifact in self.selected_plan()]
+				for future in futures:
+					yield future.result()
+					metrics.count('files.rendered')
+
+		def _render_artifact(self, artifact, context, file_header):
+			# Returns the path of the file, its first blocks, and the generator
+			# of the other blocks, or None when the file is complete.
+			blocks = self._generate_artifact(artifact, context, file_header)
+			head = []
+			size = 0
+			for block in blocks:
+				head.append(block)
+				size += len(block)
+				if size > SPOOL_SIZE:
+					return (self._file_path(artifact), head, blocks)
+			return (self._file_path(artifact), head, None)
+
+		def _generate_artifact(self, artifact, context, file_header):
+			template = self.env.get_template(artifact.template_name)
+			if artifact.context:
+				context = dict(context, **artifact.context)
+			yield file_header(artifact.class_name)
+			yield from template.generate(context)
+
+		def render(self):
+			return OrderedDict(
+				(file_path, "".join(chain(head, rest or [])))
+				for file_path, head, rest in self._render_files()
+			)
+
+		def _file_header(self):
+			# Returns the function creating the header of a file from its class
+			# name.
 			template = self.env.get_template("FileHeader.swift")
-			now = datetime.now()
-			date = "{}/{}/{}".format(now.month, now.day, now.strftime("%y"))
+			created = self.created_date
+			date = "{}/{}/{}".format(created.month, created.day, created.strftime("%y"))
 			header = template.render(
-				class_name=class_name,
+				class_name=Template.BaseTemplate.CLASS_NAME_MARKER,
 				project=self.project,
 				developer=self.developer,
 				created_date=date,
-				copyright_year=now.year,
+				copyright_year=created.year,
 				company=self.company
 			)
-			return header + "\n\n"
-
-		def create_files(self):
-			print('Successfully created files:')
-			self._make_dirs()
-			self._create_view_model()
-			self._create_navigator()
-			self._create_use_case()
-			self._create_view_controller()
-			self._create_assembler()
-			# Test
-			self._create_view_model_tests()
-			self._create_use_case_mock()
-			self._create_navigator_mock()
-			self._create_view_controller_tests()
-
-		def _make_dirs(self):
-			current_directory = os.getcwd()
-			main_directory = os.path.join(current_directory, r'{}'.format(self.name))
-			try: 
-				os.makedirs(main_directory)
-			except:
-				pass
-			test_directory = os.path.join(main_directory, "Test")
-			try:
-				os.makedirs(test_directory)
-			except:
-				pass
-
-		def _create_view_model(self):
-			class_name = self.name + "ViewModel"
-			template = self.env.get_template("ViewModel.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name
-			)
-			self._create_file(class_name, content)
-
-		def _create_navigator(self):
-			class_name = self.name + "Navigator"
-			template = self.env.get_template("Navigator.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name
-			)
-			self._create_file(class_name, content)
-
-		def _create_use_case(self):
-			class_name = self.name + "UseCase"
-			template = self.env.get_template("UseCase.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name
-			)
-			self._create_file(class_name, content)
-
-		def _create_view_controller(self):
-			class_name = self.name + "ViewController"
-			template = self.env.get_template("ViewController.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name
-			)
-			self._create_file(class_name, content)
-
-		def _create_assembler(self):
-			class_name = self.name + "Assembler"
-			template = self.env.get_template("Assembler.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name
-			)
-			self._create_file(class_name, content)
-
-		def _create_view_model_tests(self):
-			class_name = self.name + "ViewModelTests"
-			template = self.env.get_template("ViewModelTests.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name,
-				project=self.project
-			)
-			self._create_test_file(class_name, content)
-
-		def _create_use_case_mock(self):
-			class_name = self.name + "UseCaseMock"
-			template = self.env.get_template("UseCaseMock.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name,
-				project=self.project
-			)
-			self._create_test_file(class_name, content)
-
-		def _create_navigator_mock(self):
-			class_name = self.name + "NavigatorMock"
-			template = self.env.get_template("NavigatorMock.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name,
-				project=self.project
-			)
-			self._create_test_file(class_name, content)
-
-		def _create_view_controller_tests(self):
-			class_name = self.name + "ViewControllerTests"
-			template = self.env.get_template("ViewControllerTests.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name,
-				project=self.project
-			)
-			self._create_test_file(class_name, content)
-
+			parts = (header + "\n\n").split(Template.BaseTemplate.CLASS_NAME_MARKER)
+			return lambda class_name: class_name.join(parts)
+
+		def create_files(self, sink=None):
+			# Large files are written as they are rendered, so large models do
+			# not need the whole content of a file in memory.
+			if sink is None:
+				sink = DirectorySink(os.getcwd())
+			self.created_date = sink.begin(self.name)
+			for file_path, head, rest in self._render_files():
+				if rest is None:
+					sink.write(file_path, "".join(head))
+				else:
+					sink.write_chunks(file_path, chain(head, rest))
+			for artifact in self.obsolete_plan():
+				sink.remove(self._file_path(artifact))
+			sink.end()
 
 
 	#=================== ListTemplate ===================
@@ -237,176 +233,53 @@ class Template(object):
 			self.is_collection = options['collection']
 			self.model_name = self.model.name
 			self.model_variable = lower_first_letter(self.model_name)
-			self.env = Environment(
-				loader=PackageLoader('igen_templates', 'list'),
-				trim_blocks=True,
-				lstrip_blocks=True
-			)
+			self.env = get_env('list')
 
-		def create_files(self):
-			print('Successfully created files:')
-			self._make_dirs()
-			self._create_view_model()
-			self._create_item_view_model()
-			self._create_navigator()
-			self._create_use_case()
-			self._create_view_controller()
-			self._create_table_view_cell()
-			self._create_assembler()
-			# Test
-			self._create_view_model_tests()
-			self._create_use_case_mock()
-			self._create_navigator_mock()
-			self._create_view_controller_tests()
-			self._create_table_view_cell_tests()
-
-		def _create_view_model(self):
-			class_name = self.name + "ViewModel"
-			if self.is_sectioned_list:
-				template_name = "SectionedViewModel.swift"
-			else:
-				template_name = "ViewModel.swift"
-			template = self.env.get_template(template_name)
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name,
-				model_name=self.model_name,
-				model_variable=self.model_variable
-			)
-			self._create_file(class_name, content)
-
-		def _create_item_view_model(self):
-			class_name = self.model_name + "ViewModel"
-			template = self.env.get_template("ItemViewModel.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				model_name=self.model_name,
-				model_variable=self.model_variable,
-				properties=self.model.properties
-			)
-			self._create_file(class_name, content)
-
-		def _create_use_case(self):
-			class_name = self.name + "UseCase"
-			template = self.env.get_template("UseCase.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name,
-				model_name=self.model_name
-			)
-			self._create_file(class_name, content)
-
-		def _create_navigator(self):
-			class_name = self.name + "Navigator"
-			template = self.env.get_template("Navigator.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name,
-				model_name=self.model_name,
-				model_variable=self.model_variable
-			)
-			self._create_file(class_name, content)
-
-		def _create_view_controller(self):
-			class_name = self.name + "ViewController"
+		def plan(self):
 			if self.is_sectioned_list:
+				view_model = "SectionedViewModel.swift"
+				view_model_tests = "SectionedViewModelTests.swift"
 				if self.is_collection:
-					template_file = "SectionedCollectionViewController.swift"
+					view_controller = "SectionedCollectionViewController.swift"
 				else:
-					template_file = "SectionedTableViewController.swift"
+					view_controller = "SectionedTableViewController.swift"
 			else:
+				view_model = "ViewModel.swift"
+				view_model_tests = "ViewModelTests.swift"
 				if self.is_collection:
-					template_file = "CollectionViewController.swift"
+					view_controller = "CollectionViewController.swift"
 				else:
-					template_file = "TableViewController.swift"
-			template = self.env.get_template(template_file)
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name,
-				model_name=self.model_name,
-				model_variable=self.model_variable
-			)
-			self._create_file(class_name, content)
-
-		def _create_table_view_cell(self):
-			class_name = self.model_name + "Cell"
-			if self.is_collection:
-				template_file = "CollectionViewCell.swift"
-			else:
-				template_file = "TableViewCell.swift"
-			template = self.env.get_template(template_file)
-			content = self._file_header(class_name)
-			content += template.render(
-				model_name=self.model_name,
-				model_variable=self.model_variable,
-				properties=self.model.properties
-			)
-			self._create_file(class_name, content)
-
-		def _create_view_model_tests(self):
-			class_name = self.name + "ViewModelTests"
-			if self.is_sectioned_list:
-				template_name = "SectionedViewModelTests.swift"
-			else:
-				template_name = "ViewModelTests.swift"
-			template = self.env.get_template(template_name)
-			content = self._file_header(class_name)
-			content += template.render(
-				project=self.project,
-				name=self.name,
-				model_name=self.model_name,
-				model_variable=self.model_variable
-			)
-			self._create_test_file(class_name, content)
-
-		def _create_use_case_mock(self):
-			class_name = self.name + "UseCaseMock"
-			template = self.env.get_template("UseCaseMock.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				project=self.project,
-				name=self.name,
-				model_name=self.model_name
-			)
-			self._create_test_file(class_name, content)
-
-		def _create_navigator_mock(self):
-			class_name = self.name + "NavigatorMock"
-			template = self.env.get_template("NavigatorMock.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				project=self.project,
-				name=self.name,
-				model_name=self.model_name,
-				model_variable=self.model_variable
-			)
-			self._create_test_file(class_name, content)
-
-		def _create_view_controller_tests(self):
-			class_name = self.name + "ViewControllerTests"
+					view_controller = "TableViewController.swift"
 			if self.is_collection:
-				template_name = "CollectionViewControllerTests.swift"
+				cell = "CollectionViewCell.swift"
+				view_controller_tests = "CollectionViewControllerTests.swift"
 			else:
-				template_name = "TableViewControllerTests.swift"
-			template = self.env.get_template(template_name)
-			content = self._file_header(class_name)
-			content += template.render(
-				project=self.project,
-				name=self.name
-			)
-			self._create_test_file(class_name, content)
-
-		def _create_table_view_cell_tests(self):
-			class_name = "{}CellTests".format(self.model_name)
-			template_name = "TableViewCellTests.swift"
-			template = self.env.get_template(template_name)
-			content = self._file_header(class_name)
-			content += template.render(
-				project=self.project,
-				model_name=self.model_name,
-				properties=self.model.properties
-			)
-			self._create_test_file(class_name, content)
+				cell = "TableViewCell.swift"
+				view_controller_tests = "TableViewControllerTests.swift"
+			return [
+				Template.Artifact("ViewModel", self.name + "ViewModel", view_model),
+				Template.Artifact("ItemViewModel", self.model_name + "ViewModel", "ItemViewModel.swift"),
+				Template.Artifact("Navigator", self.name + "Navigator", "Navigator.swift"),
+				Template.Artifact("UseCase", self.name + "UseCase", "UseCase.swift"),
+				Template.Artifact("ViewController", self.name + "ViewController", view_controller),
+				Template.Artifact("Cell", self.model_name + "Cell", cell),
+				Template.Artifact("Assembler", self.name + "Assembler", "Assembler.swift"),
+				# Test
+				Template.Artifact("ViewModelTests", self.name + "ViewModelTests", view_model_tests, True),
+				Template.Artifact("UseCaseMock", self.name + "UseCaseMock", "UseCaseMock.swift", True),
+				Template.Artifact("NavigatorMock", self.name + "NavigatorMock", "NavigatorMock.swift", True),
+				Template.Artifact("ViewControllerTests", self.name + "ViewControllerTests", view_controller_tests, True),
+				Template.Artifact("CellTests", self.model_name + "CellTests", "TableViewCellTests.swift", True)
+			]
+
+		def context(self):
+			context = super(Template.ListTemplate, self).context()
+			context.update({
+				'model_name': self.model_name,
+				'model_variable': self.model_variable,
+				'properties': self.model.properties
+			})
+			return context
 
 
 	#=================== DetailTemplate ===================
@@ -418,111 +291,49 @@ class Template(object):
 			self.model = model
 			self.model_name = self.model.name
 			self.model_variable = lower_first_letter(self.model_name)
-			self.env = Environment(
-				loader=PackageLoader('igen_templates', 'detail'),
-				trim_blocks=True,
-				lstrip_blocks=True
-			)
-
-		def create_files(self):
-			print('Successfully created files:')
-			self._make_dirs()
-			self._create_view_model()
-			self._create_navigator()
-			self._create_use_case()
-			self._create_view_controller()
-			self._create_cells()
-			self._create_assembler()
-			# Test
-			self._create_view_model_tests()
-			self._create_use_case_mock()
-			self._create_navigator_mock()
-			self._create_view_controller_tests()
-			self._create_cells_tests()
-
-		def _create_assembler(self):
-			class_name = self.name + "Assembler"
-			template = self.env.get_template("Assembler.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name,
-				model_name=self.model_name,
-				model_variable=self.model_variable
-			)
-			self._create_file(class_name, content)
-
-		def _create_view_model(self):
-			class_name = self.name + "ViewModel"
-			template = self.env.get_template("ViewModel.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name,
-				model_name=self.model_name,
-				model_variable=self.model_variable,
-				properties=self.model.properties
-			)
-			self._create_file(class_name, content)
-
-		def _create_view_controller(self):
-			class_name = self.name + "ViewController"
-			template = self.env.get_template("ViewController.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name,
-				model_name=self.model_name,
-				properties=self.model.properties
-			)
-			self._create_file(class_name, content)
-
-		def _create_cells(self):
-			for p in self.model.properties:
-				self._create_cell(p)
-
-		def _create_cell(self, property):
-			class_name = "{}{}Cell".format(self.model_name, property.name_title)
-			template = self.env.get_template("Cell.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				model_name=self.model_name,
-				property_name=property.name,
-				property_name_title=property.name_title
-			)
-			self._create_file(class_name, content)
-
-		def _create_view_model_tests(self):
-			class_name = self.name + "ViewModelTests"
-			template = self.env.get_template("ViewModelTests.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name,
-				project=self.project,
-				model_name=self.model_name,
-				model_variable=self.model_variable
-			)
-			self._create_test_file(class_name, content)
-
-		def _create_view_controller_tests(self):
-			class_name = self.name + "ViewControllerTests"
-			template = self.env.get_template("ViewControllerTests.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name,
-				project=self.project,
-			)
-			self._create_test_file(class_name, content)
-
-		def _create_cells_tests(self):
-			class_name = "{}CellsTests".format(self.name)
-			template = self.env.get_template("CellsTests.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name,
-				project=self.project,
-				model_name=self.model_name,
-				model_variable=self.model_variable,
-				properties=self.model.properties
-			)
-			self._create_test_file(class_name, content)
+			self.is_single_cell_file = options.get('single_cell_file', False)
+			self.env = get_env('detail')
+
+		def plan(self):
+			return [
+				Template.Artifact("ViewModel", self.name + "ViewModel", "ViewModel.swift"),
+				Template.Artifact("Navigator", self.name + "Navigator", "Navigator.swift"),
+				Template.Artifact("UseCase", self.name + "UseCase", "UseCase.swift"),
+				Template.Artifact("ViewController", self.name + "ViewController", "ViewController.swift"),
+			] + self._cell_plan(self.is_single_cell_file) + [
+				Template.Artifact("Assembler", self.name + "Assembler", "Assembler.swift"),
+				# Test
+				Template.Artifact("ViewModelTests", self.name + "ViewModelTests", "ViewModelTests.swift", True),
+				Template.Artifact("UseCaseMock", self.name + "UseCaseMock", "UseCaseMock.swift", True),
+				Template.Artifact("NavigatorMock", self.name + "NavigatorMock", "NavigatorMock.swift", True),
+				Template.Artifact("ViewControllerTests", self.name + "ViewControllerTests", "ViewControllerTests.swift", True),
+				Template.Artifact("CellTests", self.name + "CellsTests", "CellsTests.swift", True)
+			]
+
+		def obsolete_plan(self):
+			# The cell files of the other mode declare the same classes.
+			return [artifact for artifact in self._cell_plan(not self.is_single_cell_file) if self._is_selected(artifact)]
+
+		def _cell_plan(self, is_single_cell_file):
+			# One file per cell, or every cell in <Name>Cells.swift.
+			if is_single_cell_file:
+				return [Template.Artifact("Cell", self.name + "Cells", "Cells.swift")]
+			return [
+				Template.Artifact("Cell", "{}{}Cell".format(self.model_name, p.name_title), "Cell.swift", context={
+					'property_name': p.name,
+					'property_name_title': p.name_title
+				})
+				for p in self.model.properties
+			]
+
+		def context(self):
+			context = super(Template.DetailTemplate, self).context()
+			context.update({
+				'model_name': self.model_name,
+				'model_variable': self.model_variable,
+				'properties': self.model.properties
+			})
+			return context
 
 
 	#=================== StaticDetailTemplate ===================
@@ -530,61 +341,18 @@ class Template(object):
 
 	class StaticDetailTemplate(DetailTemplate):
 
-		def create_files(self):
-			print('Successfully created files:')
-			self._make_dirs()
-			self._create_assembler()
-			self._create_view_model()
-			self._create_navigator()
-			self._create_use_case()
-			self._create_view_controller()
-			self._create_view_model_tests()
-			self._create_use_case_mock()
-			self._create_navigator_mock()
-			self._create_view_controller_tests()
-
-		def _create_view_model(self):
-			class_name = self.name + "ViewModel"
-			template = self.env.get_template("StaticViewModel.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name,
-				model_name=self.model_name,
-				model_variable=self.model_variable,
-				properties=self.model.properties
-			)
-			self._create_file(class_name, content)
-
-		def _create_view_controller(self):
-			class_name = self.name + "ViewController"
-			template = self.env.get_template("StaticViewController.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name,
-				properties=self.model.properties
-			)
-			self._create_file(class_name, content)
-
-		def _create_view_model_tests(self):
-			class_name = self.name + "ViewModelTests"
-			template = self.env.get_template("StaticViewModelTests.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name,
-				project=self.project,
-				model_name=self.model_name,
-				model_variable=self.model_variable,
-				properties=self.model.properties
-			)
-			self._create_test_file(class_name, content)
-
-		def _create_view_controller_tests(self):
-			class_name = self.name + "ViewControllerTests"
-			template = self.env.get_template("StaticViewControllerTests.swift")
-			content = self._file_header(class_name)
-			content += template.render(
-				name=self.name,
-				project=self.project,
-				properties=self.model.properties
-			)
-			self._create_test_file(class_name, content)
\ No newline at end of file
+		def plan(self):
+			return [
+				Template.Artifact("Assembler", self.name + "Assembler", "Assembler.swift"),
+				Template.Artifact("ViewModel", self.name + "ViewModel", "StaticViewModel.swift"),
+				Template.Artifact("Navigator", self.name + "Navigator", "Navigator.swift"),
+				Template.Artifact("UseCase", self.name + "UseCase", "UseCase.swift"),
+				Template.Artifact("ViewController", self.name + "ViewController", "StaticViewController.swift"),
+				Template.Artifact("ViewModelTests", self.name + "ViewModelTests", "StaticViewModelTests.swift", True),
+				Template.Artifact("UseCaseMock", self.name + "UseCaseMock", "UseCaseMock.swift", True),
+				Template.Artifact("NavigatorMock", self.name + "NavigatorMock", "NavigatorMock.swift", True),
+				Template.Artifact("ViewControllerTests", self.name + "ViewControllerTests", "StaticViewControllerTests.swift", True)
+			]
+
+		def obsolete_plan(self):
+			return []
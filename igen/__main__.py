@@ -1,32 +1,68 @@
+import os
 import sys
 import argparse
 from arghandler import *
 
 from . import __version__
-from .pb import pasteboard_read
-from .api_cmd import APICommand
-from .mock_cmd import MockCommand
-from .init_cmd import InitCommand
-from .config_cmd import ConfigCommand
-from .json_cmd import JSONCommand
-from .test_cmd import UnitTestCommand
-from .bind_cmd import BindViewModelCommand
-from .template_cmd import TemplateCommand
+from . import trace
+from . import metrics
+
+# The command modules, and jinja2 through them, are only imported by the
+# subcommand that runs, so 'igen -v' or 'igen config' start quickly.
+
+def add_io_arguments(parser, input=True, output=True):
+	from .pb import BACKENDS
+	parser.add_argument(
+		'--clipboard',
+		required=False,
+		choices=BACKENDS,
+		help="clipboard of the input and the result, 'stdio' for stdin and stdout (default: the 'io.clipboard' configuration or the clipboard of the system)"
+	)
+	if input:
+		parser.add_argument(
+			'--input',
+			required=False,
+			metavar='FILE',
+			help="read the input from FILE ('-' for stdin) instead of the clipboard"
+		)
+	if output:
+		parser.add_argument(
+			'--output',
+			required=False,
+			metavar='FILE',
+			help="write the result to FILE ('-' for stdout) instead of the clipboard"
+		)
+
+def artifact_kinds(value):
+	from .template import Template
+	kinds = [kind.strip() for kind in value.split(',') if kind.strip()]
+	for kind in kinds:
+		if kind not in Template.ARTIFACT_KINDS:
+			raise argparse.ArgumentTypeError("invalid artifact '{}' (choose from {})".format(kind, ", ".join(Template.ARTIFACT_KINDS)))
+	return kinds
+
+def select_io(args, input_file=None, output_file=None):
+	if args.clipboard or input_file or output_file:
+		from .pb import select_pasteboard
+		select_pasteboard(args.clipboard, input_file, output_file)
 
 @subcmd('template', help='create template files for the scene')
 def cmd_template(parser, context, args):
-	parser.epilog="'list' and 'detail' template require copying the Model to the pasteboard before running the command."
+	from .template import Template
+	parser.epilog="'list' and 'detail' template require copying the Model to the pasteboard before running the command. " \
+		"'batch' creates every scene described in a YAML or JSON manifest file. " \
+		"Artifacts: {}.".format(", ".join(Template.ARTIFACT_KINDS))
 	parser.description='Create template files for the scene.'
 	parser.add_argument(
 		'type',
 		nargs=1,
-		choices=['base', 'list', 'detail'],
+		choices=['base', 'list', 'detail', 'batch'],
 		help="template type"
 	)
 	parser.add_argument(
 		'name',
 		nargs=1,
-		help='scene name'
+		help="scene name (manifest file for 'batch')"
 	)
 	parser.add_argument(
 		'--section', 
@@ -46,20 +82,116 @@ def cmd_template(parser, context, args):
 		action='store_true', 
 		help="display details in a static UITableViewController ('detail' template only)"
 	)
+	parser.add_argument(
+		'--single-cell-file',
+		required=False,
+		action='store_true',
+		help="create every cell in one <Scene_Name>Cells.swift file instead of a file per cell ('detail' template only)"
+	)
+	parser.add_argument(
+		'--force',
+		required=False,
+		action='store_true',
+		help="overwrite files that have been modified since they were generated"
+	)
+	parser.add_argument(
+		'-o', '--output',
+		required=False,
+		help="output directory, .tar/.tar.gz/.zip archive, or '-' for stdout (default: current directory)"
+	)
+	parser.add_argument(
+		'-j', '--jobs',
+		required=False,
+		type=int,
+		help="number of worker processes ('batch' template only, default: number of CPUs)"
+	)
+	selection = parser.add_mutually_exclusive_group()
+	selection.add_argument(
+		'--only',
+		required=False,
+		type=artifact_kinds,
+		metavar='ARTIFACTS',
+		help="only create the artifacts in the comma separated list, e.g. ViewModel,Cell,CellTests"
+	)
+	selection.add_argument(
+		'--except',
+		required=False,
+		type=artifact_kinds,
+		metavar='ARTIFACTS',
+		dest='excluded',
+		help="create every artifact except the ones in the comma separated list"
+	)
+	add_io_arguments(parser, output=False)
 	args = parser.parse_args(args)
+	select_io(args, args.input)
+	if args.type[0] == 'batch':
+		from .batch_cmd import BatchCommand
+		BatchCommand(args.name[0], args.jobs, args.force, args.output, args.only, args.excluded).create_files()
+		return
 	template_name = args.type[0]
 	scene_name = args.name[0]
 	options = {
 		'section': args.section,
 		'collection': args.collection,
 		'static': args.static,
+		'single_cell_file': args.single_cell_file,
+		'only': args.only,
+		'except': args.excluded,
+		'force': args.force,
+		'output': args.output,
 	}
+	from .template_cmd import TemplateCommand
 	TemplateCommand(template_name, scene_name, options).create_files()
 
 
+@subcmd('templates', help='precompile the templates')
+def cmd_templates(parser, context, args):
+	parser.description='Precompile the templates into Python modules to speed up the template loading.'
+	parser.epilog="Stale precompiled templates are ignored and the source templates are used instead."
+	parser.add_argument(
+		'action',
+		nargs=1,
+		choices=['compile', 'clean'],
+		help="compile the templates or remove the compiled templates"
+	)
+	parser.add_argument(
+		'--zip', 
+		required=False,
+		action='store_true',
+		help="store the compiled templates in zip files ('compile' only)"
+	)
+	args = parser.parse_args(args)
+	from .templates_cmd import TemplatesCommand
+	cmd = TemplatesCommand()
+	if args.action[0] == 'compile':
+		cmd.compile(args.zip)
+	else:
+		cmd.clean()
+
+
+@subcmd('index', help='index the declarations of the project')
+def cmd_index(parser, context, args):
+	parser.description='Index the Swift declarations of the project in a .igen-index file. Generators use the index of the current directory or its parents to create default values for the project types.'
+	parser.epilog="Only the files that changed since the last run are parsed again."
+	parser.add_argument(
+		'directory',
+		nargs='?',
+		help="root directory of the project (default: the directory of the current index, or the current directory)"
+	)
+	parser.add_argument(
+		'-j', '--jobs',
+		required=False,
+		type=int,
+		help="number of worker processes (default: number of CPUs)"
+	)
+	args = parser.parse_args(args)
+	from .index_cmd import IndexCommand
+	IndexCommand(args.directory, args.jobs).update_index()
+
+
 @subcmd('mock', help='create mock for the protocol')
 def cmd_mock(parser, context, args):
-	parser.usage = 'copy the protocol to the pasteboard then run: igen mock [-h] [-p]'
+	parser.usage = 'copy the protocol to the pasteboard then run: igen mock [-h] [-p] [--clipboard NAME] [--input FILE] [--output FILE]\n       or: igen mock --dir DIR [--out DIR] [-j JOBS] [--force]'
 	parser.description='Create mock for the protocol.'
 	parser.add_argument(
 		'-p', '--print', 
@@ -67,14 +199,45 @@ def cmd_mock(parser, context, args):
 		action='store_true', 
 		help="print the result"
 	)
+	parser.add_argument(
+		'--dir',
+		required=False,
+		help="create the mocks of every protocol in the Swift files of DIR"
+	)
+	parser.add_argument(
+		'--out',
+		required=False,
+		default='.',
+		help="directory of the mocks created with --dir (default: current directory)"
+	)
+	parser.add_argument(
+		'-j', '--jobs',
+		required=False,
+		type=int,
+		help="number of worker processes used with --dir (default: number of CPUs)"
+	)
+	parser.add_argument(
+		'--force',
+		required=False,
+		action='store_true',
+		help="overwrite mocks that were modified since they were created"
+	)
+	add_io_arguments(parser)
 	args = parser.parse_args(args)
+	select_io(args, args.input, args.output)
+	if args.dir:
+		from .mock_dir_cmd import MockDirectoryCommand
+		MockDirectoryCommand(args.dir, args.out, args.jobs, args.force).create_mocks()
+		return
+	from .pb import pasteboard_read
+	from .mock_cmd import MockCommand
 	protocol_text = pasteboard_read()
 	MockCommand(protocol_text).create_mock(args.print)
 
 
 @subcmd('test', help='create unit tests for the ViewModel')
 def cmd_test(parser, context, args):
-	parser.usage = 'copy the ViewModel to the pasteboard then run: igen test [-h] [-p]'
+	parser.usage = 'copy the ViewModel to the pasteboard then run: igen test [-h] [-p] [--clipboard NAME] [--input FILE] [--output FILE]'
 	parser.description='Create unit tests for the ViewModel.'
 	parser.add_argument(
 		'-p', '--print', 
@@ -82,14 +245,18 @@ def cmd_test(parser, context, args):
 		action='store_true', 
 		help="print the result"
 	)
+	add_io_arguments(parser)
 	args = parser.parse_args(args)
+	select_io(args, args.input, args.output)
+	from .pb import pasteboard_read
+	from .test_cmd import UnitTestCommand
 	vm_text = pasteboard_read()
 	UnitTestCommand(vm_text).create_tests(args.print)
 
 
 @subcmd('bind', help='create bindViewModel method for the UIViewController')
-def cmd_test(parser, context, args):
-	parser.usage = 'copy the ViewModel to the pasteboard then run: igen bind [-h] [-p]'
+def cmd_bind(parser, context, args):
+	parser.usage = 'copy the ViewModel to the pasteboard then run: igen bind [-h] [-p] [--clipboard NAME] [--input FILE] [--output FILE]'
 	parser.description='Create bindViewModel method for the UIViewController.'
 	parser.add_argument(
 		'-p', '--print', 
@@ -97,14 +264,18 @@ def cmd_test(parser, context, args):
 		action='store_true', 
 		help="print the result"
 	)
+	add_io_arguments(parser)
 	args = parser.parse_args(args)
+	select_io(args, args.input, args.output)
+	from .pb import pasteboard_read
+	from .bind_cmd import BindViewModelCommand
 	vm_text = pasteboard_read()
 	BindViewModelCommand(vm_text).create_bind_view_model(args.print)
 
 
 @subcmd('init', help='create initialize method for the class/struct')
 def cmd_init(parser, context, args):
-	parser.usage = 'copy the protocol to the pasteboard then run: igen init [-h] [-p]'
+	parser.usage = 'copy the protocol to the pasteboard then run: igen init [-h] [-p] [--clipboard NAME] [--input FILE] [--output FILE]'
 	parser.description='Create initialize method for the class/struct.'
 	parser.add_argument(
 		'-p', '--print', 
@@ -112,14 +283,19 @@ def cmd_init(parser, context, args):
 		action='store_true', 
 		help="print the result"
 	)
+	add_io_arguments(parser)
 	args = parser.parse_args(args)
+	select_io(args, args.input, args.output)
+	from .pb import pasteboard_read
+	from .init_cmd import InitCommand
 	model_text = pasteboard_read()
 	InitCommand(model_text).create_init(args.print)
 
 
 @subcmd('json', help='create model from JSON')
 def cmd_json(parser, context, args):
-	parser.usage = 'copy the JSON to the pasteboard then run: igen json [-h] [-p] name'
+	from .json_schema import Sampling, MAX_DEPTH
+	parser.usage = 'copy the JSON to the pasteboard then run: igen json [-h] [-p] [-f FILE] [--sample N] [--sampling {first,reservoir}] [--time-budget SECONDS] [--max-depth N] [--stream] [--clipboard NAME] [--output FILE] name'
 	parser.description='Create model from JSON.'
 	parser.add_argument(
 		'name',
@@ -132,9 +308,60 @@ def cmd_json(parser, context, args):
 		action='store_true', 
 		help="print the result"
 	)
+	parser.add_argument(
+		'-f', '--input', '--file',
+		required=False,
+		dest='input',
+		metavar='FILE',
+		help="read the JSON incrementally from FILE ('-' for stdin) instead of the clipboard"
+	)
+	parser.add_argument(
+		'--sample',
+		required=False,
+		type=int,
+		default=1000,
+		help="maximum number of elements of each array used to infer its type, 0 for all (default: 1000)"
+	)
+	parser.add_argument(
+		'--sampling',
+		required=False,
+		choices=['first', 'reservoir'],
+		default='first',
+		help="use the first elements of each array or a random sample (default: first)"
+	)
+	parser.add_argument(
+		'--time-budget',
+		required=False,
+		type=float,
+		help="seconds after which only the first element of the remaining arrays is used"
+	)
+	parser.add_argument(
+		'--max-depth',
+		required=False,
+		type=int,
+		default=MAX_DEPTH,
+		help="maximum nesting depth of the JSON (default: {})".format(MAX_DEPTH)
+	)
+	parser.add_argument(
+		'--stream',
+		required=False,
+		action='store_true',
+		help="read the JSON file or stdin incrementally whatever its size"
+	)
+	add_io_arguments(parser, input=False)
 	args = parser.parse_args(args)
+	select_io(args, args.input, args.output)
+	from .json_cmd import JSONCommand
+	from .pb import pasteboard_input_file
+	sampling = Sampling(args.sample, args.sampling, args.time_budget)
+	# Large files and stdin are read incrementally.
+	json_file = pasteboard_input_file()
+	if json_file:
+		JSONCommand(args.name[0], json_file=json_file, sampling=sampling, max_depth=args.max_depth, stream=args.stream).create_models(args.print)
+		return
+	from .pb import pasteboard_read
 	json = pasteboard_read()
-	JSONCommand(args.name[0], json).create_models(args.print)
+	JSONCommand(args.name[0], json, sampling=sampling, max_depth=args.max_depth).create_models(args.print)
 
 
 @subcmd('api', help='create input and ouput files for the API')
@@ -151,10 +378,73 @@ def cmd_api(parser, context, args):
 		action='store_true', 
 		help="print the result"
 	)
+	add_io_arguments(parser, input=False)
 	args = parser.parse_args(args)
+	select_io(args, output_file=args.output)
+	from .api_cmd import APICommand
 	APICommand(args.name[0]).create_api(args.print)
 
 
+@subcmd('serve', help='run the igen server')
+def cmd_serve(parser, context, args):
+	parser.description='Run a server that keeps the commands and templates loaded. ' \
+		"Commands run with the 'igenc' client are sent to it, which makes them start much faster."
+	parser.add_argument(
+		'--socket',
+		required=False,
+		help="path of the Unix socket (default: $IGEN_SOCKET or ~/.cache/igen/serve.sock)"
+	)
+	args = parser.parse_args(args)
+	from .server import Server
+	Server(args.socket).serve()
+
+
+@subcmd('stats', help='show the metrics of the recent runs')
+def cmd_stats(parser, context, args):
+	parser.description='Show the number of runs and the time of each command, the render time of each template ' \
+		'and the counters (files rendered, written and skipped, bytes emitted, cache hits) recorded by the recent runs of igen.'
+	parser.epilog="Turn the recording off with 'igen config metrics.enabled false' or IGEN_METRICS=0."
+	parser.add_argument(
+		'--last',
+		required=False,
+		type=int,
+		metavar='N',
+		help="only use the last N runs"
+	)
+	parser.add_argument(
+		'--command',
+		required=False,
+		help="only use the runs of the command, e.g. 'template'"
+	)
+	parser.add_argument(
+		'--recent',
+		required=False,
+		type=int,
+		default=10,
+		metavar='N',
+		help="number of runs of each command and template compared with the previous ones to compute the trend (default: 10)"
+	)
+	parser.add_argument(
+		'--json',
+		required=False,
+		action='store_true',
+		help="print the summary in JSON"
+	)
+	parser.add_argument(
+		'--clear',
+		required=False,
+		action='store_true',
+		help="remove the recorded metrics"
+	)
+	args = parser.parse_args(args)
+	from .stats_cmd import StatsCommand
+	cmd = StatsCommand(args.last, args.command, max(1, args.recent))
+	if args.clear:
+		cmd.clear()
+	else:
+		cmd.show(args.json)
+
+
 @subcmd('config', help='configure igen')
 def cmd_project(parser, context, args):
 	parser.description='Configure igen.'
@@ -176,6 +466,7 @@ def cmd_project(parser, context, args):
 		help='section value'
 	)
 	args = parser.parse_args(args)
+	from .config_cmd import ConfigCommand
 	cmd = ConfigCommand()
 	name = args.name[0]
 	values = args.value
@@ -190,7 +481,7 @@ def cmd_project(parser, context, args):
 		print('Invalid section and/or key.')
 
 
-def main():
+def main(argv=None):
 	handler = ArgumentHandler(
 		use_subcommand_help=True,
 		epilog='Get help on a subcommand: igen subcommand -h'
@@ -201,7 +492,57 @@ def main():
 		version=__version__,
 		help='show the version number and exit'
 	)
-	handler.run()
+	handler.add_argument(
+		'--profile',
+		action='store_true',
+		help="record the time of each stage of the command in a Chrome trace ($IGEN_TRACE or {}) and print a summary".format(trace.DEFAULT_FILE)
+	)
+	status = 1
+	try:
+		handler.run(argv, context_fxn=start_run)
+		status = 0
+	except SystemExit as e:
+		status = e.code if isinstance(e.code, int) else int(e.code is not None)
+		raise
+	except BrokenPipeError:
+		# The reader of the output, e.g. head, exited early.
+		silence_stdout()
+		exit(1)
+	finally:
+		trace.flush()
+		trace.finish()
+		metrics.finish(status)
+
+def silence_stdout():
+	# Sends the output still buffered, which is flushed at exit, to
+	# /dev/null instead of the closed pipe.
+	try:
+		fileno = sys.stdout.fileno()
+	except (OSError, ValueError):
+		# The output of a command run by 'igen serve' has no file descriptor.
+		sys.stdout = open(os.devnull, "w")
+		return
+	try:
+		devnull = os.open(os.devnull, os.O_WRONLY)
+		os.dup2(devnull, fileno)
+	except OSError:
+		pass
+
+def start_run(args):
+	start_profile(args)
+	# The server runs until it is stopped, and stats reads the metrics.
+	if args.cmd not in ['serve', 'stats']:
+		metrics.start(args.cmd)
+	return args
+
+def start_profile(args):
+	# IGEN_TRACE=FILE profiles every command. When it is already set by a
+	# profiled igen process, this one is one of its workers.
+	path = os.environ.get('IGEN_TRACE')
+	if (args.profile or path) and not trace.is_enabled():
+		if path and path.lower() in ['1', 'true', 'yes']:
+			path = None
+		trace.start(path, "igen " + args.cmd, argv=args.cargs)
 
 
 if __name__ == '__main__':
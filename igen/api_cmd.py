@@ -1,6 +1,6 @@
 # coding=utf-8
 
-from jinja2 import Environment, PackageLoader
+from .env import get_env
 from .str_helpers import lower_first_letter
 from .pb import pasteboard_write
 from .command import Command
@@ -17,18 +17,13 @@ class APICommand(Command):
 			print(output)
 			print()
 		pasteboard_write(output)
-		print('The result has been copied to the pasteboard.')
 
 
 class API(object):
 	def __init__(self, api_name):
 		super(API, self).__init__()
 		self.api_name = api_name
-		self.env = Environment(
-			loader=PackageLoader('igen_templates', 'commands'),
-			trim_blocks=True,
-			lstrip_blocks=True
-		)
+		self.env = get_env('commands')
 
 	def create_api(self):
 		name = self.api_name
@@ -0,0 +1,172 @@
+# coding=utf-8
+
+import io
+import os
+import sys
+import json
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from .config_cmd import ConfigCommand
+from .template import Template, ProjectInfo
+from .template_cmd import TemplateCommand
+from .sink import DirectorySink, create_sink, is_directory_output
+from .trace import span, flush
+from . import metrics
+from .command import Command
+
+class BatchCommand(Command):
+
+	SCENE_OPTIONS = ['section', 'collection', 'static', 'single_cell_file']
+
+	def __init__(self, manifest_path, jobs=None, force=False, output=None, only=None, excluded=None):
+		super(BatchCommand, self).__init__()
+		self.manifest_path = manifest_path
+		self.jobs = jobs or os.cpu_count() or 1
+		self.force = force
+		self.output = output
+		self.only = only
+		self.excluded = excluded
+
+	def create_files(self):
+		manifest = self._load_manifest()
+		base_dir = os.path.dirname(os.path.abspath(self.manifest_path))
+		output = self.output or os.path.join(base_dir, manifest.get('output', '.'))
+		if output != "-":
+			output = os.path.normpath(output)
+		project_info = self._project_info(manifest)
+		if is_directory_output(output):
+			os.makedirs(output, exist_ok=True)
+			sink = None
+		else:
+			sink = create_sink(output)
+		scenes = [self._scene(s, base_dir, output, project_info, sink is None) for s in manifest.get('scenes', [])]
+		try:
+			if self.jobs > 1 and len(scenes) > 1:
+				with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+					results = executor.map(create_scene, scenes, chunksize=max(1, len(scenes) // (self.jobs * 4)))
+					failed = self._write_results(scenes, results, sink)
+			else:
+				failed = self._write_results(scenes, map(create_scene, scenes), sink)
+		finally:
+			if sink is not None:
+				sink.close()
+		if output != "-":
+			print('Created {} of {} scenes in {}'.format(len(scenes) - failed, len(scenes), output))
+		if failed:
+			exit(1)
+
+	def _write_results(self, scenes, results, sink):
+		# Scenes rendered into an archive or stdout are returned by the
+		# workers and written here, in manifest order, by a single sink.
+		failed = 0
+		for scene, (succeeded, output, files) in zip(scenes, results):
+			print(output, end='', file=sys.stderr if sink is not None else sys.stdout)
+			if not succeeded:
+				failed += 1
+			elif files is not None:
+				sink.begin(scene['name'])
+				for file_path, content in files:
+					sink.write(file_path, content)
+				sink.end()
+		return failed
+
+	def _load_manifest(self):
+		try:
+			with open(self.manifest_path, encoding='utf-8') as f:
+				text = f.read()
+		except OSError as e:
+			print(e)
+			exit(1)
+		if self.manifest_path.endswith(('.yaml', '.yml')):
+			try:
+				import yaml
+			except ImportError:
+				print("PyYAML is required to read YAML manifests: pip3 install pyyaml")
+				exit(1)
+			load = yaml.safe_load
+		else:
+			load = json.loads
+		try:
+			manifest = load(text)
+			if not isinstance(manifest, dict) or not isinstance(manifest.get('scenes', []), list):
+				raise ValueError()
+			return manifest
+		except Exception:
+			print("The manifest {} is invalid.".format(self.manifest_path))
+			exit(1)
+
+	def _project_info(self, manifest):
+		project = manifest.get('project')
+		if project:
+			try:
+				return (project['name'], project['developer'], project['company'])
+			except (KeyError, TypeError):
+				print("The 'project' section must contain 'name', 'developer' and 'company'.")
+				exit(1)
+		info = ConfigCommand().project_info(False)
+		if info is None:
+			print("Project information not found. Run 'igen config project' or add a 'project' section to the manifest.")
+			exit(1)
+		return info
+
+	def _scene(self, scene, base_dir, output, project_info, write_files):
+		try:
+			scene_type = scene['type']
+			name = scene['name']
+		except (KeyError, TypeError):
+			print("Every scene in the manifest requires a 'type' and a 'name': {}".format(scene))
+			exit(1)
+		model = scene.get('model')
+		if model is not None:
+			model = os.path.join(base_dir, model)
+		options = dict((key, bool(scene.get(key, False))) for key in BatchCommand.SCENE_OPTIONS)
+		options['only'] = self.only
+		options['except'] = self.excluded
+		return {
+			'type': scene_type,
+			'name': name,
+			'model': model,
+			'options': options,
+			'output': output if write_files else None,
+			'project_info': project_info,
+			'force': self.force
+		}
+
+
+def create_scene(scene):
+	output = io.StringIO()
+	succeeded = True
+	files = None
+	with redirect_stdout(output), span('scene', 'batch', scene=scene['name']):
+		try:
+			files = _create_scene(scene)
+		except SystemExit:
+			succeeded = False
+		except Exception as e:
+			print("Failed to create the scene {}: {}".format(scene['name'], e))
+			succeeded = False
+	flush()
+	metrics.flush()
+	return (succeeded, output.getvalue(), files)
+
+def _create_scene(scene):
+	cmd = TemplateCommand(scene['type'], scene['name'], scene['options'])
+	model = None
+	if cmd.requires_model:
+		if scene['model'] is None:
+			print("The scene {} requires a 'model' file.".format(scene['name']))
+			exit(1)
+		try:
+			with open(scene['model'], encoding='utf-8') as f:
+				model = Template().parse_model(f.read())
+		except:
+			print("The Model in {} is invalid.".format(scene['model']))
+			exit(1)
+	template = cmd.template(model, ProjectInfo(*scene['project_info']))
+	if template is None:
+		print("Invalid template type for the scene {}.".format(scene['name']))
+		exit(1)
+	if scene['output'] is None:
+		return list(template.render().items())
+	template.create_files(DirectorySink(scene['output'], scene['force']))
+	return None
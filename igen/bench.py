@@ -0,0 +1,724 @@
+# coding=utf-8
+
+import gc
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import platform
+import tracemalloc
+import subprocess
+from contextlib import redirect_stdout
+from collections import OrderedDict
+from . import __version__
+
+# Benchmarks of the generators on synthetic inputs of increasing size.
+# Every benchmark is split in phases, e.g. 'parse' then 'total' for the
+# whole generator, and each phase is measured three ways:
+#
+#     time    the best wall time of a few runs
+#     peak    the peak memory traced by tracemalloc during one run
+#     blocks  the memory blocks still allocated when the phase returns,
+#             not the number of allocations made during the phase
+#
+# Run 'igen-bench --quick' for the small sizes only.
+
+PROPERTY_COUNTS = [10, 100, 1000, 10000]
+FUNCTION_COUNTS = [10, 100, 1000, 5000]
+JSON_SIZES = [1000, 100 * 1000, 10 * 1000 * 1000, 100 * 1000 * 1000]
+DECLARATION_COUNTS = [100, 1000, 10000]
+
+# Seconds after which the timed runs of a phase stop.
+MAX_RUN_TIME = 2.0
+
+# Modules that 'igen -v' must not import, see __main__.
+STARTUP_MODULES = ['jinja2', 'json', 'sqlite3', 'subprocess', 'configparser', 'concurrent.futures']
+# The igen modules that 'igen -v' imports.
+STARTUP_IGEN_MODULES = ['igen.__main__', 'igen.trace', 'igen.metrics']
+
+PROPERTY_TYPES = ["Int", "String", "Double", "Bool", "URL?", "[String]", "Date", "Category?"]
+
+
+def model_text(count):
+	lines = ["struct Product {"]
+	for i in range(count):
+		lines.append("    var property{}: {}".format(i, PROPERTY_TYPES[i % len(PROPERTY_TYPES)]))
+	lines.append("}")
+	return "\n".join(lines) + "\n"
+
+def protocol_text(count):
+	functions = [
+		"    func getProducts{}(page: Int, perPage: Int) -> Observable<PagingInfo<Product>>",
+		"    func update{}(_ product: Product, force: Bool) -> Observable<Void>",
+		"    func delete{}(id: Int)",
+		"    func products{}() -> [Product]",
+	]
+	lines = ["protocol ProductsUseCaseType {"]
+	for i in range(count):
+		lines.append(functions[i % len(functions)].format(i))
+	lines.append("}")
+	return "\n".join(lines) + "\n"
+
+def view_model_text(count):
+	lines = ["struct ProductsViewModel: ViewModelType {", "", "    struct Input {"]
+	for i in range(count // 2):
+		lines.append("        let trigger{}: Driver<Void>".format(i))
+	lines += ["    }", "", "    struct Output {"]
+	for i in range(count - count // 2):
+		lines.append("        let output{}: Driver<[Product]>".format(i))
+	lines += ["    }", "}"]
+	return "\n".join(lines) + "\n"
+
+def source_text(count):
+	# A Swift file of count declarations, for the parser.
+	parts = []
+	for i in range(count):
+		parts.append(
+			"/// Product {0}\n"
+			"struct Product{0}: Codable {{\n"
+			"    var id: Int\n"
+			"    var name: String = \"product {{ {0} }}\"\n"
+			"    var tags: [String: [Int]]\n"
+			"    var isEmpty: Bool {{ return tags.isEmpty }}\n"
+			"    init(id: Int, name: String) {{ self.id = id; self.name = name; self.tags = [:] }}\n"
+			"    func update(_ other: Product{0}, completion: @escaping (Result<Void, Error>) -> Void) {{ }}\n"
+			"}}\n".format(i)
+		)
+	return "\n".join(parts)
+
+def json_text(size):
+	# An array of objects with nested objects and arrays, of about size bytes.
+	element = json.dumps(OrderedDict([
+		("id", 1),
+		("name", "Product name"),
+		("price", 12.5),
+		("is_available", True),
+		("created_at", "2020-01-01T00:00:00Z"),
+		("category", OrderedDict([("id", 2), ("title", "Category")])),
+		("images", [OrderedDict([("url", "https://example.com/image.png"), ("width", 100)])]),
+		("note", None),
+	]))
+	count = max(1, size // (len(element) + 1))
+	return "[" + ",".join([element] * count) + "]"
+
+def _size_label(size, unit):
+	if unit == 'bytes':
+		for factor, suffix in [(1000 * 1000, "MB"), (1000, "KB")]:
+			if size >= factor:
+				return "{}{}".format(size // factor, suffix)
+		return "{}B".format(size)
+	return str(size)
+
+
+class Benchmark(object):
+
+	def __init__(self, name, size, unit, phases, input_size=None):
+		super(Benchmark, self).__init__()
+		self.name = name
+		self.size = size
+		self.unit = unit
+		# (phase name, function) pairs.
+		self.phases = phases
+		self.input_size = input_size
+
+	@property
+	def label(self):
+		return "{}/{}".format(self.name, _size_label(self.size, self.unit))
+
+
+class Result(object):
+
+	def __init__(self, benchmark, phase, time, peak=None, blocks=None, input_size=None):
+		super(Result, self).__init__()
+		self.benchmark = benchmark
+		self.phase = phase
+		self.time = time
+		self.peak = peak
+		self.blocks = blocks
+		self.input_size = input_size
+
+	@property
+	def key(self):
+		return "{}:{}".format(self.benchmark, self.phase)
+
+	@property
+	def throughput(self):
+		if self.input_size is None or self.phase != 'parse' or not self.time:
+			return None
+		return self.input_size / self.time
+
+	def to_dict(self):
+		return OrderedDict([
+			('benchmark', self.benchmark),
+			('phase', self.phase),
+			('time', self.time),
+			('peak', self.peak),
+			('blocks', self.blocks),
+			('input_size', self.input_size),
+		])
+
+
+def benchmarks(quick=False):
+	from .swift_parser import parse
+	from .mock_cmd import Mock
+	from .model import InitModel
+	from .vm import UnitTest, BindViewModel
+	from .json_cmd import JSON
+	from .json_schema import Sampling, infer
+	from .api_cmd import API
+	from .template import Template, ProjectInfo
+	from .sink import DirectorySink
+
+	def sizes(values):
+		return values[:-1] if quick else values
+
+	for count in sizes(DECLARATION_COUNTS):
+		text = source_text(count)
+		yield Benchmark("swift_parser", count, 'declarations', [
+			('parse', lambda text=text: parse(text)),
+		], len(text.encode('utf8')))
+	for count in sizes(FUNCTION_COUNTS):
+		text = protocol_text(count)
+		yield Benchmark("mock", count, 'functions', [
+			('parse', lambda text=text: parse(text)),
+			('total', lambda text=text: Mock(text).create_mock()),
+		], len(text.encode('utf8')))
+	for count in sizes(PROPERTY_COUNTS):
+		text = model_text(count)
+		yield Benchmark("init", count, 'properties', [
+			('parse', lambda text=text: parse(text)),
+			('total', lambda text=text: InitModel(text).create_init()),
+		], len(text.encode('utf8')))
+	for count in sizes(PROPERTY_COUNTS):
+		text = view_model_text(count)
+		yield Benchmark("test", count, 'properties', [
+			('parse', lambda text=text: parse(text)),
+			('total', lambda text=text: UnitTest(text).create_tests()),
+		], len(text.encode('utf8')))
+		yield Benchmark("bind", count, 'properties', [
+			('parse', lambda text=text: parse(text)),
+			('total', lambda text=text: BindViewModel(text).create_bind_view_model()),
+		], len(text.encode('utf8')))
+	for size in sizes(JSON_SIZES):
+		text = json_text(size)
+		value = json.loads(text, object_pairs_hook=OrderedDict)
+		yield Benchmark("json", size, 'bytes', [
+			('parse', lambda text=text: json.loads(text, object_pairs_hook=OrderedDict)),
+			('infer', lambda value=value: infer(value, JSON.DATE_REGEX, Sampling())),
+			('total', lambda text=text: JSON("Product", text).create_models()),
+		], len(text.encode('utf8')))
+		del value
+	yield Benchmark("api", 1, 'apis', [
+		('total', lambda: API("GetProducts").create_api()),
+	])
+	project_info = ProjectInfo("Bench", "igen", "igen")
+	options = {'section': False, 'collection': False, 'static': False}
+	output_dir = tempfile.mkdtemp(prefix="igen-bench-")
+	try:
+		yield Benchmark("template_base", 1, 'scenes', [
+			('render', lambda: Template.BaseTemplate("Products", project_info).render()),
+			('write', lambda: Template.BaseTemplate("Products", project_info).create_files(DirectorySink(output_dir, True))),
+		])
+		for count in sizes(PROPERTY_COUNTS):
+			model = Template().parse_model(model_text(count))
+			for name, create in [
+				("template_list", lambda model=model: Template.ListTemplate(model, options, "Products", project_info)),
+				("template_detail", lambda model=model: Template.DetailTemplate(model, options, "Product", project_info)),
+				("template_cells", lambda model=model: Template.DetailTemplate(model, dict(options, single_cell_file=True), "Product", project_info)),
+				("template_static", lambda model=model: Template.StaticDetailTemplate(model, dict(options, static=True), "Product", project_info)),
+			]:
+				yield Benchmark(name, count, 'properties', [
+					('render', lambda create=create: create().render()),
+					('write', lambda create=create: create().create_files(DirectorySink(output_dir, True))),
+				])
+	finally:
+		shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def measure(function, repeat, memory=True):
+	# Returns (best time, peak memory, blocks). Large inputs are only run
+	# once or twice, see MAX_RUN_TIME. What the generators print is
+	# discarded.
+	with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+		return _measure(function, repeat, memory)
+
+def _measure(function, repeat, memory):
+	times = []
+	blocks = None
+	while len(times) < repeat:
+		if blocks is None:
+			gc.collect()
+		before = sys.getallocatedblocks()
+		start = time.perf_counter()
+		# What the phase returns is kept until its blocks are counted.
+		returned = [function()]
+		times.append(time.perf_counter() - start)
+		if blocks is None:
+			blocks = sys.getallocatedblocks() - before
+		del returned[:]
+		if sum(times) > MAX_RUN_TIME:
+			break
+	peak = None
+	if memory:
+		tracemalloc.start()
+		try:
+			function()
+			peak = tracemalloc.get_traced_memory()[1]
+		finally:
+			tracemalloc.stop()
+	return (min(times), peak, blocks)
+
+
+def startup_results(repeat):
+	# The time of 'igen -v' in a new interpreter, and the modules it should
+	# not import.
+	command = [sys.executable, '-m', 'igen', '-v']
+	env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+	times = []
+	for _ in range(max(repeat, 5)):
+		start = time.perf_counter()
+		subprocess.check_output(command, env=env)
+		times.append(time.perf_counter() - start)
+	output = subprocess.run([sys.executable, '-X', 'importtime'] + command[1:], env=env,
+		stdout=subprocess.DEVNULL, stderr=subprocess.PIPE).stderr.decode('utf8')
+	modules = set(line.split('|')[-1].strip() for line in output.splitlines() if line.startswith('import time:'))
+	imported = sorted(name for name in modules if name in STARTUP_MODULES
+		or (name.startswith('igen.') and name not in STARTUP_IGEN_MODULES))
+	return (Result("startup", 'igen -v', min(times)), imported)
+
+
+def format_time(seconds):
+	if seconds >= 1:
+		return "{:.2f}s".format(seconds)
+	if seconds >= 0.001:
+		return "{:.2f}ms".format(seconds * 1000)
+	return "{:.1f}us".format(seconds * 1000 * 1000)
+
+def format_bytes(size):
+	if size is None:
+		return "-"
+	for factor, suffix in [(1024 * 1024, "MB"), (1024, "KB")]:
+		if size >= factor:
+			return "{:.1f}{}".format(size / factor, suffix)
+	return "{}B".format(size)
+
+ROW_FORMAT = "{:<28} {:<8} {:>10} {:>11} {:>10} {:>16}"
+
+def print_result(result):
+	throughput = result.throughput
+	print(ROW_FORMAT.format(
+		result.benchmark,
+		result.phase,
+		format_time(result.time),
+		"-" if throughput is None else format_bytes(throughput) + "/s",
+		format_bytes(result.peak),
+		"-" if result.blocks is None else result.blocks
+	))
+	sys.stdout.flush()
+
+
+def run(quick=False, names=None, repeat=3, memory=True):
+	results = []
+	print(ROW_FORMAT.format("benchmark", "phase", "time", "throughput", "peak", "retained blocks"))
+	working_dir = os.getcwd()
+	# Generators look for the index of the current directory, which would
+	# make the results depend on where the benchmarks are run.
+	bench_dir = tempfile.mkdtemp(prefix="igen-bench-")
+	os.chdir(bench_dir)
+	try:
+		for benchmark in benchmarks(quick):
+			if names and not any(name in benchmark.label for name in names):
+				continue
+			for phase, function in benchmark.phases:
+				elapsed, peak, blocks = measure(function, repeat, memory)
+				result = Result(benchmark.label, phase, elapsed, peak, blocks, benchmark.input_size)
+				print_result(result)
+				results.append(result)
+	finally:
+		os.chdir(working_dir)
+		shutil.rmtree(bench_dir, ignore_errors=True)
+	imported = []
+	if not names or any(name in "startup" for name in names):
+		result, imported = startup_results(repeat)
+		print_result(result)
+		results.append(result)
+		if imported:
+			print("'igen -v' imports {}, which should only be imported by the subcommands that use them.".format(", ".join(imported)))
+	return (results, imported)
+
+
+def save_results(results, path):
+	data = OrderedDict([
+		('version', __version__),
+		('python', platform.python_version()),
+		('platform', platform.platform()),
+		('results', [result.to_dict() for result in results]),
+	])
+	with open(path, "w") as f:
+		json.dump(data, f, indent=2)
+
+
+# 'igen-bench compare' runs a fixed corpus of realistic inputs through the
+# igen command in new processes, and compares the wall time, the import
+# time and the peak RSS of each command with a baseline file. Thresholds
+# are relative to the baseline; smaller differences than the floors are
+# noise and never fail. The threshold of a command that varies more from
+# run to run, in the baseline or in the comparison, is NOISE_FACTOR times
+# its variation, up to NOISE_CAP, and a regression fails only when it is
+# seen again when its command runs a second time.
+
+BASELINE_FILE = os.path.join("bench", "baseline.json")
+
+THRESHOLDS = OrderedDict([
+	('time', 0.25),
+	('import_time', 0.25),
+	('rss', 0.15),
+])
+
+FLOORS = {
+	'time': 0.02,
+	'import_time': 0.005,
+	'rss': 2 * 1024 * 1024,
+}
+
+NOISE_FACTOR = 2
+NOISE_CAP = 0.5
+
+CORPUS_SCENES = 50
+CORPUS_JSON_SIZE = 20 * 1000 * 1000
+CORPUS_FUNCTIONS = 1000
+CORPUS_PROPERTIES = 500
+
+
+class Case(object):
+
+	def __init__(self, name, argv, outputs=None):
+		super(Case, self).__init__()
+		self.name = name
+		self.argv = argv
+		# Removed before every run, so that each run does the same work.
+		self.outputs = outputs or []
+
+
+def write_corpus(directory):
+	# Writes the inputs of the corpus in directory and returns its cases.
+	def write(file_name, content):
+		path = os.path.join(directory, file_name)
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		with open(path, "w", encoding='utf-8') as f:
+			f.write(content)
+		return path
+
+	write(".igen", "[project]\nname = Bench\ndeveloper = igen\ncompany = igen\n\n[io]\nclipboard = stdio\n")
+	scenes = []
+	for i in range(CORPUS_SCENES):
+		model = write("Models/Model{}.swift".format(i), model_text(20).replace("struct Product", "struct Model{}".format(i)))
+		scene = OrderedDict([('type', ['list', 'detail'][i % 2]), ('name', "Scene{}".format(i)), ('model', model)])
+		if i % 4 == 1:
+			scene['static'] = True
+		if i % 4 == 2:
+			scene['section'] = True
+		scenes.append(scene)
+	manifest = write("scenes.json", json.dumps(OrderedDict([('output', "Scenes"), ('scenes', scenes)]), indent=2))
+	products = json.loads(json_text(CORPUS_JSON_SIZE - 1000))
+	dump = json.dumps(OrderedDict([
+		('meta', OrderedDict([('page', 1), ('per_page', len(products)), ('total', len(products))])),
+		('data', products),
+	]))
+	write("dump.json", dump)
+	write("UseCase.swift", protocol_text(CORPUS_FUNCTIONS))
+	write("Product.swift", model_text(CORPUS_PROPERTIES))
+	return [
+		Case("startup", ['-v']),
+		Case("template_batch", ['template', 'batch', manifest, '-j', '1'], ["Scenes"]),
+		Case("json_dump", ['json', 'Product', '--input', 'dump.json', '--output', 'Product.json.swift']),
+		Case("mock_protocol", ['mock', '--input', 'UseCase.swift', '--output', 'UseCaseMock.swift']),
+		Case("init_model", ['init', '--input', 'Product.swift', '--output', 'ProductInit.swift']),
+	]
+
+
+# Runs a command and prints its wall time, peak RSS and exit code. The
+# peak RSS of a process started by a large process can include the memory
+# of its parent, so the commands are started by this small script instead
+# of the benchmark itself.
+_RUN_SCRIPT = """
+import os, sys, time, subprocess
+start = time.perf_counter()
+process = subprocess.Popen(sys.argv[1:], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+rss = None
+if hasattr(os, 'wait4'):
+	_, status, usage = os.wait4(process.pid, 0)
+	code = os.WEXITSTATUS(status) if os.WIFEXITED(status) else 1
+	# Kilobytes on Linux, bytes on macOS.
+	rss = usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+else:
+	code = process.wait()
+print(time.perf_counter() - start, rss, code)
+"""
+
+def _run_command(argv, directory, env):
+	# Returns (wall time, peak RSS in bytes, or None where it is unknown).
+	with tempfile.TemporaryFile() as stderr:
+		output = subprocess.run([sys.executable, '-c', _RUN_SCRIPT] + argv, cwd=directory, env=env,
+			stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=stderr).stdout.decode('utf8').split()
+		if len(output) != 3 or output[2] != '0':
+			stderr.seek(0)
+			print("'{}' failed:".format(" ".join(argv)))
+			print(stderr.read().decode('utf8', 'replace'))
+			exit(1)
+	return (float(output[0]), None if output[1] == 'None' else int(output[1]))
+
+def _import_time(argv, directory, env):
+	# The total of the top-level imports reported by -X importtime.
+	output = subprocess.run([sys.executable, '-X', 'importtime'] + argv[1:], cwd=directory, env=env,
+		stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE).stderr.decode('utf8')
+	total = 0
+	for line in output.splitlines():
+		if not line.startswith('import time:'):
+			continue
+		fields = line.split('|')
+		name = fields[-1]
+		if name.startswith(' ') and not name.startswith('  '):
+			try:
+				total += int(fields[1])
+			except ValueError:
+				pass
+	return total / 1000000.0
+
+
+def run_corpus(repeat=10, names=None):
+	# Returns the best value of each metric of the cases, and its noise:
+	# how much slower the median run is than the best one.
+	results = OrderedDict()
+	noise = OrderedDict()
+	directory = tempfile.mkdtemp(prefix="igen-bench-")
+	try:
+		cases = write_corpus(directory)
+		# The commands use the configuration and the caches of the corpus.
+		env = dict(os.environ, HOME=directory, XDG_CACHE_HOME=os.path.join(directory, ".cache"))
+		for case in cases:
+			if names is not None and case.name not in names:
+				continue
+			argv = [sys.executable, '-m', 'igen'] + case.argv
+			times = []
+			rss_values = []
+			for _ in range(repeat):
+				for output in case.outputs:
+					path = os.path.join(directory, output)
+					if os.path.isdir(path):
+						shutil.rmtree(path)
+					elif os.path.exists(path):
+						os.remove(path)
+				elapsed, rss = _run_command(argv, directory, env)
+				times.append(elapsed)
+				if rss is not None:
+					rss_values.append(rss)
+			import_times = [_import_time(argv, directory, env) for _ in range(repeat)]
+			results[case.name] = OrderedDict([
+				('time', min(times)),
+				('import_time', min(import_times)),
+				('rss', min(rss_values) if rss_values else None),
+			])
+			noise[case.name] = OrderedDict([
+				('time', _noise(times)),
+				('import_time', _noise(import_times)),
+				('rss', _noise(rss_values)),
+			])
+			print("    {:<16} {:>10} {:>10} {:>10}".format(case.name, format_time(results[case.name]['time']),
+				format_time(results[case.name]['import_time']), format_bytes(results[case.name]['rss'])))
+			sys.stdout.flush()
+	finally:
+		shutil.rmtree(directory, ignore_errors=True)
+	return (results, noise)
+
+def _noise(values):
+	if len(values) < 2 or not min(values):
+		return None
+	values = sorted(values)
+	return (values[(len(values) - 1) // 2] - values[0]) / values[0]
+
+def _merge_runs(results, noise, rerun_results, rerun_noise):
+	# Keeps the best value of both runs of a case, and the larger noise.
+	for name, metrics in rerun_results.items():
+		for metric, value in metrics.items():
+			if value is not None and (results[name][metric] is None or value < results[name][metric]):
+				results[name][metric] = value
+			if rerun_noise[name][metric] is not None:
+				noise[name][metric] = max(noise[name][metric] or 0.0, rerun_noise[name][metric])
+
+
+def compare_results(baseline, results, thresholds, baseline_noise=None, noise=None):
+	# Prints the changes from the baseline and returns the regressions.
+	regressions = []
+	formats = {'time': format_time, 'import_time': format_time, 'rss': format_bytes}
+	print("{:<16} {:<12} {:>10} {:>10} {:>8} {:>7}".format("case", "metric", "baseline", "current", "change", "limit"))
+	for name, metrics in results.items():
+		for metric, value in metrics.items():
+			base = baseline.get(name, {}).get(metric)
+			if value is None or base is None:
+				print("{:<16} {:<12} {:>10} {:>10} {:>8}".format(name, metric, formats[metric](base) if base is not None else "-",
+					formats[metric](value) if value is not None else "-", "new" if base is None else "-"))
+				continue
+			variation = max(
+				((baseline_noise or {}).get(name, {}).get(metric) or 0.0),
+				((noise or {}).get(name, {}).get(metric) or 0.0)
+			)
+			limit = max(thresholds[metric], min(NOISE_FACTOR * variation, NOISE_CAP))
+			change = (value - base) / base if base else 0.0
+			regressed = change > limit and value - base > FLOORS[metric]
+			if regressed:
+				regressions.append((name, metric))
+			print("{:<16} {:<12} {:>10} {:>10} {:>+7.1f}% {:>6.0f}%{}".format(name, metric, formats[metric](base),
+				formats[metric](value), change * 100, limit * 100, "  regression" if regressed else ""))
+	return regressions
+
+
+def compare(baseline_file=BASELINE_FILE, update=False, repeat=10, thresholds=None, any_platform=False):
+	baseline = None
+	if os.path.exists(baseline_file):
+		with open(baseline_file) as f:
+			baseline = json.load(f)
+	elif not update:
+		print("The baseline {} does not exist. Create it with 'igen-bench compare --update'.".format(baseline_file))
+		exit(1)
+	if not update and (baseline.get('platform') != platform.platform() or baseline.get('python') != platform.python_version()):
+		print("The baseline was recorded with Python {} on {}, the results are not comparable.".format(
+			baseline.get('python'), baseline.get('platform')))
+		if not any_platform:
+			print("Record a baseline on this machine with 'igen-bench compare --update', or compare anyway with --any-platform.")
+			exit(1)
+	# Thresholds given on the command line override those of the baseline.
+	limits = OrderedDict(THRESHOLDS)
+	if baseline is not None:
+		limits.update(baseline.get('thresholds', {}))
+	limits.update(dict((metric, value) for metric, value in (thresholds or {}).items() if value is not None))
+	print("Running the corpus ({} runs of each command):".format(repeat))
+	results, noise = run_corpus(repeat)
+	if update:
+		data = OrderedDict([
+			('version', __version__),
+			('python', platform.python_version()),
+			('platform', platform.platform()),
+			('thresholds', limits),
+			('cases', results),
+			('noise', noise),
+		])
+		directory = os.path.dirname(baseline_file)
+		if directory:
+			os.makedirs(directory, exist_ok=True)
+		with open(baseline_file, "w") as f:
+			json.dump(data, f, indent=2)
+			f.write("\n")
+		print("The baseline has been saved to {}.".format(baseline_file))
+		return
+	print()
+	regressions = compare_results(baseline.get('cases', {}), results, limits, baseline.get('noise'), noise)
+	print()
+	if regressions:
+		names = set(name for name, metric in regressions)
+		print("Running the commands that regressed again:")
+		rerun_results, rerun_noise = run_corpus(repeat, names)
+		_merge_runs(results, noise, rerun_results, rerun_noise)
+		print()
+		regressions = compare_results(baseline.get('cases', {}),
+			OrderedDict((name, results[name]) for name in results if name in names), limits, baseline.get('noise'), noise)
+		print()
+	if regressions:
+		print("{} regression(s) past the thresholds: {}.".format(len(regressions),
+			", ".join("{} {}".format(name, metric) for name, metric in regressions)))
+		exit(1)
+	print("No regression past the thresholds.")
+
+
+def compare_main(argv):
+	parser = argparse.ArgumentParser(
+		prog='igen-bench compare',
+		description='Run a corpus of realistic inputs through the igen command and compare the wall time, ' \
+			'import time and peak RSS of each command with a baseline. Fails when one of them regresses past its threshold.'
+	)
+	parser.add_argument(
+		'--baseline',
+		metavar='FILE',
+		default=BASELINE_FILE,
+		help="baseline file (default: {})".format(BASELINE_FILE)
+	)
+	parser.add_argument(
+		'--update',
+		action='store_true',
+		help="save the results as the new baseline instead of comparing them"
+	)
+	parser.add_argument(
+		'--any-platform',
+		action='store_true',
+		help="compare with a baseline recorded with another Python version or platform"
+	)
+	parser.add_argument(
+		'-r', '--repeat',
+		type=int,
+		default=10,
+		help="number of runs of each command, the best one is used (default: 10)"
+	)
+	for metric, description in [('time', "wall time"), ('import_time', "import time"), ('rss', "peak RSS")]:
+		parser.add_argument(
+			'--{}-threshold'.format(metric.replace('_', '-')),
+			dest=metric,
+			type=float,
+			metavar='RATIO',
+			help="allowed increase of the {}, e.g. 0.25 for 25%% (default: the baseline's, or {})".format(description, THRESHOLDS[metric])
+		)
+	args = parser.parse_args(argv)
+	thresholds = dict((metric, getattr(args, metric)) for metric in THRESHOLDS)
+	compare(args.baseline, args.update, max(1, args.repeat), thresholds, args.any_platform)
+
+
+def main(argv=None):
+	argv = sys.argv[1:] if argv is None else argv
+	if argv[:1] == ['compare']:
+		compare_main(argv[1:])
+		return
+	parser = argparse.ArgumentParser(
+		prog='igen-bench',
+		description='Benchmark the igen generators on synthetic inputs of increasing size.',
+		epilog="Run 'igen-bench compare -h' to compare the igen command with a baseline."
+	)
+	parser.add_argument(
+		'--quick',
+		action='store_true',
+		help="skip the largest input of each benchmark"
+	)
+	parser.add_argument(
+		'-k', '--filter',
+		action='append',
+		metavar='NAME',
+		help="only run the benchmarks whose name contains NAME, e.g. 'mock' or 'json/10MB' (repeatable)"
+	)
+	parser.add_argument(
+		'-r', '--repeat',
+		type=int,
+		default=3,
+		help="number of timed runs of each phase, the best one is reported (default: 3)"
+	)
+	parser.add_argument(
+		'--no-memory',
+		action='store_true',
+		help="do not measure the peak memory, which runs each phase once more with tracemalloc"
+	)
+	parser.add_argument(
+		'--json',
+		metavar='FILE',
+		help="save the results to FILE"
+	)
+	args = parser.parse_args(argv)
+	results, imported = run(args.quick, args.filter, max(1, args.repeat), not args.no_memory)
+	if args.json:
+		save_results(results, args.json)
+		print("The results have been saved to {}.".format(args.json))
+	if imported:
+		exit(1)
+
+
+if __name__ == '__main__':
+	main()
@@ -16,5 +16,4 @@ class BindViewModelCommand(Command):
 			print(output)
 			print()
 		pasteboard_write(output)
-		print("The result has been copied to the pasteboard.")
 		
\ No newline at end of file
@@ -0,0 +1,83 @@
+# coding=utf-8
+
+import os
+import json
+import hashlib
+from . import metrics
+
+def cache_dir(*parts):
+	base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser("~"), '.cache')
+	path = os.path.join(base, 'igen', *parts)
+	try:
+		os.makedirs(path)
+	except OSError:
+		if not os.path.isdir(path):
+			return None
+	return path
+
+
+class FileCache(object):
+	# Results computed from source files, stored in one JSON file under the
+	# cache directory. An entry is keyed by the file path and reused while
+	# the file has the same size and content hash; the whole cache is
+	# discarded when its version changes.
+
+	def __init__(self, name, version):
+		super(FileCache, self).__init__()
+		directory = cache_dir()
+		self.name = name
+		self.path = os.path.join(directory, name + '.json') if directory else None
+		self.version = version
+		self.entries = {}
+		self.changed = False
+		if self.path is None:
+			return
+		try:
+			with open(self.path) as f:
+				data = json.load(f)
+			if data['version'] == version:
+				self.entries = data['entries']
+		except (OSError, ValueError, KeyError, TypeError):
+			pass
+
+	@staticmethod
+	def digest(data):
+		return hashlib.sha1(data).hexdigest()
+
+	def get(self, path, data):
+		entry = self.entries.get(path)
+		if entry is None or entry['size'] != len(data) or entry['digest'] != FileCache.digest(data):
+			metrics.count('cache.{}.miss'.format(self.name))
+			return None
+		metrics.count('cache.{}.hit'.format(self.name))
+		return entry['value']
+
+	def set(self, path, data, value):
+		self.entries[path] = {
+			'size': len(data),
+			'digest': FileCache.digest(data),
+			'value': value
+		}
+		self.changed = True
+
+	def prune(self, directory, paths):
+		# Removes the entries of the files in directory that are not in paths.
+		prefix = os.path.join(directory, '')
+		for path in [p for p in self.entries if p.startswith(prefix) and p not in paths]:
+			del self.entries[path]
+			self.changed = True
+
+	def save(self):
+		if self.path is None or not self.changed:
+			return
+		data = {
+			'version': self.version,
+			'entries': self.entries
+		}
+		temp_path = self.path + '.tmp'
+		try:
+			with open(temp_path, 'w') as f:
+				json.dump(data, f)
+			os.replace(temp_path, self.path)
+		except OSError:
+			pass
@@ -0,0 +1,86 @@
+# coding=utf-8
+
+import os
+import sys
+import json
+import socket
+import struct
+
+# Thin client of 'igen serve': sends the arguments, the working directory
+# and the environment to the server, then writes what the command prints as
+# it arrives and sends the standard input when the command reads it. Only the
+# standard library is imported, so that it starts quickly. When no server
+# is running, the command is run in this process.
+
+def socket_path():
+	# In the directory of cache_dir(), which is not imported as it imports
+	# the metrics. The server creates the directory.
+	cache = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser("~"), '.cache')
+	return os.environ.get('IGEN_SOCKET') or os.path.join(cache, 'igen', 'serve.sock')
+
+def _read_exactly(connection, size):
+	data = b''
+	while len(data) < size:
+		chunk = connection.recv(size - len(data))
+		if not chunk:
+			raise EOFError()
+		data += chunk
+	return data
+
+def connect(path=None):
+	connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	try:
+		connection.connect(path or socket_path())
+	except OSError:
+		connection.close()
+		return None
+	return connection
+
+def _read_stdin(size):
+	try:
+		return os.read(sys.stdin.fileno(), size)
+	except (OSError, ValueError):
+		return b''
+
+def run(connection, argv):
+	request = {
+		'argv': argv,
+		'cwd': os.getcwd(),
+		'env': dict(os.environ)
+	}
+	connection.sendall(json.dumps(request).encode('utf8') + b'\n')
+	streams = {b'o': sys.stdout.buffer, b'e': sys.stderr.buffer}
+	while True:
+		channel, size = struct.unpack('>cI', _read_exactly(connection, 5))
+		data = _read_exactly(connection, size)
+		if channel == b'x':
+			return int(data)
+		if channel == b'i':
+			stdin = _read_stdin(struct.unpack('>I', data)[0])
+			connection.sendall(struct.pack('>I', len(stdin)) + stdin)
+			continue
+		streams[channel].write(data)
+		streams[channel].flush()
+
+def main():
+	argv = sys.argv[1:]
+	connection = connect() if hasattr(socket, 'AF_UNIX') else None
+	if connection is None:
+		from .__main__ import main as igen_main
+		igen_main(argv)
+		return
+	try:
+		code = run(connection, argv)
+	except BrokenPipeError:
+		# The output was closed by the reader.
+		code = 1
+	except (OSError, EOFError):
+		print("The connection to the igen server was lost.", file=sys.stderr)
+		code = 1
+	finally:
+		connection.close()
+	sys.exit(code)
+
+
+if __name__ == '__main__':
+	main()
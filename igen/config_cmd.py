@@ -1,6 +1,5 @@
 # coding=utf-8
 
-import sys
 import os.path
 import configparser
 from .command import Command
@@ -10,7 +9,9 @@ class ConfigCommand(Command):
 	KEY_VALUES = {
 		'project.name': 'str',
 		'project.developer': 'str',
-		'project.company': 'str'
+		'project.company': 'str',
+		'io.clipboard': 'str',
+		'metrics.enabled': 'bool'
 	}
 
 	@property
@@ -21,7 +22,6 @@ class ConfigCommand(Command):
 		project = input('Enter project name: ')
 		developer = input('Enter developer name: ')
 		company = input('Enter company name: ')
-		content = "\n".join([project, developer, company])
 		config = configparser.ConfigParser()
 		config['project'] = {
 			'name': project,
@@ -45,15 +45,34 @@ class ConfigCommand(Command):
 		except:
 			return None
 
+	def value(self, name):
+		try:
+			config = configparser.ConfigParser()
+			config.read(self.config_file)
+			(section, section_item) = name.split('.')
+			return config[section][section_item]
+		except:
+			return None
+
 	def config(self, name, value):
 		if not name in ConfigCommand.KEY_VALUES:
 			print('Invalid section and/or key.')
 			return
+		if name == 'io.clipboard':
+			from .pb import BACKENDS
+			if not value in BACKENDS:
+				print('Invalid clipboard, use one of: {}.'.format(', '.join(BACKENDS)))
+				return
+		if ConfigCommand.KEY_VALUES[name] == 'bool' and not value in ['true', 'false']:
+			print('Invalid value, use true or false.')
+			return
 		try:
 			config = configparser.ConfigParser()
 			config.read(self.config_file)
 			(section, section_item) = name.split('.')
-			config[section][section_item] = value 
+			if not config.has_section(section):
+				config.add_section(section)
+			config[section][section_item] = value
 			with open(self.config_file, "w") as f:	
 				config.write(f)
 		except Exception as e:
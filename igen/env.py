@@ -0,0 +1,209 @@
+# coding=utf-8
+
+import os
+import json
+import time
+import threading
+import jinja2
+from jinja2 import Environment, BaseLoader, PackageLoader, ModuleLoader, FileSystemBytecodeCache, TemplateNotFound
+from .cache import cache_dir
+from .trace import span, add_span
+from .str_helpers import iter_blocks
+from . import metrics
+
+# One environment per template set ('base', 'list', 'detail', 'commands'),
+# shared by every generator in the process. Compiled templates are persisted
+# in ~/.cache/igen/bytecode; Jinja keys each entry by the SHA-1 of the
+# template source, so editing a template invalidates its cached bytecode.
+#
+# When 'igen templates compile' has been run, templates are loaded from the
+# precompiled Python modules instead, falling back to the source template
+# whenever it has changed since it was compiled.
+
+TEMPLATE_SETS = ['base', 'list', 'detail', 'commands']
+
+_environments = {}
+_lock = threading.Lock()
+
+
+class TracedTemplate(jinja2.Template):
+
+	@classmethod
+	def from_code(cls, *args, **kwargs):
+		metrics.count('templates.loaded')
+		return super(TracedTemplate, cls).from_code(*args, **kwargs)
+
+	@classmethod
+	def from_module_dict(cls, *args, **kwargs):
+		metrics.count('templates.loaded')
+		return super(TracedTemplate, cls).from_module_dict(*args, **kwargs)
+
+	def render(self, *args, **kwargs):
+		with span('render', 'template', template=self.name), metrics.timer('render', self._metrics_key()):
+			return super(TracedTemplate, self).render(*args, **kwargs)
+
+	def generate(self, *args, **kwargs):
+		# Yields the chunks joined in blocks. Only the time spent rendering
+		# the blocks is recorded, not the time the consumer spends between
+		# them, e.g. to write them.
+		blocks = iter_blocks(super(TracedTemplate, self).generate(*args, **kwargs))
+		start = time.perf_counter_ns()
+		elapsed = 0
+		resumed = start
+		for block in blocks:
+			elapsed += time.perf_counter_ns() - resumed
+			yield block
+			resumed = time.perf_counter_ns()
+		elapsed += time.perf_counter_ns() - resumed
+		add_span('render', 'template', start, elapsed, template=self.name)
+		metrics.observe('render', self._metrics_key(), elapsed / 1000000)
+
+	def _metrics_key(self):
+		# Templates of different sets have the same name.
+		template_set = self.environment.template_set
+		return "{}/{}".format(template_set, self.name) if template_set else self.name
+
+
+class TracedEnvironment(Environment):
+
+	template_class = TracedTemplate
+	template_set = None
+
+	def get_template(self, name, *args, **kwargs):
+		with span('load_template', 'template', template=name):
+			return super(TracedEnvironment, self).get_template(name, *args, **kwargs)
+
+
+class MeteredBytecodeCache(FileSystemBytecodeCache):
+
+	def load_bytecode(self, bucket):
+		super(MeteredBytecodeCache, self).load_bytecode(bucket)
+		metrics.count('cache.templates.miss' if bucket.code is None else 'cache.templates.hit')
+
+
+class PrecompiledLoader(BaseLoader):
+
+	def __init__(self, template_set, compiled_path, manifest):
+		super(PrecompiledLoader, self).__init__()
+		self.source_loader = PackageLoader('igen_templates', template_set)
+		self.module_loader = ModuleLoader(compiled_path)
+		self.source_dir = template_dir(template_set)
+		self.sources = manifest['sources']
+
+	def get_source(self, environment, template):
+		return self.source_loader.get_source(environment, template)
+
+	def list_templates(self):
+		return self.source_loader.list_templates()
+
+	def load(self, environment, name, globals=None):
+		if self._is_fresh(name):
+			try:
+				template = self.module_loader.load(environment, name, globals)
+				metrics.count('cache.templates.hit')
+				return template
+			except TemplateNotFound:
+				pass
+		return self.source_loader.load(environment, name, globals)
+
+	def _is_fresh(self, name):
+		try:
+			stat = os.stat(os.path.join(self.source_dir, name))
+		except OSError:
+			return False
+		return self.sources.get(name) == [stat.st_mtime_ns, stat.st_size]
+
+
+def template_dir(template_set):
+	import igen_templates
+	return os.path.join(os.path.dirname(os.path.abspath(igen_templates.__file__)), template_set)
+
+def compiled_dir():
+	return cache_dir('compiled')
+
+def _manifest_path(directory, template_set):
+	return os.path.join(directory, template_set + '.json')
+
+def _load_manifest(template_set):
+	directory = compiled_dir()
+	if directory is None:
+		return None
+	try:
+		with open(_manifest_path(directory, template_set)) as f:
+			manifest = json.load(f)
+	except (OSError, ValueError):
+		return None
+	if manifest.get('jinja2') != jinja2.__version__ or not os.path.exists(manifest.get('path', '')):
+		return None
+	return manifest
+
+def _bytecode_cache():
+	directory = cache_dir('bytecode')
+	if directory is None:
+		return None
+	return MeteredBytecodeCache(directory, '%s.cache')
+
+def _loader(template_set):
+	manifest = _load_manifest(template_set)
+	if manifest is None:
+		return PackageLoader('igen_templates', template_set)
+	return PrecompiledLoader(template_set, manifest['path'], manifest)
+
+def create_env(loader, bytecode_cache=None):
+	return TracedEnvironment(
+		loader=loader,
+		trim_blocks=True,
+		lstrip_blocks=True,
+		bytecode_cache=bytecode_cache
+	)
+
+def get_env(template_set):
+	env = _environments.get(template_set)
+	if env is not None:
+		return env
+	with _lock:
+		env = _environments.get(template_set)
+		if env is None:
+			with span('create_env', 'template', template_set=template_set):
+				env = create_env(_loader(template_set), _bytecode_cache())
+				env.template_set = template_set
+			_environments[template_set] = env
+	return env
+
+def compile_templates(template_set, zip=False):
+	directory = compiled_dir()
+	if directory is None:
+		raise OSError("Cannot create the igen cache directory.")
+	remove_compiled_templates(template_set)
+	env = create_env(PackageLoader('igen_templates', template_set))
+	source_dir = template_dir(template_set)
+	sources = {}
+	for name in env.list_templates():
+		stat = os.stat(os.path.join(source_dir, name))
+		sources[name] = [stat.st_mtime_ns, stat.st_size]
+	if zip:
+		path = os.path.join(directory, template_set + '.zip')
+		env.compile_templates(path, zip='deflated', log_function=None, ignore_errors=False)
+	else:
+		path = os.path.join(directory, template_set)
+		env.compile_templates(path, zip=None, log_function=None, ignore_errors=False)
+	manifest = {
+		'jinja2': jinja2.__version__,
+		'path': path,
+		'sources': sources
+	}
+	with open(_manifest_path(directory, template_set), 'w') as f:
+		json.dump(manifest, f, indent=1, sort_keys=True)
+	_environments.pop(template_set, None)
+	return (path, len(sources))
+
+def remove_compiled_templates(template_set):
+	import shutil
+	directory = compiled_dir()
+	if directory is None:
+		return
+	for path in [_manifest_path(directory, template_set), os.path.join(directory, template_set + '.zip')]:
+		if os.path.exists(path):
+			os.remove(path)
+	shutil.rmtree(os.path.join(directory, template_set), ignore_errors=True)
+	_environments.pop(template_set, None)
@@ -0,0 +1,32 @@
+# coding=utf-8
+
+import os
+import time
+from .symbol_index import SymbolIndex
+from .command import Command
+
+class IndexCommand(Command):
+
+	def __init__(self, directory=None, jobs=None):
+		super(IndexCommand, self).__init__()
+		self.directory = directory
+		self.jobs = jobs
+
+	def update_index(self):
+		# Without a directory, the index of the current project is updated,
+		# or a new one is created in the current directory.
+		if self.directory is not None:
+			if not os.path.isdir(self.directory):
+				print("The directory {} does not exist.".format(self.directory))
+				exit(1)
+			index = SymbolIndex(os.path.join(self.directory, SymbolIndex.FILE_NAME))
+		else:
+			index = SymbolIndex.find() or SymbolIndex(SymbolIndex.FILE_NAME)
+		start = time.time()
+		try:
+			parsed, removed, total = index.update(self.jobs)
+		finally:
+			index.close()
+		print("Indexed {} Swift files in {} ({} parsed, {} removed) in {:.2f}s.".format(
+			total, index.root, parsed, removed, time.time() - start
+		))
@@ -17,5 +17,4 @@ class InitCommand(Command):
 			print(output)
 			print()
 		pasteboard_write(output)
-		print("The result has been copied to the pasteboard.")
 
@@ -1,28 +1,57 @@
 # coding=utf-8
 
+import io
+import os
+import sys
 import json
-import re
+import stat
 from collections import OrderedDict
-from jinja2 import Environment, PackageLoader
-from .pb import pasteboard_write
+from .env import get_env
+from .pb import pasteboard_write, pasteboard_write_chunks
 from .constants import SWIFT_TYPES_DEFAULT_VALUES, SWIFT_TYPES
 from .str_helpers import snake_to_camel, plural_to_singular
+from .json_stream import iter_events
+from .json_schema import Sampling, DepthLimitError, MAX_DEPTH, infer, infer_events
+from .symbol_index import default_value
+from .trace import span
 from .command import Command
 
+# Inputs up to this number of characters are decoded in memory, which is
+# faster than reading them incrementally.
+IN_MEMORY_SIZE = 4 * 1024 * 1024
+
 class JSONCommand(Command):
-	def __init__(self, model_name, json_text):
+	def __init__(self, model_name, json_text=None, json_file=None, sampling=None, max_depth=MAX_DEPTH, stream=False):
 		super(JSONCommand, self).__init__()
 		self.model_name = model_name
 		self.json_text = json_text
+		self.json_file = json_file
+		self.sampling = sampling
+		self.max_depth = max_depth
+		self.in_memory_size = 0 if stream else IN_MEMORY_SIZE
 
 	def create_models(self, print_result):
-		output = JSON(self.model_name, self.json_text).create_models()
+		# The models are rendered while they are written, unless they are
+		# also printed.
+		if self.json_file is None:
+			chunks = JSON(self.model_name, self.json_text, self.sampling, self.max_depth).generate_models()
+		elif self.json_file == '-':
+			chunks = JSON(self.model_name, sampling=self.sampling, max_depth=self.max_depth).generate_models_from_stream(sys.stdin, self.in_memory_size)
+		else:
+			try:
+				with open(self.json_file, encoding='utf-8') as f:
+					chunks = JSON(self.model_name, sampling=self.sampling, max_depth=self.max_depth).generate_models_from_stream(f, self.in_memory_size)
+			except OSError as e:
+				print(e)
+				exit(1)
 		if print_result:
+			output = "".join(chunks)
 			print()
 			print(output)
 			print()
-		pasteboard_write(output)
-		print("The result has been copied to the pasteboard.")
+			pasteboard_write(output)
+		else:
+			pasteboard_write_chunks(chunks)
 
 
 class JSON(object):
@@ -72,7 +101,7 @@ class JSON(object):
 			elif self.type_name in SWIFT_TYPES_DEFAULT_VALUES:
 				value = SWIFT_TYPES_DEFAULT_VALUES[self.type_name]
 			else:
-				value = "{}()".format(self.type_name)
+				value = default_value(self.type_name)
 			return value
 
 	class Model(object):
@@ -81,11 +110,7 @@ class JSON(object):
 			self.properties = properties
 
 		def model(self):
-			env = Environment(
-				loader=PackageLoader('igen_templates', 'commands'),
-				trim_blocks=True,
-				lstrip_blocks=True
-			)
+			env = get_env('commands')
 			template = env.get_template("JSON.swift")
 			content = template.render(
 				name=self.name,
@@ -96,57 +121,216 @@ class JSON(object):
 		def __str__(self):
 			return self.model()
 
-	def __init__(self, model_name, json_text):
+	def __init__(self, model_name, json_text=None, sampling=None, max_depth=MAX_DEPTH):
 		self.model_name = model_name
 		self.json_text = json_text
+		self.sampling = sampling or Sampling()
+		self.max_depth = max_depth
 
 	def create_models(self):
+		return "".join(self.generate_models())
+
+	def create_models_from_stream(self, stream):
+		return "".join(self.generate_models_from_stream(stream))
+
+	def generate_models(self):
+		# Returns the chunks of the models, which are rendered as they are
+		# consumed.
 		try:
-			dictionary = json.loads(self.json_text, object_pairs_hook=OrderedDict)
-			models = []
-			self._extract_model(self.model_name, dictionary, models)
-			output = "\n\n".join([model.__str__() for model in models])
-			return output
+			schema = self._infer_text(self.json_text)
+			models = self._extract_root_models(schema)
+		except DepthLimitError as e:
+			print(e)
+			exit(1)
 		except:
 			print("The JSON in the pasteboard is invalid.")
 			exit(1)
+		return self._generate_models(models)
+
+	def generate_models_from_stream(self, stream, in_memory_size=0):
+		# A payload larger than in_memory_size is read incrementally and
+		# only its schema is kept in memory.
+		try:
+			# The start of a larger file is not read to find its size.
+			size = _file_size(stream)
+			text = ''
+			if in_memory_size and (size is None or size <= in_memory_size):
+				text = stream.read(in_memory_size + 1)
+			if len(text) > in_memory_size:
+				schema = self._infer_stream(stream, text)
+			elif text:
+				schema = self._infer_text(text)
+			else:
+				schema = self._infer_stream(stream)
+			models = self._extract_root_models(schema)
+		except DepthLimitError as e:
+			print(e)
+			exit(1)
+		except:
+			print("The JSON in {} is invalid.".format(getattr(stream, 'name', 'the input')))
+			exit(1)
+		return self._generate_models(models)
+
+	def _infer_text(self, text):
+		try:
+			with span('parse_json', 'parse'):
+				dictionary = json.loads(text, object_pairs_hook=OrderedDict)
+		except RecursionError:
+			# Too deep for the json module: read it with the streaming
+			# reader, which does not recurse.
+			return self._infer_stream(io.StringIO(text))
+		with span('infer_schema', 'parse'):
+			return infer(dictionary, JSON.DATE_REGEX, self.sampling, self.max_depth)
 
-	def _extract_model(self, name, dictionary, models):
+	def _infer_stream(self, stream, prefix=''):
+		# Reading and parsing the stream are part of the inference. prefix
+		# is the text already read from it.
+		with span('infer_schema', 'parse'):
+			return infer_events(iter_events(stream, prefix=prefix), JSON.DATE_REGEX, self.sampling, self.max_depth)
+
+	def _extract_root_models(self, schema):
+		# A top-level array is treated as a list of models.
+		if schema.kinds == {'array'} and schema.element is not None:
+			schema = schema.element
+		if schema.kinds != {'object'}:
+			raise ValueError("The JSON is not an object.")
+		models = []
+		self._shapes = {}
+		self._names = set([self.model_name])
+		self._name_indexes = {}
+		with span('extract_models', 'parse'):
+			self._extract_models(self.model_name, schema, models)
+		return models
+
+	def _generate_models(self, models):
+		# Models are small, but there can be thousands of them.
+		with span('render_models', 'template', models=len(models)):
+			for i, model in enumerate(models):
+				if i > 0:
+					yield "\n\n"
+				yield model.model()
+
+	def _extract_models(self, name, schema, models):
+		# _extract_model() is a generator that yields a (name, schema) pair
+		# for each nested model it needs and receives the name of that model
+		# back. Nested models are extracted here with an explicit stack, so
+		# deeply nested documents do not hit the recursion limit.
+		stack = [self._extract_model(name, schema, models, is_root=True)]
+		model_name = None
+		while stack:
+			try:
+				name, schema = stack[-1].send(model_name)
+			except StopIteration as e:
+				stack.pop()
+				model_name = e.value
+				continue
+			stack.append(self._extract_model(name, schema, models))
+			model_name = None
+		return model_name
+
+	def _extract_model(self, name, schema, models, is_root=False):
 		properties = []
-		for key in dictionary.keys():
+		for key, value in schema.fields.items():
 			var_name = snake_to_camel(key)
-			value = dictionary[key]
-			type_name = type(value).__name__
-			if type_name == "OrderedDict":
-				var_type = var_name.title() + "?"
-				self._extract_model(var_name.title(), value, models)
-			elif type_name == "list":
-				singular_var_name = plural_to_singular(var_name)
-				var_type = "[{}]".format(singular_var_name.title())
-				if len(value) > 0:
-					self._extract_model(singular_var_name.title(), value[0], models)
-				else:
-					var_type = "[Any]"
-			else:
-				var_type = JSON.JSON_TO_SWIFT_TYPES[type_name]
-				if var_type == "String":
-					if re.match(JSON.DATE_REGEX, value):
-						var_type = "Date"
-				if var_type == "Any?":
-					if var_name.endswith("Url") \
-						or "name" in var_name.lower() \
-						or "email" in var_name.lower() \
-						or var_name.endswith("Key") \
-						or var_name.endswith("Token"):
-						var_type = "String?"
-					elif "time" in var_name.lower() \
-						or "date" in var_name.lower() \
-						or var_name.endswith("At") \
-						or "birthday" in var_name.lower():
-						var_type = "Date?"
-					elif var_name.endswith("Id"):
-						var_type = "Int?"
+			var_type = yield from self._type_name(var_name, value)
+			if schema.is_optional(key) and not var_type.endswith("?"):
+				var_type += "?"
 			property = JSON.Property(key, var_name, var_type)
 			properties.append(property)
+		# Nested objects with the same keys and types, up to optionality,
+		# share one model; a property is optional if it is in either shape.
+		shape = tuple((p.raw_name, p.type_name.rstrip("?")) for p in properties)
+		model = self._shapes.get(shape)
+		if model is not None and not is_root:
+			for existing, property in zip(model.properties, properties):
+				if property.is_optional and not existing.is_optional:
+					existing.type_name = property.type_name
+			return model.name
+		if not is_root:
+			name = self._unique_model_name(name)
 		model = JSON.Model(name, properties)
+		self._names.add(name)
+		self._shapes.setdefault(shape, model)
 		models.append(model)
+		return model.name
+
+	def _unique_model_name(self, name):
+		# The next suffix to try is kept for each name, so that many models
+		# with the same name do not probe the same suffixes again.
+		unique_name = name
+		index = self._name_indexes.get(name, 2)
+		while unique_name in self._names:
+			unique_name = "{}{}".format(name, index)
+			index += 1
+		self._name_indexes[name] = index
+		return unique_name
+
+	def _type_name(self, var_name, schema):
+		kinds = schema.kinds - {'null'}
+		if not kinds:
+			return self._null_type_name(var_name)
+		if kinds == {'object'}:
+			model_name = yield (var_name.title(), schema)
+			return model_name + "?"
+		if kinds == {'array'}:
+			singular_var_name = plural_to_singular(var_name)
+			element_type_name = yield from self._element_type_name(singular_var_name, schema.element)
+			return "[{}]".format(element_type_name)
+		return self._scalar_type_name(kinds)
+
+	def _element_type_name(self, var_name, schema):
+		# Nested arrays are unwrapped down to their innermost element type,
+		# then wrapped back, innermost first.
+		levels = []
+		while schema is not None and schema.kinds - {'null'} == {'array'}:
+			levels.append('null' in schema.kinds)
+			schema = schema.element
+		if schema is None or not schema.kinds - {'null'}:
+			type_name = "Any"
+		else:
+			kinds = schema.kinds - {'null'}
+			if kinds == {'object'}:
+				type_name = yield (var_name.title(), schema)
+			else:
+				type_name = self._scalar_type_name(kinds)
+			if 'null' in schema.kinds:
+				type_name += "?"
+		for is_optional in reversed(levels):
+			type_name = "[{}]".format(type_name)
+			if is_optional:
+				type_name += "?"
+		return type_name
+
+	def _scalar_type_name(self, kinds):
+		if kinds <= {'int', 'float'}:
+			return "Double" if 'float' in kinds else "Int"
+		if kinds <= {'str', 'date'}:
+			return "Date" if kinds == {'date'} else "String"
+		if len(kinds) == 1 and kinds <= set(JSON.JSON_TO_SWIFT_TYPES):
+			return JSON.JSON_TO_SWIFT_TYPES[kinds.pop()]
+		return "Any"
+
+	def _null_type_name(self, var_name):
+		if var_name.endswith("Url") \
+			or "name" in var_name.lower() \
+			or "email" in var_name.lower() \
+			or var_name.endswith("Key") \
+			or var_name.endswith("Token"):
+			return "String?"
+		elif "time" in var_name.lower() \
+			or "date" in var_name.lower() \
+			or var_name.endswith("At") \
+			or "birthday" in var_name.lower():
+			return "Date?"
+		elif var_name.endswith("Id"):
+			return "Int?"
+		return "Any?"
+
+
+def _file_size(stream):
+	# The size of a regular file, or None for pipes and the terminal.
+	try:
+		status = os.fstat(stream.fileno())
+	except (OSError, ValueError):
+		return None
+	return status.st_size if stat.S_ISREG(status.st_mode) else None
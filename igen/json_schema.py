@@ -0,0 +1,283 @@
+# coding=utf-8
+
+import re
+import json
+import time
+import random
+from collections import OrderedDict
+
+# Schema inference for JSON payloads. A Schema records every kind of value
+# seen at one position of the document ('object', 'array', 'int', 'float',
+# 'bool', 'str', 'date' and 'null'); objects keep how many times each key
+# was present, and arrays merge all of their sampled elements into a single
+# element schema.
+#
+# All traversals use explicit stacks, so the nesting depth of a document is
+# only bounded by max_depth, not by the interpreter's recursion limit.
+
+MAX_DEPTH = 10000
+
+
+class DepthLimitError(ValueError):
+
+	def __init__(self, max_depth, path):
+		super(DepthLimitError, self).__init__(
+			"The JSON is nested more than {} levels deep at {}. Use --max-depth to raise the limit.".format(max_depth, path)
+		)
+		self.max_depth = max_depth
+		self.path = path
+
+
+def _format_path(segments):
+	# Deep paths are shortened to their first and last segments.
+	if len(segments) > 12:
+		segments = segments[:6] + ["..."] + segments[-5:]
+	return "$" + "".join(segments)
+
+def _path_segment(key):
+	return "[{}]".format(key) if isinstance(key, int) else ".{}".format(key)
+
+
+class Sampling(object):
+	FIRST = "first"
+	RESERVOIR = "reservoir"
+
+	def __init__(self, limit=1000, strategy=FIRST, time_budget=None, seed=None):
+		super(Sampling, self).__init__()
+		self.limit = limit or None
+		self.strategy = strategy
+		self.deadline = None if time_budget is None else time.monotonic() + time_budget
+		self.random = random.Random(seed)
+
+	@property
+	def expired(self):
+		return self.deadline is not None and time.monotonic() > self.deadline
+
+	def sample(self, values):
+		# At least one element is always sampled so that the element type is
+		# known; once the time budget is spent, only the first one is.
+		if not values:
+			return values
+		if self.expired:
+			return values[:1]
+		if self.limit is None or len(values) <= self.limit:
+			return values
+		if self.strategy == Sampling.RESERVOIR:
+			indexes = sorted(self.random.sample(range(len(values)), self.limit))
+			return [values[i] for i in indexes]
+		return values[:self.limit]
+
+
+class Schema(object):
+
+	def __init__(self):
+		super(Schema, self).__init__()
+		self.kinds = set()
+		self.objects = 0
+		self.fields = OrderedDict()
+		self.field_counts = {}
+		self.element = None
+
+	def is_optional(self, key):
+		return self.field_counts[key] < self.objects or 'null' in self.fields[key].kinds
+
+	def field(self, key):
+		schema = self.fields.get(key)
+		if schema is None:
+			schema = self.fields[key] = Schema()
+			self.field_counts[key] = 0
+		self.field_counts[key] += 1
+		return schema
+
+	def merge(self, other):
+		pending = [(self, other)]
+		while pending:
+			target, source = pending.pop()
+			target.kinds |= source.kinds
+			target.objects += source.objects
+			for key, schema in source.fields.items():
+				if key in target.fields:
+					pending.append((target.fields[key], schema))
+					target.field_counts[key] += source.field_counts[key]
+				else:
+					target.fields[key] = schema
+					target.field_counts[key] = source.field_counts[key]
+			if source.element is not None:
+				if target.element is None:
+					target.element = source.element
+				else:
+					pending.append((target.element, source.element))
+		return self
+
+
+def scalar_kind(value, date_regex):
+	if value is None:
+		return 'null'
+	kind = type(value).__name__
+	if kind == 'str' and re.match(date_regex, value):
+		return 'date'
+	return kind
+
+def infer(value, date_regex, sampling=None, max_depth=MAX_DEPTH):
+	# Values are visited depth first, in document order, so that keys are
+	# recorded in the same order as in the payload. Each pending entry keeps
+	# a link to its parent's path, which is only expanded for diagnostics.
+	sampling = sampling or Sampling()
+	root = Schema()
+	pending = [(root, value, 0, None)]
+	while pending:
+		schema, value, depth, path = pending.pop()
+		if isinstance(value, dict):
+			if depth >= max_depth:
+				raise DepthLimitError(max_depth, _format_path(_expand_path(path)))
+			schema.kinds.add('object')
+			schema.objects += 1
+			children = [(schema.field(key), item, depth + 1, (path, key)) for key, item in value.items()]
+			pending.extend(reversed(children))
+		elif isinstance(value, list):
+			if depth >= max_depth:
+				raise DepthLimitError(max_depth, _format_path(_expand_path(path)))
+			schema.kinds.add('array')
+			if value and schema.element is None:
+				schema.element = Schema()
+			children = [(schema.element, item, depth + 1, (path, index)) for index, item in enumerate(sampling.sample(value))]
+			pending.extend(reversed(children))
+		else:
+			schema.kinds.add(scalar_kind(value, date_regex))
+	return root
+
+def _expand_path(path):
+	segments = []
+	while path is not None:
+		path, key = path
+		segments.append(_path_segment(key))
+	segments.reverse()
+	return segments
+
+def _string_kind(token, date_regex):
+	# Only a short prefix of the raw token is needed for the date check.
+	prefix = token[1:min(33, len(token) - 1)]
+	if '\\' in prefix:
+		prefix = json.loads(token)[:32]
+	return 'date' if re.match(date_regex, prefix) else 'str'
+
+def _number_kind(token):
+	if '.' in token or 'e' in token or 'E' in token:
+		return 'float'
+	return 'int'
+
+_LITERAL_KINDS = {
+	True: 'bool',
+	False: 'bool',
+	None: 'null'
+}
+
+
+class _ArrayFrame(object):
+	# Array being read from an event stream: decides which elements are
+	# observed and where their schema goes.
+
+	def __init__(self, schema, sampling):
+		super(_ArrayFrame, self).__init__()
+		self.schema = schema
+		self.sampling = sampling
+		self.index = 0
+		self.slots = [] if sampling.strategy == Sampling.RESERVOIR and sampling.limit else None
+
+	def next_element(self):
+		# Returns the schema that receives the next element, or None when
+		# the element is not sampled.
+		index = self.index
+		self.index += 1
+		if self.schema.element is None:
+			self.schema.element = Schema()
+		if index > 0 and self.sampling.expired:
+			return None
+		limit = self.sampling.limit
+		if self.slots is None:
+			if limit is not None and index >= limit:
+				return None
+			return self.schema.element
+		if index < limit:
+			self.slots.append(Schema())
+			return self.slots[-1]
+		slot = self.sampling.random.randint(0, index)
+		if slot >= limit:
+			return None
+		self.slots[slot] = Schema()
+		return self.slots[slot]
+
+	def skips_rest(self):
+		# Whether the elements after one that is not sampled are not sampled
+		# either.
+		return self.slots is None or self.sampling.expired
+
+	def close(self):
+		for slot in self.slots or []:
+			self.schema.element.merge(slot)
+
+
+def infer_events(events, date_regex, sampling=None, max_depth=MAX_DEPTH):
+	# Same as infer() for a stream of json_stream.iter_events() events. Values
+	# are classified as they are read and never stored. The reader skips the
+	# elements that are not sampled; other event streams are read and the
+	# events of those elements discarded.
+	sampling = sampling or Sampling()
+	skip = getattr(events, 'skip', None)
+	root = Schema()
+	stack = []
+	keys = []
+	target = root
+	skip_depth = 0
+	for event, value in events:
+		if skip_depth:
+			if event in ('start_map', 'start_array'):
+				skip_depth += 1
+			elif event in ('end_map', 'end_array'):
+				skip_depth -= 1
+			continue
+		if event in ('end_map', 'end_array'):
+			frame = stack.pop()
+			keys.pop()
+			if event == 'end_array':
+				frame.close()
+			continue
+		if event == 'map_key':
+			target = stack[-1].field(value)
+			keys[-1] = value
+			continue
+		if stack and isinstance(stack[-1], _ArrayFrame):
+			frame = stack[-1]
+			keys[-1] = frame.index
+			target = frame.next_element()
+			if target is None:
+				is_container = event in ('start_map', 'start_array')
+				if skip is None:
+					if is_container:
+						skip_depth = 1
+				elif frame.skips_rest():
+					skip(2 if is_container else 1)
+					stack.pop()
+					keys.pop()
+					frame.close()
+				elif is_container:
+					skip(1)
+				continue
+		if event in ('start_map', 'start_array') and len(stack) >= max_depth:
+			raise DepthLimitError(max_depth, _format_path([_path_segment(key) for key in keys]))
+		if event == 'start_map':
+			target.kinds.add('object')
+			target.objects += 1
+			stack.append(target)
+			keys.append(None)
+		elif event == 'start_array':
+			target.kinds.add('array')
+			stack.append(_ArrayFrame(target, sampling))
+			keys.append(None)
+		elif event == 'string':
+			target.kinds.add(_string_kind(value, date_regex))
+		elif event == 'number':
+			target.kinds.add(_number_kind(value))
+		else:
+			target.kinds.add(_LITERAL_KINDS[value])
+	return root
@@ -0,0 +1,206 @@
+# coding=utf-8
+
+import io
+import re
+import json
+
+# Incremental JSON reader used to infer models from payloads that are too
+# large to decode in memory: iter_events() tokenizes a text stream chunk by
+# chunk and yields parse events (see json_schema.infer_events()). The
+# consumer can call skip() to pass over the rest of a value it does not
+# need, which is only scanned for its brackets and strings.
+
+CHUNK_SIZE = 1 << 16
+
+# Splits a text in whitespace and tokens: strings, punctuation, and the
+# words that are numbers or literals. A lone quote starts an unterminated
+# string.
+_SPLIT_REGEX = re.compile(r'''("[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}:,]|[^ \t\n\r\[\]{}:,"]+|")''')
+
+_NUMBER_REGEX = re.compile(r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?')
+
+# The text up to the next bracket, or up to an unterminated string.
+_SKIP_REGEX = re.compile(r'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*')
+
+_LITERALS = {
+	'true': True,
+	'false': False,
+	'null': None
+}
+
+_DEPTHS = {
+	'[': 1,
+	'{': 1,
+	']': -1,
+	'}': -1
+}
+
+def _split(buffer, eof):
+	# Returns the tokens of buffer and the text at its end that may be the
+	# start of a token continued in the next chunk: an unterminated string,
+	# or a number or literal that ends the buffer.
+	parts = _SPLIT_REGEX.split(buffer)
+	if eof:
+		return (parts[1::2], '')
+	try:
+		index = parts.index('"')
+	except ValueError:
+		index = len(parts) - 2
+		if index < 1 or parts[-1] or parts[index][0] in '"[]{}:,':
+			return (parts[1::2], '')
+	return (parts[1:index:2], "".join(parts[index:]))
+
+def _skip_containers(buffer, pos, depth):
+	# Returns the position after the depth-th closing bracket and 0, or the
+	# position where more text is needed and the depth left. The skipped
+	# text is not validated.
+	match = _SKIP_REGEX.match
+	length = len(buffer)
+	while True:
+		pos = match(buffer, pos).end()
+		if pos >= length or buffer[pos] == '"':
+			return (pos, depth)
+		depth += 1 if buffer[pos] in '[{' else -1
+		pos += 1
+		if depth == 0:
+			return (pos, 0)
+
+
+class EventReader(object):
+
+	def __init__(self, stream, chunk_size=CHUNK_SIZE, prefix=''):
+		super(EventReader, self).__init__()
+		self.stream = stream
+		self.chunk_size = chunk_size
+		self.prefix = prefix
+		self.skipped = 0
+
+	def __iter__(self):
+		return self._events()
+
+	def skip(self, depth=1):
+		# Skips the rest of the depth innermost containers: the next event
+		# follows the closing bracket of the depth-th one, and the events of
+		# the skipped containers, including their end, are not yielded.
+		self.skipped = depth
+
+	def _events(self):
+		# Yields (event, value) pairs: ('start_map', None), ('map_key', key),
+		# ('end_map', None), ('start_array', None), ('end_array', None) and
+		# ('string', raw_token), ('number', raw_token), ('literal', value).
+		#
+		# Each chunk is split in tokens at once. The text at its end that may
+		# continue in the next chunk is kept for the next split.
+		stream = self.stream
+		# The prefix is read in chunks too, so that it is not split at once.
+		prefix = io.StringIO(self.prefix)
+		self.prefix = None
+		def read(size):
+			return prefix.read(size) or stream.read(size)
+		text = ''
+		eof = False
+		read_size = self.chunk_size
+		containers = []
+		state = 'value'
+		while not eof:
+			chunk = read(read_size)
+			if chunk:
+				text += chunk
+			else:
+				eof = True
+			tokens, tail = _split(text, eof)
+			# Read bigger chunks while a single token does not fit in them.
+			read_size = read_size * 2 if not tokens and tail else self.chunk_size
+			text = tail
+			tokens = iter(tokens)
+			for token in tokens:
+				if state == 'done':
+					raise ValueError("Extra data after the JSON document.")
+				first = token[0]
+				if state in ('key', 'key_or_end'):
+					if first == '"' and len(token) > 1:
+						state = 'colon'
+						yield ('map_key', token[1:-1] if '\\' not in token else json.loads(token))
+						continue
+					if token != '}' or state == 'key':
+						raise ValueError("Expected a key, got: {}".format(token[:20]))
+				elif state == 'colon':
+					if token != ':':
+						raise ValueError("Expected ':', got: {}".format(token[:20]))
+					state = 'value'
+					continue
+				elif state == 'comma_or_end' and token == ',':
+					state = 'key' if containers[-1] == '{' else 'value'
+					continue
+				if token in ('}', ']'):
+					if state not in ('comma_or_end', 'key_or_end', 'value_or_end') \
+						or containers[-1] != ('{' if token == '}' else '['):
+						raise ValueError("Unexpected token: {}".format(token))
+					containers.pop()
+					yield ('end_map' if token == '}' else 'end_array', None)
+				elif state not in ('value', 'value_or_end'):
+					raise ValueError("Unexpected token: {}".format(token[:20]))
+				elif token == '{':
+					containers.append(token)
+					state = 'key_or_end'
+					yield ('start_map', None)
+				elif token == '[':
+					containers.append(token)
+					state = 'value_or_end'
+					yield ('start_array', None)
+				elif first == '"':
+					if len(token) == 1:
+						raise ValueError("Unterminated string.")
+					yield ('string', token)
+				elif first in '-0123456789' and _NUMBER_REGEX.fullmatch(token):
+					yield ('number', token)
+				elif token in _LITERALS:
+					yield ('literal', _LITERALS[token])
+				else:
+					raise ValueError("Invalid JSON near: {!r}".format(token[:20]))
+				if token in ('{', '['):
+					if not self.skipped:
+						continue
+				elif not self.skipped:
+					state = 'comma_or_end' if containers else 'done'
+					continue
+				# The consumer skips the rest of self.skipped containers: first
+				# in the tokens of the chunk, then in the text that follows.
+				depth = self.skipped
+				self.skipped = 0
+				if depth > len(containers):
+					raise ValueError("Cannot skip {} containers.".format(depth))
+				del containers[len(containers) - depth:]
+				state = 'comma_or_end' if containers else 'done'
+				for token in tokens:
+					depth += _DEPTHS.get(token, 0)
+					if depth == 0:
+						break
+				else:
+					pos = 0
+					while True:
+						pos, depth = _skip_containers(text, pos, depth)
+						if depth == 0:
+							break
+						if eof:
+							raise ValueError("Unexpected end of the JSON document.")
+						# Read bigger chunks while a string does not fit in them.
+						read_size = read_size * 2 if pos == 0 and text else self.chunk_size
+						chunk = read(read_size)
+						if chunk:
+							text = text[pos:] + chunk
+							pos = 0
+						else:
+							eof = True
+					text = text[pos:]
+					read_size = self.chunk_size
+					if eof:
+						# The rest of the text is split once more.
+						eof = False
+		if state != 'done':
+			raise ValueError("Unexpected end of the JSON document.")
+
+
+def iter_events(stream, chunk_size=CHUNK_SIZE, prefix=''):
+	# prefix is text already read from the stream.
+	return EventReader(stream, chunk_size, prefix)
@@ -0,0 +1,68 @@
+# coding=utf-8
+
+import os
+import json
+import hashlib
+from datetime import datetime
+
+class Manifest(object):
+
+	FILE_NAME = ".igen-manifest"
+
+	class Status:
+		CREATED = "created"
+		UPDATED = "updated"
+		UNCHANGED = "unchanged"
+		MODIFIED = "modified"
+
+	def __init__(self, directory):
+		super(Manifest, self).__init__()
+		self.path = os.path.join(directory, Manifest.FILE_NAME)
+		self.is_new = True
+		self.created = datetime.now()
+		self.files = {}
+		try:
+			with open(self.path) as f:
+				data = json.load(f)
+			self.created = datetime.strptime(data['created'], "%Y-%m-%d")
+			self.files = data['files']
+			self.is_new = False
+		except (OSError, ValueError, KeyError, TypeError):
+			pass
+
+	@staticmethod
+	def digest(data):
+		return hashlib.sha256(data).hexdigest()
+
+	@staticmethod
+	def file_digest(file_path):
+		digest = hashlib.sha256()
+		with open(file_path, "rb") as f:
+			for block in iter(lambda: f.read(64 * 1024), b''):
+				digest.update(block)
+		return digest.hexdigest()
+
+	def status(self, key, file_path, digest):
+		try:
+			current = Manifest.file_digest(file_path)
+		except OSError:
+			return Manifest.Status.CREATED
+		if current == digest:
+			return Manifest.Status.UNCHANGED
+		if not self.is_new and self.files.get(key) != current:
+			return Manifest.Status.MODIFIED
+		return Manifest.Status.UPDATED
+
+	def record(self, key, digest):
+		self.files[key] = digest
+
+	def forget(self, key):
+		self.files.pop(key, None)
+
+	def save(self):
+		data = {
+			'created': self.created.strftime("%Y-%m-%d"),
+			'files': self.files
+		}
+		with open(self.path, "w") as f:
+			json.dump(data, f, indent=1, sort_keys=True)
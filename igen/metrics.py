@@ -0,0 +1,261 @@
+# coding=utf-8
+
+import os
+import time
+import threading
+from bisect import bisect_left
+
+# Counters and render time histograms of every command, appended as one
+# JSON line per run to ~/.cache/igen/metrics/runs.jsonl when the command
+# ends, and summarized by 'igen stats':
+#
+#     count('files.written')
+#     with timer('render', 'detail/ViewModel.swift'):
+#         ...
+#
+# The file is renamed to runs.1.jsonl, replacing the previous one, when it
+# reaches MAX_FILE_SIZE. Worker processes write their metrics to part files,
+# which are merged into the run by the main process. IGEN_METRICS=0, or
+# 'igen config metrics.enabled false', turns the recording off.
+
+RUNS_FILE = "runs.jsonl"
+ROTATED_RUNS_FILE = "runs.1.jsonl"
+MAX_FILE_SIZE = 1024 * 1024
+
+# Upper bounds of the buckets of the histograms, in milliseconds. The last
+# bucket holds the longer times.
+BUCKETS = [0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+_enabled = False
+_command = None
+_start = None
+_main_pid = None
+_counters = {}
+_timers = {}
+_lock = threading.Lock()
+
+
+class _Timer(object):
+
+	def __init__(self, name, key):
+		super(_Timer, self).__init__()
+		self.name = name
+		self.key = key
+
+	def __enter__(self):
+		self.start = time.perf_counter()
+		return self
+
+	def __exit__(self, type, value, traceback):
+		observe(self.name, self.key, (time.perf_counter() - self.start) * 1000)
+		return False
+
+
+class _NoTimer(object):
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, type, value, traceback):
+		return False
+
+_NO_TIMER = _NoTimer()
+
+
+def count(name, value=1):
+	if not _enabled:
+		return
+	with _lock:
+		_counters[name] = _counters.get(name, 0) + value
+
+def count_text(name, text):
+	# Counts the size of text encoded in UTF-8.
+	if _enabled:
+		count(name, len(text) if text.isascii() else len(text.encode('utf8')))
+
+def timer(name, key):
+	if not _enabled:
+		return _NO_TIMER
+	return _Timer(name, key)
+
+def observe(name, key, milliseconds):
+	if not _enabled:
+		return
+	with _lock:
+		_observe(_timers.setdefault(name, {}), key, [1, milliseconds, milliseconds, _bucket(milliseconds)])
+
+def _bucket(milliseconds):
+	buckets = [0] * (len(BUCKETS) + 1)
+	buckets[bisect_left(BUCKETS, milliseconds)] = 1
+	return buckets
+
+def _observe(timers, key, value):
+	# A timer is [count, total, max, buckets], in milliseconds.
+	entry = timers.get(key)
+	if entry is None:
+		timers[key] = [value[0], value[1], value[2], list(value[3])]
+		return
+	entry[0] += value[0]
+	entry[1] += value[1]
+	entry[2] = max(entry[2], value[2])
+	entry[3] = [a + b for a, b in zip(entry[3], value[3])]
+
+def _merge(data):
+	for name, value in data['counters'].items():
+		_counters[name] = _counters.get(name, 0) + value
+	for name, timers in data['timers'].items():
+		for key, value in timers.items():
+			_observe(_timers.setdefault(name, {}), key, value)
+
+def _reset():
+	global _counters, _timers
+	_counters = {}
+	_timers = {}
+
+def _reset_in_child():
+	global _lock
+	_lock = threading.Lock()
+	_reset()
+
+
+def is_enabled():
+	return _enabled
+
+def start(command):
+	# Starts recording in the main process of the command. The environment
+	# tells the worker processes that they are part of the run.
+	global _enabled, _command, _start, _main_pid
+	if os.environ.get('IGEN_METRICS', '').lower() in ['0', 'false', 'no']:
+		return
+	_reset()
+	_enabled = True
+	_command = command
+	_start = time.perf_counter()
+	_main_pid = os.getpid()
+	os.environ['IGEN_METRICS_PID'] = str(_main_pid)
+	for part in _part_files():
+		os.remove(part)
+
+def _resume_in_worker():
+	# Worker processes that are not forked import this module again.
+	global _enabled, _main_pid
+	pid = os.environ.get('IGEN_METRICS_PID')
+	if pid and pid != str(os.getpid()):
+		_enabled = True
+		_main_pid = int(pid)
+
+def metrics_dir():
+	from .cache import cache_dir
+	return cache_dir('metrics')
+
+def _part_files():
+	directory = metrics_dir()
+	if directory is None:
+		return []
+	prefix = "{}.".format(_main_pid)
+	return [os.path.join(directory, name) for name in os.listdir(directory) if name.startswith(prefix) and name.endswith(".part")]
+
+def _is_disabled_in_config():
+	# The configuration is only parsed when it mentions the metrics, as
+	# configparser takes a while to import.
+	try:
+		with open(os.path.join(os.path.expanduser("~"), '.igen')) as f:
+			if 'metrics' not in f.read():
+				return False
+	except OSError:
+		return False
+	from .config_cmd import ConfigCommand
+	return ConfigCommand().value('metrics.enabled') == 'false'
+
+def flush():
+	# Called by worker processes when a task is done, as they may exit
+	# without running atexit handlers.
+	if not _enabled or os.getpid() == _main_pid:
+		return
+	with _lock:
+		data = {'counters': _counters, 'timers': _timers}
+		_reset()
+	directory = metrics_dir()
+	if directory is None or not (data['counters'] or data['timers']):
+		return
+	import json
+	with open(os.path.join(directory, "{}.{}.part".format(_main_pid, os.getpid())), "a") as f:
+		f.write(json.dumps(data) + "\n")
+
+def finish(status=0):
+	# Appends the metrics of the run to the runs file.
+	global _enabled
+	if not _enabled or os.getpid() != _main_pid:
+		return
+	_enabled = False
+	duration = time.perf_counter() - _start
+	import json
+	for part in _part_files():
+		try:
+			with open(part) as f:
+				for line in f:
+					if line.strip():
+						_merge(json.loads(line))
+			os.remove(part)
+		except (OSError, ValueError):
+			pass
+	if _is_disabled_in_config():
+		return
+	from . import __version__
+	run = {
+		'time': time.time(),
+		'version': __version__,
+		'command': _command,
+		'status': status,
+		'duration': duration,
+		'counters': _counters,
+		'timers': _timers
+	}
+	directory = metrics_dir()
+	if directory is None:
+		return
+	path = os.path.join(directory, RUNS_FILE)
+	try:
+		if os.path.getsize(path) >= MAX_FILE_SIZE:
+			os.replace(path, os.path.join(directory, ROTATED_RUNS_FILE))
+	except OSError:
+		pass
+	try:
+		with open(path, "a") as f:
+			f.write(json.dumps(run, sort_keys=True) + "\n")
+	except OSError:
+		pass
+
+def load_runs():
+	# Returns the recorded runs, oldest first.
+	import json
+	directory = metrics_dir()
+	if directory is None:
+		return []
+	runs = []
+	for name in [ROTATED_RUNS_FILE, RUNS_FILE]:
+		try:
+			with open(os.path.join(directory, name)) as f:
+				for line in f:
+					try:
+						runs.append(json.loads(line))
+					except ValueError:
+						pass
+		except OSError:
+			pass
+	return runs
+
+def clear_runs():
+	directory = metrics_dir()
+	if directory is None:
+		return
+	for name in [ROTATED_RUNS_FILE, RUNS_FILE]:
+		path = os.path.join(directory, name)
+		if os.path.exists(path):
+			os.remove(path)
+
+
+if hasattr(os, 'register_at_fork'):
+	# A forked worker starts with a copy of the metrics of its parent.
+	os.register_at_fork(after_in_child=_reset_in_child)
+_resume_in_worker()
@@ -1,10 +1,12 @@
 # coding=utf-8
 
-import re
-from jinja2 import Environment, PackageLoader
+from collections import deque
+from .env import get_env
 from .pb import pasteboard_write
 from .command import Command
 from .constants import SWIFT_TYPES_DEFAULT_VALUES, SWIFT_TYPES
+from .swift_parser import parse
+from .symbol_index import default_value, shared_index
 
 class MockCommand(Command):
 	def __init__(self, protocol_text):
@@ -18,7 +20,6 @@ class MockCommand(Command):
 			print(output)
 			print()
 		pasteboard_write(output)
-		print("The result has been copied to the pasteboard.")
 
 
 class Mock(object):
@@ -46,7 +47,7 @@ class Mock(object):
 			elif self.return_type in SWIFT_TYPES:
 				return_value = SWIFT_TYPES_DEFAULT_VALUES[self.return_type]
 			else:
-				return_value = "{}()".format(self.return_type)
+				return_value = default_value(self.return_type)
 			return return_value
 
 		@property
@@ -58,10 +59,39 @@ class Mock(object):
 		super(Mock, self).__init__()
 		self.protocol_text = protocol_text
 
-	def _get_protocol_name(self, str):
-		regex = re.compile("protocol (\w+)")
-		mo = regex.search(str)
-		protocol_name = mo.group(1)
+	def _requirements(self, protocol, protocols):
+		# Functions of the protocol and of the protocols it inherits, breadth
+		# first, each signature once.
+		index = shared_index()
+		functions = []
+		signatures = set()
+		visited = set([protocol.name])
+		queue = deque([self._declared_requirements(protocol)])
+		while queue:
+			protocol_functions, inherited = queue.popleft()
+			for function in protocol_functions:
+				if function[0] not in signatures:
+					signatures.add(function[0])
+					functions.append(function)
+			# Compositions ('A & B') and generic arguments are split off.
+			names = [n.strip().split("<", 1)[0] for i in inherited for n in i.split("&")]
+			for name in names:
+				if name in visited:
+					continue
+				visited.add(name)
+				if name in protocols:
+					queue.append(self._declared_requirements(protocols[name]))
+				elif index is not None:
+					requirements = index.protocol_requirements(name)
+					if requirements is not None:
+						queue.append(requirements)
+		return functions
+
+	def _declared_requirements(self, protocol):
+		return ([[f.signature, f.name, f.return_type] for f in protocol.functions], protocol.inherited)
+
+	def _get_protocol_name(self, protocol):
+		protocol_name = protocol.name
 		if protocol_name.endswith("Type"):
 			class_name = protocol_name[:-4]
 		elif protocol_name.endswith("Protocol"):
@@ -71,23 +101,34 @@ class Mock(object):
 		return (protocol_name, class_name)
 
 	def create_mock(self):
-		str = self.protocol_text
 		try:
-			(protocol_name, class_name) = self._get_protocol_name(str)
-			func_regex = re.compile("func (\w+)\(.*\)( -> (.*))?")
-			funcs = [Mock.Function(f.group(), f.group(1), f.group(3)) for f in func_regex.finditer(str)]
+			root = parse(self.protocol_text)
+			protocol = root.find(['protocol'])
+			if protocol is None:
+				raise ValueError()
 		except:
 			print("The protocol in the pasteboard is invalid.")
 			exit(1)
-		env = Environment(
-			loader=PackageLoader('igen_templates', 'commands'),
-			trim_blocks=True,
-			lstrip_blocks=True
-		)
+		return self.protocol_mock(protocol, Mock.protocols(root))[1]
+
+	@staticmethod
+	def protocols(root):
+		protocols = {}
+		for protocol in root.declarations(['protocol']):
+			protocols.setdefault(protocol.name, protocol)
+		return protocols
+
+	def protocol_mock(self, protocol, protocols=None):
+		# Returns the class name and the content of the mock of a parsed
+		# protocol declaration. The requirements of the inherited protocols
+		# declared in protocols, or in the project index, are included.
+		(protocol_name, class_name) = self._get_protocol_name(protocol)
+		funcs = [Mock.Function(*f) for f in self._requirements(protocol, protocols or {})]
+		env = get_env('commands')
 		template = env.get_template("Mock.swift")
 		content = template.render(
 			class_name=class_name,
 			protocol_name=protocol_name,
 			functions=funcs
 		)
-		return content
+		return ("{}Mock".format(class_name), content)
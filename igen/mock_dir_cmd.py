@@ -0,0 +1,161 @@
+# coding=utf-8
+
+import os
+import hashlib
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from . import __version__
+from .env import template_dir
+from .cache import FileCache
+from .manifest import Manifest
+from .mock_cmd import Mock
+from .swift_parser import parse
+from .symbol_index import load_shared_index
+from .trace import flush
+from . import metrics
+from .command import Command
+
+class MockDirectoryCommand(Command):
+
+	def __init__(self, source_dir, output_dir, jobs=None, force=False):
+		super(MockDirectoryCommand, self).__init__()
+		self.source_dir = os.path.abspath(source_dir)
+		self.output_dir = output_dir
+		self.jobs = jobs or os.cpu_count() or 1
+		self.force = force
+
+	def create_mocks(self):
+		if not os.path.isdir(self.source_dir):
+			print("The directory {} does not exist.".format(self.source_dir))
+			exit(1)
+		# Inherited protocols and default values are resolved with the index
+		# of the project, if there is one.
+		self.index = load_shared_index(self.source_dir)
+		cache = FileCache('mocks', self._cache_version())
+		sources = self._read_sources()
+		results = {}
+		pending = []
+		for path, data in sources:
+			entry = cache.get(path, data)
+			if entry is not None and self._is_fresh(entry):
+				results[path] = entry['mocks']
+			elif b'protocol' not in data:
+				cache.set(path, data, {'mocks': [], 'dependencies': []})
+				results[path] = []
+			else:
+				pending.append((path, data))
+		failed = 0
+		for (path, data), (entry, error) in zip(pending, self._create_mocks(pending)):
+			if error is not None:
+				print("Failed to read the protocols in {}: {}".format(path, error))
+				failed += 1
+				continue
+			cache.set(path, data, entry)
+			results[path] = entry['mocks']
+		cache.prune(self.source_dir, results)
+		cache.save()
+		self._write_mocks([results[path] for path, _ in sources if path in results])
+		if failed:
+			exit(1)
+
+	def _cache_version(self):
+		# Cached mocks are rendered, so the cache is also invalidated when
+		# the Mock template changes or an index is created or removed.
+		with open(os.path.join(template_dir('commands'), "Mock.swift"), "rb") as f:
+			digest = hashlib.sha1(f.read()).hexdigest()
+		return "{}-{}-{}".format(__version__, digest, self.index.path if self.index else "")
+
+	def _is_fresh(self, entry):
+		# The mocks of a file also depend on the index entries of the
+		# protocols and types looked up to create them.
+		for name, fingerprint in entry['dependencies']:
+			if self.index is None or self.index.fingerprint(name) != fingerprint:
+				return False
+		return True
+
+	def _read_sources(self):
+		sources = []
+		for directory, directories, files in os.walk(self.source_dir):
+			directories.sort()
+			for file_name in sorted(files):
+				if not file_name.endswith(".swift"):
+					continue
+				path = os.path.join(directory, file_name)
+				try:
+					with open(path, "rb") as f:
+						sources.append((path, f.read()))
+				except OSError as e:
+					print(e)
+		return sources
+
+	def _create_mocks(self, pending):
+		if self.jobs > 1 and len(pending) > 1:
+			with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+				chunksize = max(1, len(pending) // (self.jobs * 4))
+				return list(executor.map(create_file_mocks, [data for _, data in pending], repeat(self.source_dir), chunksize=chunksize))
+		return [create_file_mocks(data, self.source_dir) for _, data in pending]
+
+	def _write_mocks(self, file_mocks):
+		os.makedirs(self.output_dir, exist_ok=True)
+		manifest = Manifest(self.output_dir)
+		names = set()
+		counts = dict((status, 0) for status in [Manifest.Status.CREATED, Manifest.Status.UPDATED, Manifest.Status.UNCHANGED, Manifest.Status.MODIFIED])
+		for mocks in file_mocks:
+			for class_name, content in mocks:
+				if class_name in names:
+					print("    {} is defined more than once, only the first one is created.".format(class_name))
+					continue
+				names.add(class_name)
+				file_name = class_name + ".swift"
+				path = os.path.join(self.output_dir, file_name)
+				data = content.encode('utf8')
+				digest = Manifest.digest(data)
+				status = manifest.status(file_name, path, digest)
+				counts[status] += 1
+				if status == Manifest.Status.UNCHANGED:
+					metrics.count('files.unchanged')
+				elif status == Manifest.Status.MODIFIED and not self.force:
+					print("    {} (modified since it was generated, not overwritten)".format(path))
+					metrics.count('files.modified')
+					continue
+				else:
+					with open(path, "wb") as f:
+						f.write(data)
+					print("    {}".format(path))
+					metrics.count('files.written')
+					metrics.count('bytes.emitted', len(data))
+				manifest.record(file_name, digest)
+		manifest.save()
+		print("Created {}, updated {} and kept {} unchanged mocks in {}.".format(
+			counts[Manifest.Status.CREATED],
+			counts[Manifest.Status.UPDATED] + (counts[Manifest.Status.MODIFIED] if self.force else 0),
+			counts[Manifest.Status.UNCHANGED],
+			self.output_dir
+		))
+		if counts[Manifest.Status.MODIFIED] and not self.force:
+			print("{} modified file(s) were kept. Run the command again with --force to overwrite them.".format(counts[Manifest.Status.MODIFIED]))
+
+
+def create_file_mocks(data, source_dir):
+	# Returns the (class name, content) pairs of the mocks of every protocol
+	# in a source file with the fingerprints of the index entries they depend
+	# on, and an error message if the file could not be read.
+	index = load_shared_index(source_dir)
+	if index is not None:
+		index.lookups = set()
+	try:
+		root = parse(data.decode('utf8'))
+		protocols = Mock.protocols(root)
+		mock = Mock(None)
+		mocks = [list(mock.protocol_mock(p, protocols)) for p in root.declarations(['protocol'])]
+		dependencies = []
+		if index is not None:
+			dependencies = [[name, index.fingerprint(name)] for name in sorted(index.lookups)]
+		return ({'mocks': mocks, 'dependencies': dependencies}, None)
+	except Exception as e:
+		return (None, str(e) or type(e).__name__)
+	finally:
+		if index is not None:
+			index.lookups = None
+		flush()
+		metrics.flush()
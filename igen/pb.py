@@ -1,10 +1,171 @@
 # coding=utf-8
 
+import os
+import sys
+import shutil
 import subprocess
+from .trace import span
+from . import metrics
+from .str_helpers import iter_blocks
+
+# The commands read their input with pasteboard_read() and write their
+# result with pasteboard_write(), which use the backend selected with
+# select_pasteboard(): the clipboard of the system, files, or the standard
+# input and output. Without a selection, the backend is the 'io.clipboard'
+# configuration value, or the clipboard found on the system. Large results
+# are written with pasteboard_write_chunks() as they are rendered.
+
+class ClipboardBackend(object):
+
+	COMMANDS = {
+		'macos': (['pbpaste'], ['pbcopy']),
+		'xclip': (['xclip', '-selection', 'clipboard', '-o'], ['xclip', '-selection', 'clipboard', '-i']),
+		'wl-clipboard': (['wl-paste', '--no-newline'], ['wl-copy']),
+	}
+
+	def __init__(self, name):
+		super(ClipboardBackend, self).__init__()
+		self.name = name
+		self.paste_command, self.copy_command = ClipboardBackend.COMMANDS[name]
+
+	@property
+	def input_file(self):
+		return None
+
+	@property
+	def env(self):
+		return dict(os.environ, LANG='en_US.UTF-8')
+
+	def read(self):
+		try:
+			return subprocess.check_output(self.paste_command, env=self.env).decode('utf-8')
+		except (OSError, subprocess.CalledProcessError) as e:
+			print("Could not read the clipboard with {}: {}".format(self.paste_command[0], e))
+			exit(1)
+
+	def write(self, output):
+		self.write_chunks([output])
+
+	def write_chunks(self, chunks):
+		try:
+			process = subprocess.Popen(self.copy_command, env=self.env, stdin=subprocess.PIPE)
+			with process.stdin:
+				for block in chunks:
+					process.stdin.write(block.encode('utf-8'))
+			process.wait()
+		except OSError as e:
+			print("Could not write to the clipboard with {}: {}".format(self.copy_command[0], e))
+			exit(1)
+		if process.returncode != 0:
+			print("Could not write to the clipboard with {}.".format(self.copy_command[0]))
+			exit(1)
+		print("The result has been copied to the pasteboard.")
+
+
+class FileBackend(object):
+	# Reads from input_file and writes to output_file ('-' for stdin and
+	# stdout), and uses the fallback backend for the other direction.
+
+	def __init__(self, input_file=None, output_file=None, fallback_name=None):
+		super(FileBackend, self).__init__()
+		self.input_file = input_file
+		self.output_file = output_file
+		self.fallback_name = fallback_name
+
+	@property
+	def fallback(self):
+		return _backend(self.fallback_name or _default_backend_name())
+
+	def read(self):
+		if self.input_file is None:
+			return self.fallback.read()
+		if self.input_file == '-':
+			return sys.stdin.read()
+		try:
+			with open(self.input_file, encoding='utf-8') as f:
+				return f.read()
+		except OSError as e:
+			print(e)
+			exit(1)
+
+	def write(self, output):
+		self.write_chunks([output])
+
+	def write_chunks(self, chunks):
+		if self.output_file is None:
+			self.fallback.write_chunks(chunks)
+		elif self.output_file == '-':
+			for block in chunks:
+				sys.stdout.write(block)
+			sys.stdout.flush()
+		else:
+			try:
+				with open(self.output_file, "w", encoding='utf-8') as f:
+					for block in chunks:
+						f.write(block)
+			except OSError as e:
+				print(e)
+				exit(1)
+			print("The result has been written to {}.".format(self.output_file))
+
+
+BACKENDS = ['macos', 'xclip', 'wl-clipboard', 'stdio']
+
+_pasteboard = None
+
+def select_pasteboard(name=None, input_file=None, output_file=None):
+	global _pasteboard
+	if input_file is None and output_file is None:
+		_pasteboard = _backend(name or _default_backend_name())
+	else:
+		_pasteboard = _backend(name, input_file, output_file)
+	return _pasteboard
+
+def _backend(name, input_file=None, output_file=None):
+	if name is not None and name not in BACKENDS:
+		print("Invalid clipboard {}, use one of: {}.".format(name, ", ".join(BACKENDS)))
+		exit(1)
+	if name == 'stdio':
+		return FileBackend(input_file or '-', output_file or '-')
+	if input_file is None and output_file is None:
+		return ClipboardBackend(name)
+	return FileBackend(input_file, output_file, name)
+
+def _default_backend_name():
+	from .config_cmd import ConfigCommand
+	name = ConfigCommand().value('io.clipboard')
+	if name:
+		return name
+	if sys.platform == 'darwin':
+		return 'macos'
+	if os.environ.get('WAYLAND_DISPLAY') and shutil.which('wl-paste'):
+		return 'wl-clipboard'
+	if os.environ.get('DISPLAY') and shutil.which('xclip'):
+		return 'xclip'
+	if shutil.which('pbpaste'):
+		return 'macos'
+	return 'stdio'
+
+def pasteboard():
+	return _pasteboard or select_pasteboard()
+
+def pasteboard_input_file():
+	# The file the input can be streamed from, if it is not in a clipboard.
+	return pasteboard().input_file
 
 def pasteboard_read():
-	return subprocess.check_output('pbpaste', env={'LANG': 'en_US.UTF-8'}).decode('utf-8')
+	with span('read_input', 'io'):
+		return pasteboard().read()
 
 def pasteboard_write(output):
-	process = subprocess.Popen('pbcopy', env={'LANG': 'en_US.UTF-8'}, stdin=subprocess.PIPE)
-	process.communicate(output.encode('utf-8'))
\ No newline at end of file
+	pasteboard_write_chunks([output])
+
+def pasteboard_write_chunks(chunks):
+	with span('write_output', 'io'):
+		pasteboard().write_chunks(_counted(iter_blocks(chunks)))
+	metrics.count('outputs.written')
+
+def _counted(blocks):
+	for block in blocks:
+		metrics.count_text('bytes.emitted', block)
+		yield block
@@ -0,0 +1,178 @@
+# coding=utf-8
+
+import io
+import os
+import sys
+import json
+import signal
+import socket
+import struct
+import traceback
+from .env import TEMPLATE_SETS, get_env
+from .client import socket_path, connect
+
+# 'igen serve' loads every command module and template once, then forks a
+# child for each request of the client (see client.py). The child starts
+# with everything already loaded, runs the command in the directory and
+# environment of the client and streams its output back in frames:
+#
+#     channel (1 byte: 'o' stdout, 'e' stderr, 'i' stdin, 'x' exit code)
+#     size (4 bytes, big endian)
+#     data
+#
+# The standard input is only sent when the command reads it: an 'i' frame
+# holds the number of bytes wanted, and the client answers with a size and
+# at most that many bytes, none at the end of the input.
+
+
+class _FrameBuffer(io.RawIOBase):
+
+	def __init__(self, connection, channel):
+		super(_FrameBuffer, self).__init__()
+		self.connection = connection
+		self.channel = channel
+
+	def writable(self):
+		return True
+
+	def write(self, data):
+		if data:
+			_send(self.connection, self.channel, bytes(data))
+		return len(data)
+
+
+class _FrameWriter(io.TextIOBase):
+
+	def __init__(self, connection, channel):
+		super(_FrameWriter, self).__init__()
+		# Commands that write bytes use the buffer, as with sys.stdout.
+		self.buffer = _FrameBuffer(connection, channel)
+
+	def writable(self):
+		return True
+
+	def write(self, text):
+		if text:
+			self.buffer.write(text.encode('utf8'))
+		return len(text)
+
+
+class _StdinReader(io.RawIOBase):
+
+	def __init__(self, connection, reader):
+		super(_StdinReader, self).__init__()
+		self.connection = connection
+		self.reader = reader
+		self.eof = False
+
+	def readable(self):
+		return True
+
+	def readinto(self, buffer):
+		if self.eof:
+			return 0
+		_send(self.connection, b'i', struct.pack('>I', len(buffer)))
+		size = struct.unpack('>I', self.reader.read(4))[0]
+		data = self.reader.read(size)
+		if not data:
+			self.eof = True
+		buffer[:len(data)] = data
+		return len(data)
+
+
+def _send(connection, channel, data):
+	connection.sendall(struct.pack('>cI', channel, len(data)) + data)
+
+
+class Server(object):
+
+	def __init__(self, path=None):
+		super(Server, self).__init__()
+		self.path = path or socket_path()
+
+	def serve(self):
+		if not hasattr(os, 'fork') or not hasattr(socket, 'AF_UNIX'):
+			print("The igen server requires a system with fork() and Unix sockets.")
+			exit(1)
+		running = connect(self.path)
+		if running is not None:
+			running.close()
+			print("An igen server is already running on {}.".format(self.path))
+			exit(1)
+		self._prewarm()
+		if os.path.exists(self.path):
+			os.remove(self.path)
+		os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+		listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		umask = os.umask(0o077)
+		try:
+			listener.bind(self.path)
+		finally:
+			os.umask(umask)
+		listener.listen(16)
+		# Children are reaped automatically.
+		signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+		print("igen server listening on {} (pid {}). Press Ctrl-C to stop.".format(self.path, os.getpid()))
+		sys.stdout.flush()
+		try:
+			while True:
+				connection, _ = listener.accept()
+				if os.fork() == 0:
+					listener.close()
+					signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+					code = 1
+					try:
+						code = self._handle(connection)
+					finally:
+						os._exit(code)
+				connection.close()
+		except KeyboardInterrupt:
+			pass
+		finally:
+			listener.close()
+			if os.path.exists(self.path):
+				os.remove(self.path)
+
+	def _prewarm(self):
+		# Imports the command modules, which __main__ only imports when they
+		# are used, and compiles every template.
+		import importlib
+		for module in ['api_cmd', 'batch_cmd', 'bind_cmd', 'config_cmd', 'index_cmd', 'init_cmd', 'json_cmd',
+				'mock_cmd', 'mock_dir_cmd', 'pb', 'stats_cmd', 'template_cmd', 'templates_cmd', 'test_cmd']:
+			importlib.import_module('.' + module, __package__)
+		for template_set in TEMPLATE_SETS:
+			env = get_env(template_set)
+			for name in env.list_templates():
+				env.get_template(name)
+		try:
+			importlib.import_module('yaml')
+		except ImportError:
+			pass
+
+	def _handle(self, connection):
+		from .__main__ import main
+		reader = connection.makefile('rb')
+		request = json.loads(reader.readline().decode('utf8'))
+		os.chdir(request['cwd'])
+		os.environ.clear()
+		os.environ.update(request['env'])
+		sys.stdin = io.TextIOWrapper(io.BufferedReader(_StdinReader(connection, reader)), encoding='utf-8')
+		sys.stdout = _FrameWriter(connection, b'o')
+		sys.stderr = _FrameWriter(connection, b'e')
+		code = 0
+		try:
+			main(request['argv'])
+		except SystemExit as e:
+			if e.code is None or isinstance(e.code, int):
+				code = e.code or 0
+			else:
+				print(e.code, file=sys.stderr)
+				code = 1
+		except Exception:
+			traceback.print_exc()
+			code = 1
+		try:
+			_send(connection, b'x', str(code).encode('ascii'))
+		except OSError:
+			pass
+		return code
@@ -0,0 +1,269 @@
+# coding=utf-8
+
+import os
+import sys
+import time
+import shutil
+import hashlib
+import tarfile
+import zipfile
+import tempfile
+from io import BytesIO
+from itertools import chain
+from datetime import datetime
+from .manifest import Manifest
+from .str_helpers import iter_blocks
+from .trace import span
+from . import metrics
+
+# A sink receives the files of one or more scenes, in order, as
+# (relative path, content) pairs:
+#
+#     created_date = sink.begin(scene_name)
+#     sink.write(file_path, content)  # for each file of the scene
+#     sink.end()
+#     ...
+#     sink.close()                    # once all scenes are written
+#
+# write_chunks(file_path, chunks) writes a file as its chunks are rendered,
+# without holding the whole file in memory, and remove(file_path) removes a
+# file that an earlier run of the scene created with other options.
+
+# Files larger than this number of characters are streamed.
+SPOOL_SIZE = 1024 * 1024
+
+class Sink(object):
+
+	def begin(self, scene_name):
+		return datetime.now()
+
+	def write(self, file_path, content):
+		raise NotImplementedError()
+
+	def write_chunks(self, file_path, chunks):
+		self.write(file_path, "".join(chunks))
+
+	def remove(self, file_path):
+		pass
+
+	def end(self):
+		pass
+
+	def close(self):
+		pass
+
+
+class DirectorySink(Sink):
+
+	def __init__(self, root, force=False):
+		super(DirectorySink, self).__init__()
+		self.root = root
+		self.force = force
+		self.manifest = None
+		self.scene_name = None
+		self.skipped = 0
+
+	def begin(self, scene_name):
+		print('Successfully created files:')
+		scene_directory = os.path.join(self.root, scene_name)
+		os.makedirs(os.path.join(scene_directory, "Test"), exist_ok=True)
+		self.scene_name = scene_name
+		self.manifest = Manifest(scene_directory)
+		self.skipped = 0
+		return self.manifest.created
+
+	def write(self, file_path, content):
+		with span('write_file', 'io', path=file_path):
+			data = content.encode('utf8')
+			path = os.path.join(self.root, file_path)
+			if self._should_write(file_path, path, Manifest.digest(data)):
+				os.makedirs(os.path.dirname(path), exist_ok=True)
+				with open(path, "wb") as f:
+					f.write(data)
+				self._written(file_path, len(data))
+
+	def write_chunks(self, file_path, chunks):
+		# A large file is written to a temporary file while it is rendered,
+		# which then replaces the file unless it is unchanged or kept.
+		blocks = iter_blocks(chunks)
+		spooled = []
+		length = 0
+		for block in blocks:
+			spooled.append(block)
+			length += len(block)
+			if length > SPOOL_SIZE:
+				break
+		else:
+			self.write(file_path, "".join(spooled))
+			return
+		blocks = chain(spooled, blocks)
+		spooled = None
+		with span('write_file', 'io', path=file_path):
+			path = os.path.join(self.root, file_path)
+			os.makedirs(os.path.dirname(path), exist_ok=True)
+			temp_path = "{}.{}.tmp".format(path, os.getpid())
+			try:
+				digest = hashlib.sha256()
+				size = 0
+				with open(temp_path, "wb") as f:
+					for block in blocks:
+						data = block.encode('utf8')
+						digest.update(data)
+						f.write(data)
+						size += len(data)
+				if self._should_write(file_path, path, digest.hexdigest()):
+					os.replace(temp_path, path)
+					self._written(file_path, size)
+			finally:
+				if os.path.exists(temp_path):
+					os.remove(temp_path)
+
+	def remove(self, file_path):
+		# Files modified since they were generated are kept.
+		path = os.path.join(self.root, file_path)
+		if not os.path.exists(path):
+			return
+		key = file_path[len(self.scene_name) + 1:]
+		if self.manifest.files.get(key) != Manifest.file_digest(path) and not self.force:
+			print("    {} (modified since it was generated, not removed)".format(file_path))
+			metrics.count('files.modified')
+			self.skipped += 1
+			return
+		os.remove(path)
+		self.manifest.forget(key)
+		print("    {} (removed)".format(file_path))
+		metrics.count('files.removed')
+
+	def _should_write(self, file_path, path, digest):
+		key = file_path[len(self.scene_name) + 1:]
+		status = self.manifest.status(key, path, digest)
+		if status == Manifest.Status.UNCHANGED:
+			print("    {} (unchanged)".format(file_path))
+			metrics.count('files.unchanged')
+			self.manifest.record(key, digest)
+			return False
+		if status == Manifest.Status.MODIFIED and not self.force:
+			print("    {} (modified since it was generated, not overwritten)".format(file_path))
+			metrics.count('files.modified')
+			self.skipped += 1
+			return False
+		self.manifest.record(key, digest)
+		return True
+
+	def _written(self, file_path, size):
+		print("    {}".format(file_path))
+		metrics.count('files.written')
+		metrics.count('bytes.emitted', size)
+
+	def end(self):
+		self.manifest.save()
+		if self.skipped:
+			print("{} modified file(s) were kept. Run the command again with --force to overwrite them.".format(self.skipped))
+
+
+class ArchiveSink(Sink):
+
+	def __init__(self, path):
+		super(ArchiveSink, self).__init__()
+		self.path = path
+
+	def begin(self, scene_name):
+		print('Successfully added files to {}:'.format(self.path))
+		return datetime.now()
+
+	def write(self, file_path, content):
+		with span('write_file', 'io', path=file_path):
+			data = content.encode('utf8')
+			self._add(file_path, BytesIO(data), len(data))
+			self._added(file_path, len(data))
+
+	def write_chunks(self, file_path, chunks):
+		# The size of an entry is needed before its data, so the file is
+		# spooled, to a temporary file when it is large.
+		with span('write_file', 'io', path=file_path):
+			with tempfile.SpooledTemporaryFile(SPOOL_SIZE) as f:
+				for block in iter_blocks(chunks):
+					f.write(block.encode('utf8'))
+				size = f.tell()
+				f.seek(0)
+				self._add(file_path, f, size)
+			self._added(file_path, size)
+
+	def _added(self, file_path, size):
+		print("    {}".format(file_path))
+		metrics.count('files.written')
+		metrics.count('bytes.emitted', size)
+
+	def _add(self, file_path, data, size):
+		raise NotImplementedError()
+
+
+class TarSink(ArchiveSink):
+
+	def __init__(self, path):
+		super(TarSink, self).__init__(path)
+		mode = "w:gz" if path.endswith((".tar.gz", ".tgz")) else "w"
+		self.archive = tarfile.open(path, mode)
+
+	def _add(self, file_path, data, size):
+		info = tarfile.TarInfo(file_path)
+		info.size = size
+		info.mtime = time.time()
+		info.mode = 0o644
+		self.archive.addfile(info, data)
+
+	def close(self):
+		self.archive.close()
+
+
+class ZipSink(ArchiveSink):
+
+	def __init__(self, path):
+		super(ZipSink, self).__init__(path)
+		self.archive = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+
+	def _add(self, file_path, data, size):
+		info = zipfile.ZipInfo(file_path, time.localtime()[:6])
+		info.compress_type = zipfile.ZIP_DEFLATED
+		info.external_attr = 0o644 << 16
+		info.file_size = size
+		with self.archive.open(info, "w") as f:
+			shutil.copyfileobj(data, f)
+
+	def close(self):
+		self.archive.close()
+
+
+class StdoutSink(Sink):
+
+	def __init__(self, stream=None):
+		super(StdoutSink, self).__init__()
+		self.stream = stream or sys.stdout
+
+	def write(self, file_path, content):
+		self.write_chunks(file_path, [content])
+
+	def write_chunks(self, file_path, chunks):
+		with span('write_file', 'io', path=file_path):
+			self.stream.write("// {}\n".format(file_path))
+			for block in iter_blocks(chunks):
+				self.stream.write(block)
+				metrics.count_text('bytes.emitted', block)
+			self.stream.write("\n")
+			metrics.count('files.written')
+
+	def close(self):
+		self.stream.flush()
+
+
+def is_directory_output(output):
+	return output != "-" and not output.endswith((".tar", ".tar.gz", ".tgz", ".zip"))
+
+def create_sink(output, force=False):
+	if output == "-":
+		return StdoutSink()
+	if output.endswith((".tar", ".tar.gz", ".tgz")):
+		return TarSink(output)
+	if output.endswith(".zip"):
+		return ZipSink(output)
+	return DirectorySink(output, force)
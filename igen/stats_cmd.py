@@ -0,0 +1,177 @@
+# coding=utf-8
+
+import json
+import time
+from collections import OrderedDict
+from .metrics import BUCKETS, load_runs, clear_runs
+from .command import Command
+
+class StatsCommand(Command):
+
+	def __init__(self, last=None, command=None, recent=10):
+		super(StatsCommand, self).__init__()
+		self.last = last
+		self.command = command
+		self.recent = recent
+
+	def show(self, as_json=False):
+		runs = load_runs()
+		if self.command:
+			runs = [run for run in runs if run.get('command') == self.command]
+		if self.last:
+			runs = runs[-self.last:]
+		if not runs:
+			print("No runs recorded. Metrics are recorded when igen commands run.")
+			return
+		summary = self.summary(runs)
+		if as_json:
+			print(json.dumps(summary, indent=2))
+		else:
+			self._print_summary(summary)
+
+	def clear(self):
+		clear_runs()
+		print('Removed the recorded metrics.')
+
+	def summary(self, runs):
+		# Times are in seconds. The recent average of a command or template
+		# is the one of its last runs, and its trend is the change from the
+		# average of the runs before them.
+		commands = OrderedDict()
+		templates = OrderedDict()
+		counters = {}
+		for run in runs:
+			commands.setdefault(run['command'], []).append(run)
+			for key, timer in run['timers'].get('render', {}).items():
+				templates.setdefault(key, []).append(timer)
+			for name, value in run['counters'].items():
+				counters[name] = counters.get(name, 0) + value
+		render_time = sum(timer[1] for timers in templates.values() for timer in timers) / 1000
+		summary = OrderedDict([
+			('runs', len(runs)),
+			('failed', sum(1 for run in runs if run['status'] != 0)),
+			('first', runs[0]['time']),
+			('last', runs[-1]['time']),
+			('commands', OrderedDict()),
+			('templates', OrderedDict()),
+			('counters', OrderedDict(sorted(counters.items()))),
+			('caches', OrderedDict())
+		])
+		for name, command_runs in sorted(commands.items(), key=lambda item: -sum(run['duration'] for run in item[1])):
+			values = [(1, run['duration']) for run in command_runs]
+			recent, trend = self._trend(values)
+			summary['commands'][name] = OrderedDict([
+				('runs', len(command_runs)),
+				('failed', sum(1 for run in command_runs if run['status'] != 0)),
+				('total', sum(run['duration'] for run in command_runs)),
+				('average', _average(values)),
+				('recent', recent),
+				('trend', trend)
+			])
+		for key, timers in sorted(templates.items(), key=lambda item: -sum(timer[1] for timer in item[1])):
+			values = [(timer[0], timer[1] / 1000) for timer in timers]
+			buckets = [sum(counts) for counts in zip(*[timer[3] for timer in timers])]
+			total = sum(timer[1] for timer in timers) / 1000
+			recent, trend = self._trend(values)
+			summary['templates'][key] = OrderedDict([
+				('renders', sum(timer[0] for timer in timers)),
+				('total', total),
+				('average', _average(values)),
+				('max', max(timer[2] for timer in timers) / 1000),
+				('p50', _percentile(buckets, 0.5)),
+				('p95', _percentile(buckets, 0.95)),
+				('share', total / render_time if render_time else None),
+				('recent', recent),
+				('trend', trend)
+			])
+		for name in counters:
+			parts = name.split('.')
+			if len(parts) == 3 and parts[0] == 'cache' and parts[2] in ['hit', 'miss']:
+				summary['caches'][parts[1]] = OrderedDict([
+					('hits', counters.get('cache.{}.hit'.format(parts[1]), 0)),
+					('misses', counters.get('cache.{}.miss'.format(parts[1]), 0))
+				])
+		summary['caches'] = OrderedDict(sorted(summary['caches'].items()))
+		return summary
+
+	def _trend(self, values):
+		recent = _average(values[-self.recent:])
+		older = _average(values[:-self.recent])
+		if recent is None or not older:
+			return (recent, None)
+		return (recent, recent / older - 1)
+
+	def _print_summary(self, summary):
+		print("{} runs from {} to {}, {} failed.".format(
+			summary['runs'], _format_date(summary['first']), _format_date(summary['last']), summary['failed']
+		))
+		print()
+		row = "{:<12} {:>7} {:>7} {:>10} {:>10} {:>10} {:>7}"
+		print(row.format("command", "runs", "failed", "total", "average", "recent", "trend"))
+		for name, command in summary['commands'].items():
+			print(row.format(
+				name, command['runs'], command['failed'], _format_time(command['total']),
+				_format_time(command['average']), _format_time(command['recent']), _format_ratio(command['trend'], True)
+			))
+		if summary['templates']:
+			print()
+			row = "{:<36} {:>8} {:>10} {:>10} {:>9} {:>6} {:>10} {:>7}"
+			print(row.format("template", "renders", "total", "average", "p95", "share", "recent", "trend"))
+			for key, template in summary['templates'].items():
+				print(row.format(
+					key, template['renders'], _format_time(template['total']), _format_time(template['average']),
+					_format_bucket(template['p95']), _format_ratio(template['share']),
+					_format_time(template['recent']), _format_ratio(template['trend'], True)
+				))
+		if summary['counters']:
+			print()
+			row = "{:<36} {:>12} {:>12}"
+			print(row.format("counter", "total", "per run"))
+			for name, value in summary['counters'].items():
+				print(row.format(name, value, "{:.1f}".format(value / summary['runs'])))
+		if summary['caches']:
+			print()
+			row = "{:<12} {:>10} {:>10} {:>9}"
+			print(row.format("cache", "hits", "misses", "hit rate"))
+			for name, cache in summary['caches'].items():
+				lookups = cache['hits'] + cache['misses']
+				print(row.format(name, cache['hits'], cache['misses'], _format_ratio(cache['hits'] / lookups if lookups else None)))
+
+
+def _average(values):
+	# values are (count, total) pairs.
+	count = sum(value[0] for value in values)
+	if not count:
+		return None
+	return sum(value[1] for value in values) / count
+
+def _percentile(buckets, ratio):
+	# Returns the upper bound in seconds of the bucket holding the
+	# percentile, or None if it is the last bucket.
+	total = sum(buckets)
+	seen = 0
+	for i, count in enumerate(buckets):
+		seen += count
+		if total and seen >= ratio * total:
+			return BUCKETS[i] / 1000 if i < len(BUCKETS) else None
+	return None
+
+def _format_date(timestamp):
+	return time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp))
+
+def _format_time(seconds):
+	if seconds is None:
+		return "-"
+	if seconds >= 1:
+		return "{:.2f}s".format(seconds)
+	return "{:.2f}ms".format(seconds * 1000)
+
+def _format_bucket(seconds):
+	if seconds is None:
+		return ">{:g}ms".format(BUCKETS[-1])
+	return "<={:g}ms".format(seconds * 1000)
+
+def _format_ratio(ratio, signed=False):
+	if ratio is None:
+		return "-"
+	return "{:+.0f}%".format(ratio * 100) if signed else "{:.0f}%".format(ratio * 100)
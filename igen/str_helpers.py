@@ -1,5 +1,7 @@
 # coding=utf-8
 
+from itertools import islice
+
 def lower_first_letter(st):
 	return st[0].lower() + st[1:]
 
@@ -25,4 +27,13 @@ def plural_to_singular(st):
 	elif st.endswith("s"):
 		if len(st) > 3:
 			return st[:-1]
-	return st
\ No newline at end of file
+	return st
+
+def iter_blocks(chunks, count=4096):
+	# Joins the small chunks that templates generate, count at a time.
+	chunks = iter(chunks)
+	while True:
+		block = list(islice(chunks, count))
+		if not block:
+			return
+		yield "".join(block)
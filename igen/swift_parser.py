@@ -0,0 +1,449 @@
+# coding=utf-8
+
+import re
+from .trace import span
+
+# Swift declaration scanner shared by the commands that read Swift code from
+# the pasteboard. tokenize() splits the source in a single pass and parse()
+# builds a tree of the declarations it contains (types, extensions,
+# functions and properties); function and accessor bodies are skipped.
+# Both only move forward through the input, so they run in linear time.
+
+_TOKEN_REGEX = re.compile(r'''
+	(?P<space>\s*)
+	(?:
+		(?P<line_comment>//[^\n]*)
+		| (?P<block_comment>/\*)
+		| (?P<multiline_string>""")
+		| (?P<string>"[^"\\\n]*(?:\\.[^"\\\n]*)*\\?(?:"|(?=\n)|\Z))
+		| (?P<identifier>[^\W\d]\w*|\$\w+|`[^`\n]+`)
+		| (?P<attribute>@[^\W\d]\w*)
+		| (?P<directive>\#[^\W\d]\w*)
+		| (?P<number>\d\w*(?:\.\d\w*)*)
+		| (?P<arrow>->)
+		| (?P<punct>[{}()\[\],:;<>])
+		| (?P<operator>(?:[-+*%=!&|^~?.]|/(?![/*]))+)
+		| (?P<end>\Z)
+		| (?P<other>.)
+	)
+''', re.VERBOSE)
+
+# Whitespace before a token
+NO_SPACE = 0
+SPACE = 1
+NEWLINE = 2
+
+_TYPE_KINDS = set(['struct', 'class', 'enum', 'protocol', 'extension', 'actor'])
+_FUNCTION_KINDS = set(['func', 'init', 'subscript', 'deinit'])
+_PROPERTY_KINDS = set(['var', 'let'])
+_MODIFIERS = set([
+	'public', 'private', 'fileprivate', 'internal', 'open', 'static', 'class', 'final',
+	'override', 'mutating', 'nonmutating', 'lazy', 'weak', 'unowned', 'optional',
+	'required', 'convenience', 'dynamic', 'indirect', 'prefix', 'postfix', 'infix',
+	'nonisolated'
+])
+_ACCESSORS = set(['get', 'set', 'async', 'throws', 'mutating', 'nonmutating'])
+_OBSERVERS = set(['willSet', 'didSet'])
+_CONTINUE_AFTER = set([',', ':', '->', '=', '<', '.', '&', 'where', '&&', '||', '??', '==', '!='])
+_CONTINUE_BEFORE = set(['->', '{', 'throws', 'rethrows', 'async', 'where', '.', ',', ':', '&', '=', '&&', '||', '??'])
+_OPENING = {'(': ')', '[': ']', '{': '}', '<': '>'}
+
+
+def tokenize(text):
+	# Returns a list of (kind, text, offset, space) tuples, where space tells
+	# whether the token follows whitespace or a line break. Comments are
+	# dropped and count as whitespace.
+	tokens = []
+	pos = 0
+	length = len(text)
+	space = NO_SPACE
+	match_token = _TOKEN_REGEX.match
+	while True:
+		match = match_token(text, pos)
+		kind = match.lastgroup
+		start = match.start(kind)
+		if start > pos:
+			space = NEWLINE if space == NEWLINE or '\n' in text[pos:start] else SPACE
+		if kind == 'end':
+			break
+		if kind == 'line_comment':
+			space = max(space, SPACE)
+			pos = match.end()
+			continue
+		if kind == 'block_comment':
+			pos = _block_comment_end(text, start)
+			space = NEWLINE if space == NEWLINE or '\n' in text[start:pos] else SPACE
+			continue
+		if kind == 'multiline_string':
+			end = _multiline_string_end(text, start)
+			tokens.append(('string', text[start:end], start, space))
+		else:
+			end = match.end()
+			tokens.append((kind, text[start:end], start, space))
+		space = NO_SPACE
+		pos = end
+		if pos >= length:
+			break
+	return tokens
+
+def _block_comment_end(text, start):
+	# Block comments nest in Swift. Each part of the text is searched once.
+	depth = 1
+	pos = start + 2
+	close = text.find('*/', pos)
+	while depth and close >= 0:
+		opening = text.find('/*', pos, close)
+		if opening >= 0:
+			depth += 1
+			pos = opening + 2
+		else:
+			depth -= 1
+			pos = close + 2
+			if depth:
+				close = text.find('*/', pos)
+	return pos if depth == 0 else len(text)
+
+def _multiline_string_end(text, start):
+	pos = start + 3
+	while True:
+		end = text.find('"""', pos)
+		if end < 0:
+			return len(text)
+		backslashes = 0
+		while text[end - backslashes - 1] == '\\':
+			backslashes += 1
+		if backslashes % 2 == 0:
+			return end + 3
+		pos = end + 1
+
+
+class Declaration(object):
+
+	def __init__(self, kind, name, modifiers=None):
+		super(Declaration, self).__init__()
+		self.kind = kind
+		self.name = name
+		self.modifiers = modifiers or []
+		self.signature = None
+		self.type_name = None
+		self.value = None
+		self.return_type = None
+		self.inherited = []
+		self.parameters = []
+		self.is_computed = False
+		self.members = []
+
+	def __repr__(self):
+		return "<Declaration {} {}>".format(self.kind, self.name)
+
+	@property
+	def is_static(self):
+		return 'static' in self.modifiers or 'class' in self.modifiers
+
+	@property
+	def properties(self):
+		return [m for m in self.members if m.kind in _PROPERTY_KINDS and m.type_name and not m.is_static]
+
+	@property
+	def functions(self):
+		return [m for m in self.members if m.kind == 'func']
+
+	def declarations(self, kinds=None):
+		# Nested declarations, in the order they appear in the source.
+		pending = list(reversed(self.members))
+		while pending:
+			declaration = pending.pop()
+			if kinds is None or declaration.kind in kinds:
+				yield declaration
+			pending.extend(reversed(declaration.members))
+
+	def find(self, kinds, name=None):
+		for declaration in self.declarations(kinds):
+			if name is None or declaration.name == name:
+				return declaration
+		return None
+
+
+def parse(text):
+	with span('swift_parse', 'parse', size=len(text)):
+		return _Parser(tokenize(text)).parse()
+
+
+class _Parser(object):
+
+	def __init__(self, tokens):
+		super(_Parser, self).__init__()
+		self.tokens = tokens
+
+	def parse(self):
+		tokens = self.tokens
+		count = len(tokens)
+		root = Declaration('file', None)
+		stack = [root]
+		modifiers = []
+		i = 0
+		while i < count:
+			kind, text = tokens[i][0], tokens[i][1]
+			if text == '}':
+				if len(stack) > 1:
+					stack.pop()
+				modifiers = []
+				i += 1
+			elif kind == 'attribute':
+				modifiers.append(text)
+				i += 1
+				if i < count and tokens[i][1] == '(' and tokens[i][3] == NO_SPACE:
+					i = self._skip_group(i)
+			elif text == '{':
+				i = self._skip_group(i)
+			elif kind == 'directive':
+				i += 1
+				while i < count and tokens[i][3] != NEWLINE:
+					i += 1
+			elif kind != 'identifier':
+				modifiers = []
+				i += 1
+			elif text in _MODIFIERS and self._is_modifier(i):
+				modifiers.append(text)
+				i += 1
+				if i < count and tokens[i][1] == '(':
+					i = self._skip_group(i)
+			elif text in _TYPE_KINDS:
+				declaration, i = self._type(i, modifiers)
+				stack[-1].members.append(declaration)
+				if i < count and tokens[i][1] == '{':
+					stack.append(declaration)
+					i += 1
+				modifiers = []
+			elif text in _FUNCTION_KINDS:
+				declaration, i = self._function(i, modifiers)
+				stack[-1].members.append(declaration)
+				modifiers = []
+			elif text in _PROPERTY_KINDS:
+				declaration, i = self._property(i, modifiers)
+				if declaration is not None:
+					stack[-1].members.append(declaration)
+				modifiers = []
+			elif text == 'case' and stack[-1].kind == 'enum':
+				cases, i = self._cases(i)
+				stack[-1].members.extend(cases)
+				modifiers = []
+			elif text == 'typealias':
+				declaration, i = self._typealias(i, modifiers)
+				if declaration is not None:
+					stack[-1].members.append(declaration)
+				modifiers = []
+			else:
+				# Any other statement (import, associatedtype, ...)
+				i = max(i + 1, self._scan(i + 1, True)[0])
+				modifiers = []
+		return root
+
+	def _is_modifier(self, i):
+		# 'class' is a modifier in 'class func' and 'class var'.
+		if self.tokens[i][1] != 'class':
+			return True
+		return i + 1 < len(self.tokens) and self.tokens[i + 1][1] in _MODIFIERS | _FUNCTION_KINDS | _PROPERTY_KINDS
+
+	def _type(self, i, modifiers):
+		tokens = self.tokens
+		kind = tokens[i][1]
+		end = self._scan(i + 1, False)[0]
+		# The name ends at the generic parameters, the inheritance clause or
+		# the where clause.
+		name_end = i + 1
+		while name_end < end and tokens[name_end][1] not in ('<', ':', 'where'):
+			name_end += 1
+		declaration = Declaration(kind, self._text(i + 1, name_end).replace('`', ''), modifiers)
+		declaration.signature = self._text(i, end)
+		colon = self._find(name_end, end, ':')
+		if colon is not None:
+			where = self._find(colon, end, 'where')
+			declaration.inherited = self._split(colon + 1, end if where is None else where)
+		return (declaration, end)
+
+	def _function(self, i, modifiers):
+		tokens = self.tokens
+		kind = tokens[i][1]
+		end = self._scan(i + 1, False)[0]
+		name = tokens[i + 1][1].replace('`', '') if kind == 'func' and i + 1 < end else kind
+		declaration = Declaration(kind, name, modifiers)
+		declaration.signature = self._text(i, end)
+		arrow = self._find(i + 1, end, '->')
+		if arrow is not None:
+			where = self._find(arrow, end, 'where')
+			declaration.return_type = self._text(arrow + 1, end if where is None else where)
+		opening = self._find(i + 1, end if arrow is None else arrow, '(')
+		if opening is not None:
+			declaration.parameters = self._parameters(opening + 1, self._skip_group(opening) - 1)
+		if end < len(tokens) and tokens[end][1] == '{':
+			end = self._skip_group(end)
+		return (declaration, end)
+
+	def _property(self, i, modifiers):
+		tokens = self.tokens
+		count = len(tokens)
+		end, equals = self._scan(i + 1, False)
+		if i + 1 >= end or tokens[i + 1][0] != 'identifier':
+			# Tuple patterns are not supported.
+			return (None, max(end, i + 1))
+		declaration = Declaration(tokens[i][1], tokens[i + 1][1].replace('`', ''), modifiers)
+		declaration.signature = self._text(i, end if equals is None else equals)
+		if i + 2 < end and tokens[i + 2][1] == ':':
+			declaration.type_name = self._text(i + 3, end if equals is None else equals)
+		if end < count and tokens[end][1] == '{':
+			body_end = self._skip_group(end)
+			body = tokens[end + 1:body_end - 1]
+			declaration.is_computed = bool(body) and body[0][1] not in _OBSERVERS \
+				and any(t[1] not in _ACCESSORS for t in body)
+			end = body_end
+		elif equals is not None:
+			# Property observers follow the initial value.
+			value_end = end
+			for j in range(equals + 1, end - 1):
+				if tokens[j][1] == '{' and tokens[j + 1][1] in _OBSERVERS:
+					value_end = j
+					break
+			declaration.value = self._text(equals + 1, value_end)
+		return (declaration, end)
+
+	def _parameters(self, start, end):
+		# (label, name, type, default value) of each parameter; the default
+		# value is None for required parameters.
+		tokens = self.tokens
+		parameters = []
+		while start < end:
+			comma = self._find(start, end, ',')
+			stop = end if comma is None else comma
+			colon = self._find(start, stop, ':')
+			if colon is not None and colon > start:
+				equals = self._find(colon, stop, '=')
+				type_end = stop if equals is None else equals
+				default = None if equals is None else self._text(equals + 1, stop)
+				parameters.append((tokens[start][1], tokens[colon - 1][1], self._text(colon + 1, type_end), default))
+			start = stop + 1
+		return parameters
+
+	def _cases(self, i):
+		# One declaration per element of an enum case clause; the signature
+		# is the element, with its associated values or raw value.
+		tokens = self.tokens
+		end = self._scan(i + 1, True)[0]
+		cases = []
+		start = i + 1
+		while start < end:
+			comma = self._find(start, end, ',')
+			stop = end if comma is None else comma
+			if tokens[start][0] == 'identifier':
+				declaration = Declaration('case', tokens[start][1].replace('`', ''))
+				declaration.signature = self._text(start, stop)
+				if start + 1 < stop and tokens[start + 1][1] == '(':
+					declaration.parameters = self._parameters(start + 2, self._skip_group(start + 1) - 1)
+				cases.append(declaration)
+			start = stop + 1
+		return (cases, max(end, i + 1))
+
+	def _typealias(self, i, modifiers):
+		tokens = self.tokens
+		end, equals = self._scan(i + 1, True)
+		if i + 1 >= end or equals is None:
+			return (None, max(end, i + 1))
+		declaration = Declaration('typealias', tokens[i + 1][1].replace('`', ''), modifiers)
+		declaration.signature = self._text(i, end)
+		declaration.value = self._text(equals + 1, end)
+		return (declaration, end)
+
+	def _scan(self, i, braces):
+		# Returns the index of the token that ends the clause starting at i,
+		# and the index of its first top-level '=', if any. The clause ends
+		# at a ';', at an unbalanced closing bracket, at a line break that
+		# does not continue it, or, unless braces is set, at a top-level '{'.
+		# Angle brackets are only balanced before the '=', as they are
+		# operators in values; braces are always balanced after it, as they
+		# are closures there.
+		tokens = self.tokens
+		count = len(tokens)
+		closing = []
+		equals = None
+		while i < count:
+			kind, text, _, space = tokens[i]
+			if not closing:
+				if text in (';', '}', ')', ']', '>'):
+					break
+				if space == NEWLINE and not self._continues(i):
+					break
+				if text == '{' and not braces and equals is None:
+					break
+				if text == '=':
+					equals = i
+			if text in _OPENING and (text != '<' or equals is None) and (text != '{' or braces or closing or equals is not None):
+				closing.append(_OPENING[text])
+			elif closing and text == closing[-1]:
+				closing.pop()
+			elif closing and text in (')', ']', '}') and text in closing:
+				# Unbalanced angle brackets are dropped.
+				while closing.pop() != text:
+					pass
+			i += 1
+		return (i, equals)
+
+	def _continues(self, i):
+		tokens = self.tokens
+		previous = tokens[i - 1]
+		if previous[1] in _CONTINUE_AFTER or (previous[0] == 'operator' and previous[1] not in ('?', '!')):
+			return True
+		return tokens[i][1] in _CONTINUE_BEFORE
+
+	def _skip_group(self, i):
+		# Returns the index after the group that starts at tokens[i].
+		tokens = self.tokens
+		count = len(tokens)
+		opening = tokens[i][1]
+		closing = _OPENING[opening]
+		depth = 0
+		while i < count:
+			text = tokens[i][1]
+			if text == opening:
+				depth += 1
+			elif text == closing:
+				depth -= 1
+				if depth == 0:
+					return i + 1
+			i += 1
+		return count
+
+	def _find(self, start, end, text):
+		# Index of the first top-level token with the given text.
+		depth = 0
+		for i in range(start, end):
+			token = self.tokens[i][1]
+			if depth == 0 and token == text:
+				return i
+			if token in ('(', '[', '<', '{'):
+				depth += 1
+			elif token in (')', ']', '>', '}'):
+				depth = max(0, depth - 1)
+		return None
+
+	def _split(self, start, end):
+		parts = []
+		while start < end:
+			comma = self._find(start, end, ',')
+			stop = end if comma is None else comma
+			if stop > start:
+				parts.append(self._text(start, stop))
+			start = stop + 1
+		return parts
+
+	def _text(self, start, end):
+		# Source text of tokens[start:end] on a single line, with comments
+		# removed and whitespace collapsed.
+		tokens = self.tokens
+		parts = []
+		for i in range(start, end):
+			text, space = tokens[i][1], tokens[i][3]
+			if parts and space != NO_SPACE:
+				if space == SPACE or not (parts[-1] in ('(', '[', '<') or text in (')', ']', '>')):
+					parts.append(' ')
+			parts.append(text)
+		return ''.join(parts)
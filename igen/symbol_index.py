@@ -0,0 +1,379 @@
+# coding=utf-8
+
+import os
+import json
+import hashlib
+import threading
+from .cache import FileCache
+from .constants import SWIFT_TYPES_DEFAULT_VALUES
+from .swift_parser import parse
+from .trace import flush
+from . import metrics
+
+# Index of the type declarations of a project, stored in an SQLite database
+# (.igen-index) at the root of the project and built with 'igen index'.
+# Each file is parsed once; running the command again only parses the files
+# whose size, modification time or content changed.
+#
+# Generators use the index found in the current directory or its parents to
+# choose default values for types they do not know: the first case of an
+# enum, an initializer of a struct or class that can be called with default
+# arguments, or a type conforming to a protocol.
+
+INDEX_VERSION = 1
+MAX_DEPTH = 4
+
+_SCHEMA = [
+	"CREATE TABLE files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT)",
+	"CREATE TABLE symbols (name TEXT, qualified_name TEXT, kind TEXT, path TEXT, data TEXT)",
+	"CREATE INDEX symbols_name ON symbols (name)",
+	"CREATE INDEX symbols_path ON symbols (path)",
+	"CREATE TABLE conformances (protocol TEXT, name TEXT, path TEXT)",
+	"CREATE INDEX conformances_protocol ON conformances (protocol)",
+	"CREATE INDEX conformances_path ON conformances (path)"
+]
+
+_TYPE_KINDS = ['struct', 'class', 'enum', 'protocol', 'extension', 'actor', 'typealias']
+
+_COLLECTION_DEFAULT_VALUES = {
+	"Array": "[]",
+	"Set": "[]",
+	"Dictionary": "[:]",
+	"Optional": "nil"
+}
+
+
+class SymbolIndex(object):
+
+	FILE_NAME = ".igen-index"
+
+	def __init__(self, path):
+		super(SymbolIndex, self).__init__()
+		self.path = path
+		self.root = os.path.dirname(os.path.abspath(path))
+		# sqlite3 is only imported by the commands that use an index.
+		import sqlite3
+		# Generators render in threads; lookups are serialized by _lock.
+		self.connection = sqlite3.connect(path, check_same_thread=False)
+		self._symbols = {}
+		self._conformances = {}
+		self._default_values = {}
+		# Names looked up while recording, see fingerprint().
+		self.lookups = None
+		version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+		if version != INDEX_VERSION:
+			self._create_schema()
+
+	@staticmethod
+	def find(directory=None):
+		# Returns the index of the nearest directory containing one, or None.
+		directory = os.path.abspath(directory or os.getcwd())
+		while True:
+			path = os.path.join(directory, SymbolIndex.FILE_NAME)
+			if os.path.isfile(path):
+				import sqlite3
+				try:
+					return SymbolIndex(path)
+				except sqlite3.Error:
+					return None
+			parent = os.path.dirname(directory)
+			if parent == directory:
+				return None
+			directory = parent
+
+	def _create_schema(self):
+		with self.connection:
+			for table in ['files', 'symbols', 'conformances']:
+				self.connection.execute("DROP TABLE IF EXISTS {}".format(table))
+			for statement in _SCHEMA:
+				self.connection.execute(statement)
+			self.connection.execute("PRAGMA user_version = {}".format(INDEX_VERSION))
+
+	def close(self):
+		self.connection.close()
+
+	#=================== Update ===================
+
+	def update(self, jobs=None):
+		# Parses the Swift files of the project that changed since the last
+		# update. Returns the number of parsed, removed and indexed files.
+		jobs = jobs or os.cpu_count() or 1
+		known = dict((row[0], row[1:]) for row in self.connection.execute("SELECT path, size, mtime_ns, digest FROM files"))
+		seen = set()
+		changed = []
+		for path in self._source_files():
+			relative_path = os.path.relpath(path, self.root)
+			seen.add(relative_path)
+			try:
+				stat = os.stat(path)
+			except OSError:
+				continue
+			entry = known.get(relative_path)
+			if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+				continue
+			with open(path, "rb") as f:
+				data = f.read()
+			digest = FileCache.digest(data)
+			if entry is not None and entry[0] == len(data) and entry[2] == digest:
+				self.connection.execute("UPDATE files SET mtime_ns = ? WHERE path = ?", (stat.st_mtime_ns, relative_path))
+				continue
+			changed.append((relative_path, len(data), stat.st_mtime_ns, digest, data))
+		removed = [path for path in known if path not in seen]
+		if jobs > 1 and len(changed) > 1:
+			from concurrent.futures import ProcessPoolExecutor
+			with ProcessPoolExecutor(max_workers=jobs) as executor:
+				chunksize = max(1, len(changed) // (jobs * 4))
+				results = list(executor.map(_worker_file_symbols, [c[4] for c in changed], chunksize=chunksize))
+		else:
+			results = [file_symbols(c[4]) for c in changed]
+		with self.connection:
+			for path in removed + [c[0] for c in changed]:
+				self._remove_file(path)
+			for (path, size, mtime_ns, digest, _), (symbols, conformances) in zip(changed, results):
+				self.connection.execute("INSERT INTO files VALUES (?, ?, ?, ?)", (path, size, mtime_ns, digest))
+				self.connection.executemany(
+					"INSERT INTO symbols VALUES (?, ?, ?, ?, ?)",
+					[(name, qualified_name, kind, path, json.dumps(data)) for name, qualified_name, kind, data in symbols]
+				)
+				self.connection.executemany(
+					"INSERT INTO conformances VALUES (?, ?, ?)",
+					[(protocol, name, path) for protocol, name in conformances]
+				)
+		self._symbols = {}
+		self._conformances = {}
+		self._default_values = {}
+		metrics.count('cache.index.hit', len(seen) - len(changed))
+		metrics.count('cache.index.miss', len(changed))
+		return (len(changed), len(removed), len(seen))
+
+	def _source_files(self):
+		for directory, directories, files in os.walk(self.root):
+			directories[:] = sorted(d for d in directories if not d.startswith('.') and d not in ('Pods', 'Carthage', 'DerivedData'))
+			for file_name in sorted(files):
+				if file_name.endswith(".swift"):
+					yield os.path.join(directory, file_name)
+
+	def _remove_file(self, path):
+		self.connection.execute("DELETE FROM files WHERE path = ?", (path,))
+		self.connection.execute("DELETE FROM symbols WHERE path = ?", (path,))
+		self.connection.execute("DELETE FROM conformances WHERE path = ?", (path,))
+
+	#=================== Lookup ===================
+
+	def symbols(self, name):
+		# Declarations and extensions of the types with the given name, as
+		# (kind, data) pairs, declarations first.
+		if self.lookups is not None:
+			self.lookups.add(name)
+		symbols = self._symbols.get(name)
+		if symbols is None:
+			rows = self.connection.execute("SELECT kind, data FROM symbols WHERE name = ?", (name,)).fetchall()
+			symbols = [(kind, json.loads(data)) for kind, data in rows]
+			symbols.sort(key=lambda symbol: symbol[0] == 'extension')
+			self._symbols[name] = symbols
+		return symbols
+
+	def declaration(self, name):
+		symbols = self.symbols(name)
+		if symbols and symbols[0][0] != 'extension':
+			return symbols[0]
+		return (None, None)
+
+	def conforming_types(self, protocol):
+		if self.lookups is not None:
+			self.lookups.add(protocol)
+		names = self._conformances.get(protocol)
+		if names is None:
+			rows = self.connection.execute("SELECT name FROM conformances WHERE protocol = ?", (protocol,)).fetchall()
+			names = self._conformances[protocol] = [row[0] for row in rows]
+		return names
+
+	def default_value(self, type_name, depth=0):
+		# A Swift expression of the given type, or None if none is known.
+		type_name = type_name.strip()
+		if depth > MAX_DEPTH:
+			return None
+		if type_name.endswith(("?", "!")):
+			return "nil"
+		if type_name.startswith("["):
+			return "[:]" if _top_level_colon(type_name[1:-1]) else "[]"
+		if type_name.startswith("("):
+			return None
+		if type_name in SWIFT_TYPES_DEFAULT_VALUES:
+			return SWIFT_TYPES_DEFAULT_VALUES[type_name]
+		base_name = type_name.split("<", 1)[0]
+		if base_name in _COLLECTION_DEFAULT_VALUES:
+			return _COLLECTION_DEFAULT_VALUES[base_name]
+		key = (type_name, depth)
+		if key not in self._default_values or self.lookups is not None:
+			self._default_values[key] = None
+			self._default_values[key] = self._declared_default_value(type_name, base_name.split(".")[-1], depth)
+		return self._default_values[key]
+
+	def fingerprint(self, name):
+		# Digest of everything the index knows about a name. Results derived
+		# from the index stay valid while the fingerprints of the names
+		# looked up to compute them are unchanged.
+		data = json.dumps([self.symbols(name), self.conforming_types(name)], sort_keys=True)
+		return hashlib.sha1(data.encode('utf8')).hexdigest()
+
+	def protocol_requirements(self, name):
+		# (functions, inherited protocols) of a protocol, or None. Functions
+		# are (signature, name, return type) lists.
+		kind, data = self.declaration(name)
+		if kind != 'protocol':
+			return None
+		return (data.get('functions', []), data.get('inherited', []))
+
+	def _declared_default_value(self, type_name, name, depth):
+		kind, data = self.declaration(name)
+		if kind is None:
+			return None
+		if kind == 'typealias':
+			return self.default_value(data['value'], depth + 1)
+		if kind == 'enum':
+			return "{}.{}".format(type_name, data['case']) if data.get('case') else None
+		if kind == 'protocol':
+			return self._conforming_default_value(name, depth)
+		initializers = []
+		for symbol_kind, symbol_data in self.symbols(name):
+			initializers.extend(symbol_data.get('initializers', []))
+		# The initializer with the fewest required arguments that can all be
+		# created is used.
+		initializers.sort(key=lambda parameters: sum(1 for p in parameters if not p[2]))
+		for parameters in initializers:
+			arguments = []
+			for label, parameter_type, has_default in parameters:
+				if has_default:
+					continue
+				value = self.default_value(parameter_type, depth + 1)
+				if value is None:
+					break
+				arguments.append(value if label == "_" else "{}: {}".format(label, value))
+			else:
+				return "{}({})".format(type_name, ", ".join(arguments))
+		return None
+
+	def _conforming_default_value(self, protocol, depth):
+		# Mocks are preferred to other conforming types.
+		names = sorted(self.conforming_types(protocol), key=lambda name: not name.endswith("Mock"))
+		for name in names:
+			value = self.default_value(name, depth + 1)
+			if value is not None:
+				return value
+		return None
+
+
+def _top_level_colon(text):
+	depth = 0
+	for c in text:
+		if c in "[(<":
+			depth += 1
+		elif c in "])>":
+			depth -= 1
+		elif c == ":" and depth == 0:
+			return True
+	return False
+
+
+def _worker_file_symbols(data):
+	try:
+		return file_symbols(data)
+	finally:
+		flush()
+
+def file_symbols(data):
+	# Returns the symbols declared in a source file, as (name, qualified
+	# name, kind, data) tuples, and its (protocol, type) conformances.
+	symbols = []
+	conformances = []
+	try:
+		root = parse(data.decode('utf8', 'replace'))
+	except Exception:
+		return (symbols, conformances)
+	pending = [(declaration, None) for declaration in reversed(root.members)]
+	while pending:
+		declaration, parent_name = pending.pop()
+		if declaration.kind not in _TYPE_KINDS:
+			continue
+		name = declaration.name
+		qualified_name = name if parent_name is None or declaration.kind == 'extension' else "{}.{}".format(parent_name, name)
+		symbols.append((name.split(".")[-1], qualified_name, declaration.kind, _symbol_data(declaration)))
+		for protocol in declaration.inherited:
+			conformances.append((protocol.split("<", 1)[0], name.split(".")[-1]))
+		pending.extend((member, qualified_name) for member in reversed(declaration.members))
+	return (symbols, conformances)
+
+def _symbol_data(declaration):
+	kind = declaration.kind
+	if kind == 'typealias':
+		return {'value': declaration.value}
+	data = {'inherited': declaration.inherited}
+	if kind == 'enum':
+		cases = [m for m in declaration.members if m.kind == 'case' and '(' not in m.signature]
+		data['case'] = cases[0].name if cases else None
+	if kind == 'protocol':
+		data['functions'] = [[f.signature, f.name, f.return_type] for f in declaration.functions]
+	if kind in ('struct', 'class', 'actor', 'extension'):
+		data['initializers'] = _initializers(declaration)
+	return data
+
+def _initializers(declaration):
+	# Parameters of the initializers of a type, as (label, type, has default
+	# value) lists, including the implicit ones.
+	initializers = []
+	for member in declaration.members:
+		if member.kind == 'init' and not member.signature.startswith(("init?", "init!")) and 'private' not in member.modifiers:
+			initializers.append([[p[0], p[2], p[3] is not None] for p in member.parameters])
+	if initializers or declaration.kind == 'extension':
+		return initializers
+	stored = [p for p in declaration.members if p.kind in ('var', 'let') and not p.is_static and not p.is_computed]
+	if declaration.kind == 'struct':
+		# Memberwise initializer
+		return [[
+			[p.name, p.type_name, p.value is not None or (p.kind == 'var' and p.type_name.endswith("?"))]
+			for p in stored if p.type_name and not (p.kind == 'let' and p.value is not None)
+		]]
+	if all(p.value is not None or (p.kind == 'var' and (p.type_name or "").endswith("?")) for p in stored):
+		return [[]]
+	return []
+
+
+_index = None
+_index_loaded = False
+_index_pid = None
+_lock = threading.Lock()
+
+def shared_index():
+	# The index of the project containing the current directory, if any,
+	# shared by every generator in the process.
+	global _index, _index_loaded, _index_pid
+	with _lock:
+		if not _index_loaded:
+			_index = SymbolIndex.find()
+			_index_loaded = True
+			_index_pid = os.getpid()
+		return _index
+
+def load_shared_index(directory):
+	# Uses the index of the project containing directory instead. Worker
+	# processes open their own connection, as SQLite connections cannot be
+	# shared with a forked process.
+	global _index, _index_loaded, _index_pid
+	with _lock:
+		if _index is None or _index_pid != os.getpid() \
+			or not os.path.join(os.path.abspath(directory), '').startswith(os.path.join(_index.root, '')):
+			_index = SymbolIndex.find(directory)
+			_index_loaded = True
+			_index_pid = os.getpid()
+		return _index
+
+def default_value(type_name):
+	# Default value of a type that is not a standard type: resolved with the
+	# project index when there is one, else an initializer call.
+	index = shared_index()
+	if index is None:
+		return "{}()".format(type_name)
+	with _lock:
+		value = index.default_value(type_name)
+	return value if value is not None else "{}()".format(type_name)
@@ -1,9 +1,11 @@
 # coding=utf-8
 
+import os
 from subprocess import call
 from .config_cmd import ConfigCommand
 from .template import Template, ProjectInfo
 from .pb import pasteboard_read
+from .sink import create_sink, is_directory_output
 from .command import Command
 
 class TemplateCommand(Command):
@@ -13,6 +15,10 @@ class TemplateCommand(Command):
 		self.scene_name = scene_name
 		self.options = options
 
+	@property
+	def requires_model(self):
+		return self.template_name in [Template.TemplateType.LIST, Template.TemplateType.DETAIL]
+
 	def create_files(self):
 		info = ConfigCommand().project_info(False)
 		if info != None:
@@ -20,33 +26,41 @@ class TemplateCommand(Command):
 		else:
 			project, developer, company = ConfigCommand().update_project_info()
 		project_info = ProjectInfo(project, developer, company)
-		if self.template_name == Template.TemplateType.BASE:
-			template = Template.BaseTemplate(self.scene_name, project_info)
-			template.create_files()
-		elif self.template_name == Template.TemplateType.LIST:
+		model = None
+		if self.requires_model:
 			model_text = pasteboard_read()
 			try:
 				model = Template().parse_model(model_text)
 			except:
 				print("The Model in the pasteboard is invalid.")
 				exit(1)
-			template = Template.ListTemplate(model, self.options, self.scene_name, project_info)
-			template.create_files()
-		elif self.template_name == Template.TemplateType.DETAIL:
-			model_text = pasteboard_read()
-			try:
-				model = Template().parse_model(model_text)
-			except:
-				print("The Model in the pasteboard is invalid.")
-				exit(1)
-			if self.options['static']:
-				template = Template.StaticDetailTemplate(model, self.options, self.scene_name, project_info)
-			else:
-				template = Template.DetailTemplate(model, self.options, self.scene_name, project_info)
-			template.create_files()
-		else:
+		template = self.template(model, project_info)
+		if template is None:
 			print("Invalid template type.")
 			exit(1)
-		targetDirectory = "./{}".format(self.scene_name)
-		call(["open", targetDirectory])
+		output = self.options.get('output') or "."
+		sink = create_sink(output, self.options.get('force', False))
+		try:
+			template.create_files(sink)
+		finally:
+			sink.close()
+		if is_directory_output(output):
+			targetDirectory = os.path.join(output, self.scene_name)
+			call(["open", targetDirectory])
+
+	def template(self, model, project_info):
+		template = self._template(model, project_info)
+		if template is not None:
+			template.select(self.options.get('only'), self.options.get('except'))
+		return template
 
+	def _template(self, model, project_info):
+		if self.template_name == Template.TemplateType.BASE:
+			return Template.BaseTemplate(self.scene_name, project_info)
+		elif self.template_name == Template.TemplateType.LIST:
+			return Template.ListTemplate(model, self.options, self.scene_name, project_info)
+		elif self.template_name == Template.TemplateType.DETAIL:
+			if self.options['static']:
+				return Template.StaticDetailTemplate(model, self.options, self.scene_name, project_info)
+			return Template.DetailTemplate(model, self.options, self.scene_name, project_info)
+		return None
@@ -0,0 +1,21 @@
+# coding=utf-8
+
+from .env import TEMPLATE_SETS, compile_templates, remove_compiled_templates
+from .command import Command
+
+class TemplatesCommand(Command):
+
+	def compile(self, zip):
+		print('Successfully compiled templates:')
+		for template_set in TEMPLATE_SETS:
+			try:
+				path, count = compile_templates(template_set, zip)
+			except Exception as e:
+				print("Failed to compile the '{}' templates: {}".format(template_set, e))
+				exit(1)
+			print("    {} ({} templates)".format(path, count))
+
+	def clean(self):
+		for template_set in TEMPLATE_SETS:
+			remove_compiled_templates(template_set)
+		print('Removed compiled templates.')
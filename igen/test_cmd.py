@@ -16,4 +16,3 @@ class UnitTestCommand(Command):
 			print(output)
 			print()
 		pasteboard_write(output)
-		print("The result has been copied to the pasteboard.")
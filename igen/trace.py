@@ -0,0 +1,188 @@
+# coding=utf-8
+
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+# Spans of the stages of a command (reading the input, parsing, creating
+# the template environments, loading and rendering templates, writing
+# files), recorded when igen runs with --profile or IGEN_TRACE=FILE:
+#
+#     with span('parse_model', 'parse'):
+#         ...
+#
+# When the command ends, the spans are written to FILE (igen-trace.json by
+# default) in the Chrome trace event format, which chrome://tracing and
+# https://ui.perfetto.dev open, and a summary is printed to stderr. Worker
+# processes append their spans to FILE.<pid>.part files, which are merged
+# into the trace by the main process.
+
+DEFAULT_FILE = "igen-trace.json"
+
+_path = None
+_name = None
+_args = None
+_start = None
+_main_pid = None
+_events = None
+_events_pid = None
+_lock = threading.Lock()
+
+
+class _Span(object):
+
+	def __init__(self, name, category, args):
+		super(_Span, self).__init__()
+		self.name = name
+		self.category = category
+		self.args = args
+
+	def __enter__(self):
+		self.start = time.perf_counter_ns()
+		return self
+
+	def __exit__(self, type, value, traceback):
+		_record(_event(self.name, self.category, self.start, time.perf_counter_ns() - self.start, self.args))
+		return False
+
+
+class _NoSpan(object):
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, type, value, traceback):
+		return False
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name, category='igen', **args):
+	if _path is None:
+		return _NO_SPAN
+	return _Span(name, category, args)
+
+def add_span(name, category, start, duration, **args):
+	# Records a span timed by the caller, in nanoseconds, e.g. the time
+	# spent in a generator without the time of its consumer.
+	if _path is not None:
+		_record(_event(name, category, start, duration, args))
+
+def _event(name, category, start, duration, args):
+	event = {
+		'name': name,
+		'cat': category,
+		'ph': 'X',
+		'ts': start / 1000.0,
+		'dur': duration / 1000.0,
+		'pid': os.getpid(),
+		'tid': threading.get_ident(),
+	}
+	if args:
+		event['args'] = args
+	return event
+
+def _record(event):
+	global _events, _events_pid
+	with _lock:
+		# A forked worker starts with a copy of the spans of its parent.
+		if _events_pid != os.getpid():
+			_events = []
+			_events_pid = os.getpid()
+		_events.append(event)
+
+
+def is_enabled():
+	return _path is not None
+
+def start(path=None, name='igen', **args):
+	# Starts recording in the main process of the command. The environment
+	# tells the worker processes where to write their spans.
+	global _path, _name, _args, _start, _main_pid
+	_path = os.path.abspath(path or DEFAULT_FILE)
+	_name = name
+	_args = args
+	_start = time.perf_counter_ns()
+	_main_pid = os.getpid()
+	os.environ['IGEN_TRACE'] = _path
+	os.environ['IGEN_TRACE_PID'] = str(_main_pid)
+	for part in _part_files():
+		os.remove(part)
+
+def _resume_in_worker():
+	# Worker processes that are not forked import this module again.
+	global _path, _main_pid
+	path = os.environ.get('IGEN_TRACE')
+	pid = os.environ.get('IGEN_TRACE_PID')
+	if path and pid and pid != str(os.getpid()):
+		_path = path
+		_main_pid = int(pid)
+
+def _part_files():
+	import glob
+	return glob.glob(glob.escape(_path) + ".*.part")
+
+def flush():
+	# Called by worker processes when a task is done, as they may exit
+	# without running atexit handlers.
+	global _events
+	if _path is None or os.getpid() == _main_pid:
+		return
+	import json
+	with _lock:
+		events = _events if _events_pid == os.getpid() else []
+		_events = []
+	if events:
+		with open("{}.{}.part".format(_path, os.getpid()), "a") as f:
+			for event in events:
+				f.write(json.dumps(event) + "\n")
+
+def finish():
+	# Writes the trace and prints the summary.
+	global _path
+	if _path is None or os.getpid() != _main_pid:
+		return
+	import json
+	end = time.perf_counter_ns()
+	events = list(_events) if _events_pid == os.getpid() else []
+	events.append({
+		'name': _name,
+		'cat': 'command',
+		'ph': 'X',
+		'ts': _start / 1000.0,
+		'dur': (end - _start) / 1000.0,
+		'pid': os.getpid(),
+		'tid': threading.get_ident(),
+		'args': _args,
+	})
+	for part in sorted(_part_files()):
+		with open(part) as f:
+			events.extend(json.loads(line) for line in f if line.strip())
+		os.remove(part)
+	events.sort(key=lambda event: event['ts'])
+	try:
+		with open(_path, "w") as f:
+			json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+	except OSError as e:
+		print("Could not write the trace: {}".format(e), file=sys.stderr)
+	else:
+		print_summary(events, sys.stderr)
+		print("The trace has been written to {}.".format(_path), file=sys.stderr)
+	_path = None
+
+def print_summary(events, file):
+	stages = OrderedDict()
+	for event in events:
+		calls, total, longest = stages.get(event['name'], (0, 0.0, 0.0))
+		stages[event['name']] = (calls + 1, total + event['dur'], max(longest, event['dur']))
+	print(file=file)
+	print("{:<24} {:>7} {:>12} {:>12} {:>12}".format("stage", "calls", "total", "average", "max"), file=file)
+	for name, (calls, total, longest) in sorted(stages.items(), key=lambda item: -item[1][1]):
+		print("{:<24} {:>7} {:>10.2f}ms {:>10.2f}ms {:>10.2f}ms".format(
+			name, calls, total / 1000, total / calls / 1000, longest / 1000), file=file)
+	print("Spans are nested, and spans of threads and worker processes overlap.", file=file)
+
+
+_resume_in_worker()
@@ -1,7 +1,7 @@
 # coding=utf-8
 
-import re
-from jinja2 import Environment, PackageLoader
+from .env import get_env
+from .swift_parser import parse
 
 class ViewModel(object):
 
@@ -17,13 +17,21 @@ class ViewModel(object):
 	def __init__(self, vm_text):
 		super(ViewModel, self).__init__()
 		self.vm_text = vm_text
+		self._declarations = None
+
+	@property
+	def declarations(self):
+		if self._declarations is None:
+			self._declarations = parse(self.vm_text)
+		return self._declarations
 
 	@property
 	def view_model_name(self):
 		try:
-			regex = re.compile("(?:struct|extension) (\w+)ViewModel")
-			mo = regex.search(self.vm_text)
-			return mo.group(1)
+			for declaration in self.declarations.declarations(['struct', 'class', 'extension']):
+				if declaration.name.endswith("ViewModel"):
+					return declaration.name[:-len("ViewModel")]
+			raise ValueError()
 		except:
 			print("The ViewModel in the pasteboard is invalid.")
 			exit(1)
@@ -31,30 +39,23 @@ class ViewModel(object):
 	@property
 	def properties(self):
 		try:
-			str = self.vm_text
-			input_block_regex = re.compile("struct Input {([^}]+)")
-			input_block = input_block_regex.search(str).group(1)
-			input_properties_regex = re.compile("let (\w+): Driver<([^>]+)>")
-			input_properties = [ViewModel.Property(p[0], p[1]) for p in input_properties_regex.findall(input_block)]
-			output_block_regex = re.compile("struct Output {([^}]+)")
-			output_block = output_block_regex.search(str).group(1)
-			output_properties_regex = re.compile("let (\w+): Driver<([^>]+)>")
-			output_properties = [ViewModel.Property(p[0], p[1]) for p in output_properties_regex.findall(output_block)]
+			input_properties = self._driver_properties(self.declarations.find(['struct'], "Input"))
+			output_properties = self._driver_properties(self.declarations.find(['struct'], "Output"))
 			return (input_properties, output_properties)
 		except:
 			print("The ViewModel in the pasteboard is invalid.")
 			exit(1)
-	
+
+	def _driver_properties(self, declaration):
+		return [ViewModel.Property(p.name, p.type_name[len("Driver<"):-1]) for p in declaration.properties
+			if p.kind == 'let' and p.type_name.startswith("Driver<") and p.type_name.endswith(">")]
+
 
 class UnitTest(ViewModel):
 
 	def create_tests(self):
 		input_properties, output_properties = self.properties
-		env = Environment(
-			loader=PackageLoader('igen_templates', 'commands'),
-			trim_blocks=True,
-			lstrip_blocks=True
-		)
+		env = get_env('commands')
 		template = env.get_template("UnitTest.swift")
 		content = template.render(
 			name=self.view_model_name,
@@ -68,11 +69,7 @@ class BindViewModel(ViewModel):
 
 	def create_bind_view_model(self):
 		input_properties, output_properties = self.properties
-		env = Environment(
-			loader=PackageLoader('igen_templates', 'commands'),
-			trim_blocks=True,
-			lstrip_blocks=True
-		)
+		env = get_env('commands')
 		template = env.get_template("BindViewModel.swift")
 		content = template.render(
 			name=self.view_model_name,
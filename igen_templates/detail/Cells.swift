@@ -0,0 +1,8 @@
+import UIKit
+import Reusable
+{% for p in properties %}
+
+final class {{ model_name }}{{ p.name_title }}Cell: UITableViewCell, NibReusable {
+    @IBOutlet weak var {{ p.name }}Label: UILabel!
+}
+{% endfor %}
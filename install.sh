@@ -1 +1,2 @@
-pip3 install .
\ No newline at end of file
+pip3 install .
+igen templates compile
\ No newline at end of file
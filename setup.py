@@ -17,7 +17,9 @@ setup(
 	packages = ['igen', 'igen_templates'],
 	entry_points = {
 		'console_scripts': [
-			'igen = igen.__main__:main'
+			'igen = igen.__main__:main',
+			'igenc = igen.client:main',
+			'igen-bench = igen.bench:main'
 		]
 	},
 	classifiers=[
@@ -27,5 +29,6 @@ setup(
     ],
 	python_requires=">=3",
 	install_requires=['Jinja2>=2.10', 'arghandler>=1.2'],
+	extras_require={'yaml': ['PyYAML']},
 	include_package_data = True
 	)
\ No newline at end of file
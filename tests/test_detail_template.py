@@ -0,0 +1,71 @@
+# coding=utf-8
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from igen.Template import Template, ProjectInfo
+from igen.sink import DirectorySink
+
+MODEL = """
+struct Product {
+    var id: Int
+    var name: String
+    var price: Double
+}
+"""
+
+PER_PROPERTY_CELLS = ["ProductIdCell.swift", "ProductNameCell.swift", "ProductPriceCell.swift"]
+SINGLE_CELL_FILE = "ProductDetailCells.swift"
+
+
+class DetailTemplateCellModeTests(unittest.TestCase):
+
+	def setUp(self):
+		self.root = tempfile.mkdtemp()
+		self.scene = os.path.join(self.root, "ProductDetail")
+
+	def tearDown(self):
+		shutil.rmtree(self.root)
+
+	def create_files(self, single_cell_file, force=False, **selection):
+		model = Template().parse_model(MODEL)
+		template = Template.DetailTemplate(model, {'single_cell_file': single_cell_file}, "ProductDetail", ProjectInfo("Demo", "Dev", "Co"))
+		template.select(**selection)
+		with redirect_stdout(io.StringIO()):
+			template.create_files(DirectorySink(self.root, force))
+
+	def cell_files(self):
+		return sorted(name for name in os.listdir(self.scene) if name.endswith(("Cell.swift", "Cells.swift")))
+
+	def test_switch_to_single_cell_file(self):
+		self.create_files(False)
+		self.assertEqual(self.cell_files(), PER_PROPERTY_CELLS)
+		self.create_files(True)
+		self.assertEqual(self.cell_files(), [SINGLE_CELL_FILE])
+
+	def test_switch_to_cell_per_property(self):
+		self.create_files(True)
+		self.assertEqual(self.cell_files(), [SINGLE_CELL_FILE])
+		self.create_files(False)
+		self.assertEqual(self.cell_files(), PER_PROPERTY_CELLS)
+
+	def test_modified_cell_file_is_kept(self):
+		self.create_files(False)
+		with open(os.path.join(self.scene, "ProductNameCell.swift"), "a") as f:
+			f.write("// edited\n")
+		self.create_files(True)
+		self.assertEqual(self.cell_files(), [SINGLE_CELL_FILE, "ProductNameCell.swift"])
+		self.create_files(True, force=True)
+		self.assertEqual(self.cell_files(), [SINGLE_CELL_FILE])
+
+	def test_cells_not_selected_are_kept(self):
+		self.create_files(False)
+		self.create_files(True, excluded=["Cell"])
+		self.assertEqual(self.cell_files(), PER_PROPERTY_CELLS)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,107 @@
+# coding=utf-8
+
+import io
+import re
+import sys
+import json
+import importlib
+import unittest
+from collections import OrderedDict
+
+# igen imports these modules by their lowercase names, which only resolve
+# on a case-insensitive file system.
+for _name in ['Constants', 'Command']:
+	sys.modules.setdefault('igen.' + _name.lower(), importlib.import_module('igen.' + _name))
+
+from igen.json_cmd import JSON
+from igen.json_stream import iter_events
+from igen.json_schema import Sampling, DepthLimitError, infer, infer_events
+
+# Deeper than the recursion limit of the interpreter.
+DEPTH = 20000
+
+
+def _models(document, name="Root"):
+	text = JSON(name, json.dumps(document)).create_models()
+	return OrderedDict(
+		(match.group(1), re.findall(r"^    var (\w+): (.+)$", match.group(2), re.M))
+		for match in re.finditer(r"^struct (\w+) \{\n(.*?)^\}", text, re.M | re.S)
+	)
+
+
+class JSONModelDeduplicationTests(unittest.TestCase):
+
+	def test_same_shape_is_one_model(self):
+		image = OrderedDict([("url", "x"), ("width", 1)])
+		models = _models(OrderedDict([("avatar", image), ("cover", image), ("images", [image, image])]))
+		self.assertEqual(list(models), ["Avatar", "Root"])
+		self.assertEqual(models["Root"], [("avatar", "Avatar?"), ("cover", "Avatar?"), ("images", "[Avatar]")])
+
+	def test_compatible_shapes_are_one_model(self):
+		models = _models(OrderedDict([
+			("owner", OrderedDict([("id", 1), ("name", "a")])),
+			("editor", OrderedDict([("id", 2), ("name", None)])),
+		]))
+		self.assertEqual(list(models), ["Owner", "Root"])
+		self.assertEqual(models["Owner"], [("id", "Int"), ("name", "String?")])
+		self.assertEqual(models["Root"], [("owner", "Owner?"), ("editor", "Owner?")])
+
+	def test_different_shapes_have_unique_names(self):
+		models = _models(OrderedDict([
+			("user", OrderedDict([("id", 1)])),
+			("post", OrderedDict([("user", OrderedDict([("name", "a")]))])),
+			("comment", OrderedDict([("user", OrderedDict([("email", "a")]))])),
+		]))
+		self.assertEqual(list(models), ["User", "User2", "Post", "User3", "Comment", "Root"])
+		self.assertEqual(models["Post"], [("user", "User2?")])
+		self.assertEqual(models["Comment"], [("user", "User3?")])
+
+	def test_root_is_not_shared(self):
+		models = _models(OrderedDict([("id", 1), ("parent", OrderedDict([("id", 2)]))]))
+		self.assertEqual(list(models), ["Parent", "Root"])
+
+
+def _nested(depth):
+	return '{"a": ' * depth + '1' + '}' * depth
+
+
+class JSONDepthTests(unittest.TestCase):
+
+	def test_deep_document(self):
+		models = _models(json.loads(_nested(100)))
+		self.assertEqual(len(models), 100)
+		self.assertEqual(models["A"], [("a", "Int")])
+		text = JSON("Root", _nested(DEPTH), max_depth=DEPTH + 1).create_models()
+		self.assertEqual(text.count("struct "), DEPTH)
+
+	def test_deep_stream(self):
+		schema = infer_events(iter_events(io.StringIO(_nested(DEPTH))), JSON.DATE_REGEX, Sampling(), DEPTH + 1)
+		for _ in range(DEPTH):
+			schema = schema.fields["a"]
+		self.assertEqual(schema.kinds, set(['int']))
+
+	def test_depth_limit(self):
+		document = json.loads('{"data": [{"items": [{"a": {"b": 1}}]}]}')
+		infer(document, JSON.DATE_REGEX, Sampling(), 6)
+		for max_depth in [5, 4]:
+			with self.assertRaises(DepthLimitError) as context:
+				infer(document, JSON.DATE_REGEX, Sampling(), max_depth)
+			self.assertEqual(context.exception.max_depth, max_depth)
+		self.assertEqual(context.exception.path, "$.data[0].items[0]")
+		self.assertIn("--max-depth", str(context.exception))
+
+	def test_stream_depth_limit(self):
+		text = '{"data": [{"items": [{"a": {"b": 1}}]}]}'
+		for max_depth, path in [(5, "$.data[0].items[0].a"), (2, "$.data[0]")]:
+			with self.assertRaises(DepthLimitError) as context:
+				infer_events(iter_events(io.StringIO(text)), JSON.DATE_REGEX, Sampling(), max_depth)
+			self.assertEqual(context.exception.path, path)
+
+	def test_deep_path_is_shortened(self):
+		with self.assertRaises(DepthLimitError) as context:
+			infer_events(iter_events(io.StringIO(_nested(DEPTH))), JSON.DATE_REGEX, Sampling(), 100)
+		self.assertEqual(context.exception.path, "$.a.a.a.a.a.a....a.a.a.a.a")
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,91 @@
+# coding=utf-8
+
+import io
+import json
+import unittest
+from collections import OrderedDict
+from igen.json_stream import iter_events
+from igen.json_schema import Sampling, infer, infer_events
+
+DATE_REGEX = r"(\d{4})[-/](\d{2})[-/](\d{2})"
+
+DOCUMENT = json.dumps(OrderedDict([
+	("meta", OrderedDict([("page", 1), ("note", None)])),
+	("data", [
+		OrderedDict([("id", 1), ("name", "a ] } \" [ {"), ("tags", [[1, 2], []]), ("created", "2020-01-01")]),
+		OrderedDict([("id", 2.5), ("name", None), ("extra", OrderedDict([("deep", [True, False])]))]),
+		OrderedDict([("id", 3), ("name", "c"), ("images", [OrderedDict([("url", "x")])])]),
+	] * 3),
+]), indent=1)
+
+
+def _dump(schema):
+	if schema is None:
+		return None
+	return (
+		sorted(schema.kinds),
+		schema.objects,
+		[(key, schema.field_counts[key], _dump(field)) for key, field in schema.fields.items()],
+		_dump(schema.element)
+	)
+
+
+class _CountedEvents(object):
+
+	def __init__(self, events):
+		self.events = events
+		self.count = 0
+
+	def __iter__(self):
+		for event in self.events:
+			self.count += 1
+			yield event
+
+	def skip(self, depth=1):
+		self.events.skip(depth)
+
+
+class JSONStreamTests(unittest.TestCase):
+
+	def test_sampled_schema_matches_infer(self):
+		document = json.loads(DOCUMENT, object_pairs_hook=OrderedDict)
+		for limit in [0, 1, 2, 4]:
+			expected = _dump(infer(document, DATE_REGEX, Sampling(limit)))
+			for chunk_size in [1, 2, 5, 64, 1 << 16]:
+				events = iter_events(io.StringIO(DOCUMENT), chunk_size)
+				self.assertEqual(_dump(infer_events(events, DATE_REGEX, Sampling(limit))), expected)
+
+	def test_reservoir_sampling_reads_every_element(self):
+		schema = infer_events(iter_events(io.StringIO(DOCUMENT), 3), DATE_REGEX, Sampling(2, Sampling.RESERVOIR, seed=1))
+		self.assertEqual(schema.kinds, set(['object']))
+		self.assertEqual(schema.fields['data'].kinds, set(['array']))
+
+	def test_skipped_elements_yield_no_events(self):
+		text = "[" + ",".join(['{"a": [1, {"b": "]"}], "c": "x"}'] * 1000) + "]"
+		events = _CountedEvents(iter_events(io.StringIO(text), 64))
+		schema = infer_events(events, DATE_REGEX, Sampling(1))
+		self.assertEqual(list(schema.element.fields), ['a', 'c'])
+		self.assertLess(events.count, 20)
+
+	def test_time_budget_skips_the_remaining_elements(self):
+		text = "[" + ",".join(['{"a": 1}'] * 10000) + "]"
+		events = _CountedEvents(iter_events(io.StringIO(text), 64))
+		schema = infer_events(events, DATE_REGEX, Sampling(time_budget=0))
+		self.assertEqual(list(schema.element.fields), ['a'])
+		self.assertLess(events.count, 10)
+
+	def test_invalid_documents(self):
+		for text in ['[1,2', '{"a":1,}', '[1 2]', '{"a" 1}', '[1]]', '{"a":[1,{"b":2}', '"abc', '[1]x', '[nul]']:
+			for chunk_size in [1, 3, 64]:
+				with self.assertRaises(ValueError):
+					infer_events(iter_events(io.StringIO(text), chunk_size), DATE_REGEX, Sampling(0))
+
+	def test_literal_split_across_chunks(self):
+		text = '[\n    null,\n    true\n]'
+		for chunk_size in range(1, len(text) + 1):
+			events = list(iter_events(io.StringIO(text), chunk_size))
+			self.assertEqual(events, [('start_array', None), ('literal', None), ('literal', True), ('end_array', None)])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,183 @@
+# coding=utf-8
+
+import io
+import os
+import shutil
+import tarfile
+import zipfile
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from igen.sink import DirectorySink, StdoutSink, SPOOL_SIZE, create_sink
+from igen.manifest import Manifest
+from igen.Template import Template, ProjectInfo
+
+FILES = [("Product/ProductViewModel.swift", "class ProductViewModel {}\n"), ("Product/Test/ProductViewModelTests.swift", "class Tests {}\n")]
+
+# Written with write_chunks(), and spooled to a temporary file.
+LARGE_FILE = ("Product/ProductCells.swift", ["// {}\n".format(i) * 1000 for i in range(SPOOL_SIZE // 5000)])
+
+MODEL = """
+struct Product {
+    var id: Int
+    var name: String
+}
+"""
+
+
+class DirectorySinkManifestTests(unittest.TestCase):
+
+	def setUp(self):
+		self.root = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.root)
+
+	def path(self, file_path):
+		return os.path.join(self.root, file_path)
+
+	def write(self, files, force=False):
+		output = io.StringIO()
+		with redirect_stdout(output):
+			sink = DirectorySink(self.root, force)
+			sink.begin("Product")
+			for file_path, content in files:
+				sink.write(file_path, content)
+			sink.end()
+			sink.close()
+		return output.getvalue()
+
+	def read(self, file_path):
+		with open(self.path(file_path)) as f:
+			return f.read()
+
+	def test_files_are_recorded(self):
+		self.write(FILES)
+		manifest = Manifest(self.path("Product"))
+		self.assertFalse(manifest.is_new)
+		self.assertEqual(sorted(manifest.files), ["ProductViewModel.swift", "Test/ProductViewModelTests.swift"])
+		self.assertEqual(manifest.files["ProductViewModel.swift"], Manifest.file_digest(self.path(FILES[0][0])))
+
+	def test_unchanged_files_are_not_written(self):
+		self.write(FILES)
+		path = self.path(FILES[0][0])
+		os.utime(path, (1, 1))
+		output = self.write(FILES)
+		self.assertIn("{} (unchanged)".format(FILES[0][0]), output)
+		self.assertEqual(os.stat(path).st_mtime, 1)
+
+	def test_changed_output_is_written(self):
+		self.write(FILES)
+		self.write([(FILES[0][0], "class ProductViewModel { }\n")])
+		self.assertEqual(self.read(FILES[0][0]), "class ProductViewModel { }\n")
+
+	def test_modified_files_are_kept(self):
+		self.write(FILES)
+		with open(self.path(FILES[0][0]), "a") as f:
+			f.write("// edited\n")
+		output = self.write([(FILES[0][0], "class ProductViewModel { }\n")])
+		self.assertIn("not overwritten", output)
+		self.assertIn("--force", output)
+		self.assertEqual(self.read(FILES[0][0]), FILES[0][1] + "// edited\n")
+		# The file stays modified for the next runs.
+		output = self.write(FILES)
+		self.assertIn("not overwritten", output)
+
+	def test_force_overwrites_modified_files(self):
+		self.write(FILES)
+		with open(self.path(FILES[0][0]), "a") as f:
+			f.write("// edited\n")
+		self.write(FILES, force=True)
+		self.assertEqual(self.read(FILES[0][0]), FILES[0][1])
+		output = self.write(FILES)
+		self.assertIn("{} (unchanged)".format(FILES[0][0]), output)
+
+	def test_existing_files_without_manifest_are_overwritten(self):
+		os.makedirs(self.path("Product"))
+		with open(self.path(FILES[0][0]), "w") as f:
+			f.write("// old\n")
+		self.write(FILES)
+		self.assertEqual(self.read(FILES[0][0]), FILES[0][1])
+
+	def test_large_unchanged_files_are_not_written(self):
+		for _ in range(2):
+			output = io.StringIO()
+			with redirect_stdout(output):
+				sink = DirectorySink(self.root)
+				sink.begin("Product")
+				sink.write_chunks(LARGE_FILE[0], iter(LARGE_FILE[1]))
+				sink.end()
+		self.assertIn("{} (unchanged)".format(LARGE_FILE[0]), output.getvalue())
+		self.assertEqual(self.read(LARGE_FILE[0]), "".join(LARGE_FILE[1]))
+		self.assertEqual([name for name in os.listdir(self.path("Product")) if name.endswith(".tmp")], [])
+
+	def test_removed_files(self):
+		self.write(FILES)
+		output = io.StringIO()
+		with redirect_stdout(output):
+			sink = DirectorySink(self.root)
+			sink.begin("Product")
+			sink.remove(FILES[1][0])
+			sink.end()
+		self.assertFalse(os.path.exists(self.path(FILES[1][0])))
+		self.assertEqual(list(Manifest(self.path("Product")).files), ["ProductViewModel.swift"])
+
+
+class SinkTests(unittest.TestCase):
+
+	def setUp(self):
+		self.root = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.root)
+
+	def write(self, sink):
+		with redirect_stdout(io.StringIO()):
+			sink.begin("Product")
+			for file_path, content in FILES:
+				sink.write(file_path, content)
+			sink.write_chunks(LARGE_FILE[0], iter(LARGE_FILE[1]))
+			sink.end()
+			sink.close()
+
+	def expected(self):
+		return dict(FILES + [(LARGE_FILE[0], "".join(LARGE_FILE[1]))])
+
+	def test_tar(self):
+		for name in ["scenes.tar", "scenes.tar.gz"]:
+			path = os.path.join(self.root, name)
+			self.write(create_sink(path))
+			with tarfile.open(path) as archive:
+				files = dict((member.name, archive.extractfile(member).read().decode('utf8')) for member in archive.getmembers())
+			self.assertEqual(files, self.expected())
+
+	def test_zip(self):
+		path = os.path.join(self.root, "scenes.zip")
+		self.write(create_sink(path))
+		with zipfile.ZipFile(path) as archive:
+			files = dict((name, archive.read(name).decode('utf8')) for name in archive.namelist())
+		self.assertEqual(files, self.expected())
+
+	def test_stdout(self):
+		stream = io.StringIO()
+		self.write(StdoutSink(stream))
+		self.assertEqual(stream.getvalue(), "".join("// {}\n{}\n".format(file_path, content)
+			for file_path, content in FILES + [(LARGE_FILE[0], "".join(LARGE_FILE[1]))]))
+
+	def test_render_matches_the_written_files(self):
+		model = Template().parse_model(MODEL)
+		template = Template.DetailTemplate(model, {}, "Product", ProjectInfo("Demo", "Dev", "Co"))
+		path = os.path.join(self.root, "scenes.zip")
+		sink = create_sink(path)
+		with redirect_stdout(io.StringIO()):
+			template.create_files(sink)
+		sink.close()
+		with zipfile.ZipFile(path) as archive:
+			files = dict((name, archive.read(name).decode('utf8')) for name in archive.namelist())
+		rendered = template.render()
+		self.assertIn("Product/ProductViewModel.swift", rendered)
+		self.assertEqual(files, dict(rendered))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,29 @@
+# coding=utf-8
+
+import os
+import sys
+import subprocess
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that only the commands using them may import.
+FORBIDDEN_MODULES = ['jinja2', 'sqlite3', 'configparser', 'concurrent.futures', 'igen.json_schema']
+
+
+class StartupTests(unittest.TestCase):
+
+	def test_version_imports(self):
+		env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+		env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, env.get('PYTHONPATH')]))
+		process = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'igen', '-v'], env=env,
+			stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+		self.assertEqual(process.returncode, 0)
+		output = process.stderr.decode('utf8')
+		modules = set(line.split('|')[-1].strip() for line in output.splitlines() if line.startswith('import time:'))
+		self.assertIn('igen.trace', modules)
+		self.assertEqual(sorted(name for name in FORBIDDEN_MODULES if name in modules), [])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,59 @@
+# coding=utf-8
+
+import time
+import unittest
+from igen.swift_parser import parse
+from igen.bench import source_text
+
+# The parser must run in linear time: the time per character of a large
+# input may not be much more than the one of an input four times smaller.
+SIZE = 1000 * 1000
+MAX_SLOWDOWN = 2.0
+
+
+def _parse_time(text):
+	best = None
+	for _ in range(2):
+		start = time.perf_counter()
+		parse(text)
+		elapsed = time.perf_counter() - start
+		best = elapsed if best is None else min(best, elapsed)
+	return best
+
+
+class SwiftParserThroughputTests(unittest.TestCase):
+
+	def assertLinear(self, make_text, size):
+		small = make_text(size // 4)
+		large = make_text(size)
+		small_rate = _parse_time(small) / len(small)
+		large_rate = _parse_time(large) / len(large)
+		self.assertLess(large_rate, small_rate * MAX_SLOWDOWN)
+
+	def test_source(self):
+		# About 4 MB of declarations.
+		self.assertLinear(lambda size: source_text(size // 400), 4 * SIZE)
+
+	def test_source_declarations(self):
+		text = source_text(1000)
+		self.assertEqual(len(parse(text).members), 1000)
+
+	def test_unbalanced_braces(self):
+		self.assertLinear(lambda size: "struct A {\n" + "{" * size, SIZE)
+
+	def test_unbalanced_parentheses(self):
+		self.assertLinear(lambda size: "func a(" * (size // 7), SIZE)
+
+	def test_unbalanced_generics(self):
+		self.assertLinear(lambda size: "var a: A<" * (size // 9), SIZE)
+
+	def test_unterminated_strings(self):
+		self.assertLinear(lambda size: "struct A {\n    var a = \"" + "\"\\" * (size // 2), SIZE)
+		self.assertLinear(lambda size: "struct A {\n    var a = \"a\\\n" * (size // 24), SIZE)
+
+	def test_unterminated_comments(self):
+		self.assertLinear(lambda size: "/*" * (size // 2), SIZE)
+
+
+if __name__ == '__main__':
+	unittest.main()
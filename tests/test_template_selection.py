@@ -0,0 +1,86 @@
+# coding=utf-8
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from igen.Template import Template, ProjectInfo
+from igen.sink import DirectorySink
+
+MODEL = """
+struct Product {
+    var id: Int
+    var name: String
+}
+"""
+
+LIST_OPTIONS = {'section': False, 'collection': False}
+
+
+class TemplateSelectionTests(unittest.TestCase):
+
+	def setUp(self):
+		self.root = tempfile.mkdtemp()
+		self.model = Template().parse_model(MODEL)
+
+	def tearDown(self):
+		shutil.rmtree(self.root)
+
+	def list_template(self, **selection):
+		template = Template.ListTemplate(self.model, LIST_OPTIONS, "ProductList", ProjectInfo("Demo", "Dev", "Co"))
+		template.select(**selection)
+		return template
+
+	def create_files(self, template):
+		output = io.StringIO()
+		with redirect_stdout(output):
+			template.create_files(DirectorySink(self.root))
+		return output.getvalue()
+
+	def files(self):
+		scene = os.path.join(self.root, "ProductList")
+		return sorted(os.path.relpath(os.path.join(directory, name), scene)
+			for directory, _, names in os.walk(scene) for name in names if name.endswith(".swift"))
+
+	def test_every_artifact_by_default(self):
+		template = self.list_template()
+		self.assertEqual([artifact.kind for artifact in template.selected_plan()], [artifact.kind for artifact in template.plan()])
+		self.assertEqual(len(template.render()), len(template.plan()))
+
+	def test_only(self):
+		template = self.list_template(only=["ViewModel", "Cell", "CellTests"])
+		self.assertEqual([artifact.kind for artifact in template.selected_plan()], ["ViewModel", "Cell", "CellTests"])
+		self.assertEqual(list(template.render()),
+			["ProductList/ProductListViewModel.swift", "ProductList/ProductCell.swift", "ProductList/Test/ProductCellTests.swift"])
+
+	def test_except(self):
+		template = self.list_template(excluded=["ViewController", "ViewControllerTests"])
+		kinds = [artifact.kind for artifact in template.selected_plan()]
+		self.assertNotIn("ViewController", kinds)
+		self.assertNotIn("ViewControllerTests", kinds)
+		self.assertEqual(len(kinds), len(template.plan()) - 2)
+
+	def test_only_writes_the_selected_files(self):
+		self.create_files(self.list_template(only=["ViewModel"]))
+		self.assertEqual(self.files(), ["ProductListViewModel.swift"])
+		self.create_files(self.list_template(only=["ViewModelTests"]))
+		self.assertEqual(self.files(), ["ProductListViewModel.swift", os.path.join("Test", "ProductListViewModelTests.swift")])
+
+	def test_other_files_are_not_touched(self):
+		self.create_files(self.list_template())
+		path = os.path.join(self.root, "ProductList", "ProductListNavigator.swift")
+		os.utime(path, (1, 1))
+		output = self.create_files(self.list_template(only=["ViewModel"]))
+		self.assertNotIn("Navigator", output)
+		self.assertEqual(os.stat(path).st_mtime, 1)
+
+	def test_detail_cells(self):
+		template = Template.DetailTemplate(self.model, {}, "ProductDetail", ProjectInfo("Demo", "Dev", "Co"))
+		template.select(only=["Cell"])
+		self.assertEqual(list(template.render()), ["ProductDetail/ProductIdCell.swift", "ProductDetail/ProductNameCell.swift"])
+
+
+if __name__ == '__main__':
+	unittest.main()